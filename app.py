@@ -13,7 +13,7 @@ from ui.components import (
 )
 from modules.leftover import suggest_recipes
 from modules.leftover import get_user_stats, award_recipe_xp
-from firebase_init import init_firebase
+from firebase_init import warm_up_firebase
 from app_integration import integrate_event_planner, check_event_firebase_config
 from dashboard import render_dashboard, get_feature_description
 from ui.chef_components import render_chef_recipe_suggestions
@@ -29,7 +29,7 @@ except ImportError:
         st.error("Ingredients management module not found. Please check the file location.")
         render_ingredient_management = None
 
-init_firebase()
+warm_up_firebase()
 
 import logging
 logging.basicConfig(level=logging.INFO, 
@@ -199,9 +199,8 @@ def leftover_management():
             
             if st.button("Fetch Priority Ingredients", type="primary"):
                 try:
-                    from modules.leftover import get_ingredients_by_expiry_priority, fetch_ingredients_from_firebase
-                    firebase_ingredients = fetch_ingredients_from_firebase()
-                    ingredients, detailed_info = get_ingredients_by_expiry_priority(firebase_ingredients, max_ingredients)
+                    from modules.leftover import get_priority_ingredients
+                    ingredients, detailed_info = get_priority_ingredients(max_ingredients)
                     
                     if ingredients:
                         st.session_state.all_leftovers = ingredients
@@ -258,7 +257,8 @@ def leftover_management():
                             st.session_state.all_leftovers, 
                             num_suggestions, 
                             notes, 
-                            priority_ingredients=st.session_state.detailed_ingredient_info
+                            priority_ingredients=st.session_state.detailed_ingredient_info,
+                            structured=True
                         )
                         
                         st.session_state.recipes = recipes
@@ -276,7 +276,18 @@ def leftover_management():
                 
                 st.subheader("Recipe Suggestions")
                 for i, recipe in enumerate(st.session_state.recipes):
-                    st.write(f"{i+1}. **{recipe}**")
+                    if isinstance(recipe, dict):
+                        st.write(f"{i+1}. **{recipe['name']}**")
+                        details = [f"Uses {recipe['leftover_coverage']:.0%} of leftovers"]
+                        if recipe['prep_time_minutes']:
+                            details.append(f"~{recipe['prep_time_minutes']} min prep")
+                        st.caption(" | ".join(details))
+                        if recipe['description']:
+                            st.write(recipe['description'])
+                        if recipe['ingredients_used']:
+                            st.caption(f"Ingredients: {', '.join(recipe['ingredients_used'])}")
+                    else:
+                        st.write(f"{i+1}. **{recipe}**")
                 
                 if st.session_state.detailed_ingredient_info:
                     urgent_ingredients = [item['name'] for item in st.session_state.detailed_ingredient_info if item['days_until_expiry'] <= 3]
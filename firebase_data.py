@@ -1,44 +1,460 @@
+import asyncio
+import itertools
 import logging
+import re
+import threading
+import time
+from collections import Counter
+from datetime import date, datetime, timezone
 from typing import List, Dict, Optional, Tuple
-import firebase_admin
-from firebase_admin import firestore
-from firebase_init import init_firebase
+import numpy as np
+import pandas as pd
+from firebase_init import get_client, get_async_client, MAIN_APP, EVENT_APP
+from modules.quantity_units import parse_quantity_series
 
 logger = logging.getLogger(__name__)
 
+SNAPSHOT_TTL_SECONDS = 300
+NGRAM_SIZE = 3
+
+EXPIRY_DATE_FORMAT = "%d/%m/%Y"
+# Older inventory rows store "Expiry date: dd/mm/yyyy"
+_EXPIRY_PREFIX_RE = re.compile(r'^\s*expiry\s+date\s*:\s*', re.IGNORECASE)
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+INVENTORY_COLLECTION = 'ingredient_inventory'
+INVENTORY_TEXT_COLUMNS = ['Ingredient', 'Quantity', 'Type', 'Unit', 'Expiry Date', 'Alternatives']
+MISSING_EXPIRY_DAYS = -999
+
+# Collections kept current by an on_snapshot listener instead of TTL re-reads
+WATCHED_COLLECTIONS = {INVENTORY_COLLECTION}
+MIRROR_READY_TIMEOUT_SECONDS = 10
+MIRROR_WRITE_WAIT_SECONDS = 1
+
+# Fields whose distinct values (with counts) are kept per collection for filter dropdowns
+FACET_FIELDS = {
+    'menu': ['category', 'cuisine', 'diet', 'types', 'source'],
+    INVENTORY_COLLECTION: ['Type'],
+}
+
+# (app_name, collection_name) -> {'fetched_at', 'version', 'docs', 'index', 'frame', 'facets', 'derived', 'mirror'}
+_snapshot_cache: Dict[Tuple[str, str], Dict] = {}
+_snapshot_lock = threading.Lock()
+
+_versions = itertools.count(1)
+_mirrors: Dict[Tuple[str, str], '_CollectionMirror'] = {}
+_mirrors_lock = threading.Lock()
+
+_async_loop = None
+_async_loop_lock = threading.Lock()
+
+class _IngredientSearchIndex:
+    """Trigram postings over the lowercased ingredients, name and description of a snapshot"""
+
+    def __init__(self):
+        self.docs = []
+        self.fields = []
+        self.postings = {}
+
+    def add(self, doc: Dict):
+        position = len(self.docs)
+        doc_ingredients = doc.get('ingredients', [])
+        if isinstance(doc_ingredients, list):
+            ingredients_lower = [str(ing).lower() for ing in doc_ingredients]
+        else:
+            ingredients_lower = [str(doc_ingredients).lower()]
+        
+        # Ingredients are joined on a separator no query can contain, so a substring
+        # match on the joined text is a match on one individual ingredient.
+        fields = (
+            '\x00'.join(ingredients_lower),
+            str(doc.get('name', '')).lower(),
+            str(doc.get('description', '')).lower()
+        )
+        self.docs.append(doc)
+        self.fields.append(fields)
+        
+        for text in fields:
+            for gram in _ngrams(text):
+                self.postings.setdefault(gram, set()).add(position)
+
+    def candidates(self, term: str):
+        if len(term) < NGRAM_SIZE:
+            return range(len(self.docs))
+        
+        postings = []
+        for gram in _ngrams(term):
+            posting = self.postings.get(gram)
+            if not posting:
+                return set()
+            postings.append(posting)
+        
+        postings.sort(key=len)
+        result = set(postings[0])
+        for posting in postings[1:]:
+            result &= posting
+            if not result:
+                break
+        return result
+
+    def search(self, terms: List[str], limit: int) -> List[Dict]:
+        scores = {}
+        for term in terms:
+            for position in self.candidates(term):
+                ingredients_text, name, description = self.fields[position]
+                score = 0
+                if term in ingredients_text:
+                    score += 2
+                if term in name:
+                    score += 1
+                if term in description:
+                    score += 0.5
+                if score:
+                    scores[position] = scores.get(position, 0) + score
+        
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        
+        results = []
+        for position, score in ranked:
+            doc = dict(self.docs[position])
+            doc['match_score'] = score
+            results.append(doc)
+        return results
+
+class _FacetCounts:
+    """Distinct values with document counts for a collection's facet fields"""
+
+    def __init__(self, fields: List[str]):
+        self.fields = fields
+        self.counts = {field: Counter() for field in fields}
+
+    @staticmethod
+    def _values(value) -> set:
+        values = value if isinstance(value, list) else [value]
+        return {str(v).strip() for v in values if v is not None and str(v).strip()}
+
+    def add(self, doc: Dict, sign: int = 1):
+        for field in self.fields:
+            counter = self.counts[field]
+            for value in self._values(doc.get(field)):
+                counter[value] += sign
+                if counter[value] <= 0:
+                    del counter[value]
+
+    def remove(self, doc: Dict):
+        self.add(doc, sign=-1)
+
+    def copy(self) -> '_FacetCounts':
+        facets = _FacetCounts(self.fields)
+        facets.counts = {field: Counter(counter) for field, counter in self.counts.items()}
+        return facets
+
+class _CollectionMirror:
+    """In-memory copy of a collection that an on_snapshot listener keeps current with deltas"""
+
+    def __init__(self, key: Tuple[str, str], db):
+        self.key = key
+        self.docs_by_id = {}
+        self.ready = threading.Event()
+        self.changed = threading.Condition(_snapshot_lock)
+        # Cleared by close() or a failed change set; the first snapshot can arrive before on_snapshot returns
+        self.listening = True
+        self.watch = db.collection(key[1]).on_snapshot(self._on_snapshot)
+
+    @property
+    def active(self) -> bool:
+        # The Watch has no error callback, so a stream that ended on its own shows up as is_active=False
+        return self.listening and self.watch.is_active
+
+    def _on_snapshot(self, collection_snapshot, changes, read_time):
+        try:
+            self._apply_changes(changes)
+        except Exception as e:
+            # A missed change set leaves the mirror wrong for good; stop serving it until restarted
+            self.listening = False
+            logger.error(f"Error applying {self.key[1]} changes, stopping mirror: {str(e)}")
+
+    def _apply_changes(self, changes):
+        with _snapshot_lock:
+            if not self.listening:
+                return
+            previous = _snapshot_cache.get(self.key)
+            facets = previous['facets'].copy() if previous and previous['mirror'] is self and previous['facets'] else None
+
+            for change in changes:
+                old_doc = self.docs_by_id.pop(change.document.id, None)
+                if facets and old_doc:
+                    facets.remove(old_doc)
+                if change.type.name != 'REMOVED':
+                    doc_data = change.document.to_dict()
+                    doc_data['id'] = change.document.id
+                    self.docs_by_id[change.document.id] = doc_data
+                    if facets:
+                        facets.add(doc_data)
+
+            # A new entry per change set drops the index, frame and derived caches of the old one;
+            # facet counts are carried over with the deltas applied
+            entry = _new_entry(list(self.docs_by_id.values()), time.monotonic(), mirror=self)
+            entry['facets'] = facets
+            _snapshot_cache[self.key] = entry
+            self.changed.notify_all()
+        self.ready.set()
+        logger.info(f"Applied {len(changes)} changes to {self.key[1]} mirror ({len(self.docs_by_id)} docs)")
+
+    def close(self):
+        self.listening = False
+        try:
+            self.watch.unsubscribe()
+        except Exception as e:
+            logger.error(f"Error closing {self.key[1]} listener: {str(e)}")
+
+def _get_mirror(key: Tuple[str, str], db) -> Optional[_CollectionMirror]:
+    with _mirrors_lock:
+        mirror = _mirrors.get(key)
+        if mirror is not None and not mirror.active:
+            logger.warning(f"Listener for {key[1]} closed, restarting")
+            mirror.close()
+            mirror = None
+        if mirror is None:
+            try:
+                mirror = _CollectionMirror(key, db)
+            except Exception as e:
+                logger.error(f"Error starting listener for {key[1]}: {str(e)}")
+                return None
+            _mirrors[key] = mirror
+
+    if not mirror.ready.wait(MIRROR_READY_TIMEOUT_SECONDS):
+        logger.warning(f"Listener for {key[1]} not ready, falling back to a full read")
+        return None
+    return mirror
+
+def _ngrams(text: str) -> set:
+    return {text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
 def get_main_firestore_db():
-    init_firebase()
-    return firestore.client()
+    return get_client(MAIN_APP)
 
 def get_event_firestore_db():
+    return get_client(EVENT_APP)
+
+def _get_data_db() -> Tuple[str, object]:
+    db = get_event_firestore_db()
+    if db:
+        return EVENT_APP, db
+    logger.warning("Event Firebase not available, using main Firebase")
+    return MAIN_APP, get_main_firestore_db()
+
+def _get_fresh_entry(key: Tuple[str, str]) -> Optional[Dict]:
+    with _snapshot_lock:
+        entry = _snapshot_cache.get(key)
+        if entry and entry['mirror'] is not None and entry['mirror'].active:
+            return entry
+        if entry and time.monotonic() - entry['fetched_at'] < SNAPSHOT_TTL_SECONDS:
+            return entry
+    return None
+
+def _new_entry(docs: List[Dict], fetched_at: float, mirror: Optional[_CollectionMirror] = None) -> Dict:
+    return {
+        'fetched_at': fetched_at, 'version': next(_versions), 'docs': docs,
+        'index': None, 'frame': None, 'facets': None, 'derived': {}, 'mirror': mirror,
+    }
+
+def _store_snapshot(key: Tuple[str, str], docs: List[Dict], fetched_at: float) -> Dict:
+    entry = _new_entry(docs, fetched_at)
+    with _snapshot_lock:
+        _snapshot_cache[key] = entry
+    return entry
+
+def _get_snapshot_entry(collection_name: str) -> Dict:
+    app_name, db = _get_data_db()
+    key = (app_name, collection_name)
+    
+    entry = _get_fresh_entry(key)
+    if entry:
+        return entry
+    
+    if collection_name in WATCHED_COLLECTIONS and _get_mirror(key, db):
+        entry = _get_fresh_entry(key)
+        if entry:
+            return entry
+    
+    fetched_at = time.monotonic()
+    docs = []
+    for doc in db.collection(collection_name).get():
+        doc_data = doc.to_dict()
+        doc_data['id'] = doc.id
+        docs.append(doc_data)
+    
+    return _store_snapshot(key, docs, fetched_at)
+
+def _peek_snapshot_docs(collection_name: str) -> Optional[List[Dict]]:
+    app_name, _ = _get_data_db()
+    entry = _get_fresh_entry((app_name, collection_name))
+    if entry:
+        with _snapshot_lock:
+            return list(entry['docs'])
+    return None
+
+def _fetch_collection_snapshot(collection_name: str) -> List[Dict]:
+    entry = _get_snapshot_entry(collection_name)
+    with _snapshot_lock:
+        return [dict(doc) for doc in entry['docs']]
+
+def _get_search_index(collection_name: str) -> _IngredientSearchIndex:
+    entry = _get_snapshot_entry(collection_name)
+    with _snapshot_lock:
+        if entry['index'] is None:
+            index = _IngredientSearchIndex()
+            for doc in entry['docs']:
+                index.add(doc)
+            entry['index'] = index
+            logger.info(f"Built ingredient index for {collection_name}: {len(index.docs)} docs, {len(index.postings)} grams")
+        return entry['index']
+
+def get_facets(collection_name: str) -> Dict[str, Dict[str, int]]:
+    fields = FACET_FIELDS.get(collection_name, [])
+    entry = _get_snapshot_entry(collection_name)
+    with _snapshot_lock:
+        if entry['facets'] is None:
+            facets = _FacetCounts(fields)
+            for doc in entry['docs']:
+                facets.add(doc)
+            entry['facets'] = facets
+        return {field: dict(counter) for field, counter in entry['facets'].counts.items()}
+
+def get_facet_values(collection_name: str, field: str) -> List[str]:
+    return sorted(get_facets(collection_name).get(field, {}))
+
+def get_snapshot_derived(collection_name: str, name: str, builder):
+    # Structures built from a snapshot live as long as it does and are dropped on writes
+    entry = _get_snapshot_entry(collection_name)
+    with _snapshot_lock:
+        derived = entry['derived'].get(name)
+        if derived is None:
+            derived = builder(entry['docs'])
+            entry['derived'][name] = derived
+            logger.info(f"Built {name} for {collection_name} snapshot")
+        return derived
+
+def _matching_cache_keys(collection_name: Optional[str], app_name: Optional[str]) -> List[Tuple[str, str]]:
+    return [
+        key for key in _snapshot_cache
+        if (not collection_name or key[1] == collection_name) and (not app_name or key[0] == app_name)
+    ]
+
+def get_collection_version(collection_name: str) -> int:
+    # Changes whenever the cached docs change, so dependents can skip recomputing
+    return _get_snapshot_entry(collection_name)['version']
+
+def invalidate_collection_cache(collection_name: Optional[str] = None, app_name: Optional[str] = None):
+    with _snapshot_lock:
+        for key in _matching_cache_keys(collection_name, app_name):
+            entry = _snapshot_cache.get(key)
+            mirror = entry['mirror'] if entry else None
+            if mirror is not None and mirror.active:
+                # The listener delivers the write; wait briefly so the caller reads its own write
+                mirror.changed.wait_for(lambda: _snapshot_cache.get(key) is not entry, MIRROR_WRITE_WAIT_SECONDS)
+                continue
+            _snapshot_cache.pop(key, None)
+    logger.info(f"Invalidated snapshot cache (collection={collection_name or 'all'}, app={app_name or 'all'})")
+
+def record_collection_write(collection_name: str, doc_data: Dict, doc_id: str, app_name: Optional[str] = None):
+    # Only the app the doc was written to; other apps' snapshots come from other databases
+    if app_name is None:
+        app_name, _ = _get_data_db()
+    doc = dict(doc_data)
+    doc['id'] = doc_id
+    with _snapshot_lock:
+        for key in _matching_cache_keys(collection_name, app_name):
+            entry = _snapshot_cache[key]
+            if entry['mirror'] is not None:
+                continue
+            # Upsert by id: re-saving a doc (e.g. a menu with deterministic ids) replaces it
+            position = next((i for i, existing in enumerate(entry['docs']) if existing.get('id') == doc_id), None)
+            if position is None:
+                entry['docs'].append(doc)
+                if entry['index'] is not None:
+                    entry['index'].add(doc)
+            else:
+                old_doc = entry['docs'][position]
+                entry['docs'][position] = doc
+                # Index postings are positional and append-only, so rebuild it lazily
+                entry['index'] = None
+                if entry['facets'] is not None:
+                    entry['facets'].remove(old_doc)
+            if entry['facets'] is not None:
+                entry['facets'].add(doc)
+            entry['frame'] = None
+            entry['derived'] = {}
+            entry['version'] = next(_versions)
+
+def _get_async_loop() -> asyncio.AbstractEventLoop:
+    global _async_loop
+    with _async_loop_lock:
+        if _async_loop is None:
+            _async_loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=_async_loop.run_forever, name='firebase-data-loop', daemon=True)
+            thread.start()
+        return _async_loop
+
+async def _fetch_snapshot_entry_async(app_name: str, collection_name: str) -> Dict:
+    key = (app_name, collection_name)
+    entry = _get_fresh_entry(key)
+    if entry:
+        return entry
+    
+    db = get_async_client(app_name)
+    if not db:
+        raise Exception(f"Async Firestore client unavailable for {app_name}")
+    
+    fetched_at = time.monotonic()
+    docs = []
+    async for doc in db.collection(collection_name).stream():
+        doc_data = doc.to_dict()
+        doc_data['id'] = doc.id
+        docs.append(doc_data)
+    
+    return _store_snapshot(key, docs, fetched_at)
+
+async def fetch_collections_async(collection_names: List[str], app_name: str = EVENT_APP) -> Dict[str, List[Dict]]:
+    results = await asyncio.gather(
+        *[_fetch_snapshot_entry_async(app_name, name) for name in collection_names],
+        return_exceptions=True
+    )
+    
+    collections = {}
+    for name, result in zip(collection_names, results):
+        if isinstance(result, Exception):
+            logger.error(f"Error fetching {name} asynchronously: {str(result)}")
+            collections[name] = []
+            continue
+        with _snapshot_lock:
+            collections[name] = [dict(doc) for doc in result['docs']]
+        logger.info(f"Fetched {len(collections[name])} docs from {name}")
+    
+    return collections
+
+def fetch_collections(collection_names: List[str]) -> Dict[str, List[Dict]]:
     try:
-        if 'event_app' in [app.name for app in firebase_admin._apps.values()]:
-            return firestore.client(app=firebase_admin.get_app(name='event_app'))
-        else:
-            from modules.event_planner import init_event_firebase
-            if init_event_firebase():
-                return firestore.client(app=firebase_admin.get_app(name='event_app'))
-            return None
+        # Resolve (and if needed initialise) the app on the calling thread so any
+        # Streamlit error output lands on the page rather than the loop thread.
+        app_name, _ = _get_data_db()
+        future = asyncio.run_coroutine_threadsafe(
+            fetch_collections_async(collection_names, app_name), _get_async_loop()
+        )
+        return future.result()
+        
     except Exception as e:
-        logger.error(f"Error getting event Firestore client: {str(e)}")
-        return None
+        logger.error(f"Error fetching collections {collection_names}: {str(e)}")
+        return {name: [] for name in collection_names}
+
+def fetch_archive_and_menu() -> Tuple[List[Dict], List[Dict]]:
+    collections = fetch_collections(['recipe_archive', 'menu'])
+    return collections['recipe_archive'], collections['menu']
 
 def fetch_recipe_archive() -> List[Dict]:
     try:
-        db = get_event_firestore_db()
-        if not db:
-            logger.warning("Event Firebase not available, using main Firebase")
-            db = get_main_firestore_db()
-        
-        recipes_ref = db.collection('recipe_archive')
-        recipes_docs = recipes_ref.get()
-        
-        recipes = []
-        for doc in recipes_docs:
-            recipe_data = doc.to_dict()
-            recipe_data['id'] = doc.id
-            recipes.append(recipe_data)
-        
+        recipes = _fetch_collection_snapshot('recipe_archive')
         logger.info(f"Fetched {len(recipes)} recipes from archive")
         return recipes
         
@@ -48,20 +464,7 @@ def fetch_recipe_archive() -> List[Dict]:
 
 def fetch_menu_items() -> List[Dict]:
     try:
-        db = get_event_firestore_db()
-        if not db:
-            logger.warning("Event Firebase not available, using main Firebase")
-            db = get_main_firestore_db()
-        
-        menu_ref = db.collection('menu')
-        menu_docs = menu_ref.get()
-        
-        menu_items = []
-        for doc in menu_docs:
-            menu_data = doc.to_dict()
-            menu_data['id'] = doc.id
-            menu_items.append(menu_data)
-        
+        menu_items = _fetch_collection_snapshot('menu')
         logger.info(f"Fetched {len(menu_items)} menu items")
         return menu_items
         
@@ -69,49 +472,121 @@ def fetch_menu_items() -> List[Dict]:
         logger.error(f"Error fetching menu items: {str(e)}")
         return []
 
+def query_collection(collection_name: str, fields: Optional[List[str]] = None,
+                     filters: Optional[List[Tuple[str, str, object]]] = None,
+                     limit: Optional[int] = None) -> List[Dict]:
+    try:
+        _, db = _get_data_db()
+        query = db.collection(collection_name)
+        
+        if fields:
+            query = query.select(fields)
+        for field, op, value in filters or []:
+            query = query.where(field, op, value)
+        if limit:
+            query = query.limit(limit)
+        
+        docs = []
+        for doc in query.stream():
+            doc_data = doc.to_dict()
+            doc_data['id'] = doc.id
+            docs.append(doc_data)
+        
+        logger.info(f"Queried {len(docs)} docs from {collection_name} (fields={fields}, filters={filters}, limit={limit})")
+        return docs
+        
+    except Exception as e:
+        logger.error(f"Error querying {collection_name}: {str(e)}")
+        return []
+
+def parse_expiry_string(expiry_str: str) -> Optional[date]:
+    try:
+        date_part = _EXPIRY_PREFIX_RE.sub('', str(expiry_str)).strip()
+        return datetime.strptime(date_part, EXPIRY_DATE_FORMAT).date()
+    except (ValueError, TypeError):
+        return None
+
+def to_epoch_day(value: date) -> int:
+    return value.toordinal() - _EPOCH_ORDINAL
+
+def today_epoch_day() -> int:
+    return to_epoch_day(date.today())
+
+def expiry_fields(expiry_str: str) -> Dict:
+    # Stored next to 'Expiry Date' so readers can sort and range-filter without parsing
+    expiry_date = parse_expiry_string(expiry_str)
+    if expiry_date is None:
+        return {'expiry_at': None, 'expiry_day': None}
+    return {
+        'expiry_at': datetime(expiry_date.year, expiry_date.month, expiry_date.day, tzinfo=timezone.utc),
+        'expiry_day': to_epoch_day(expiry_date),
+    }
+
+def ingredient_expiry_day(ingredient: Dict) -> Optional[int]:
+    expiry_day = ingredient.get('expiry_day')
+    if isinstance(expiry_day, int):
+        return expiry_day
+
+    # Documents written before the migration only have the string
+    expiry_date = parse_expiry_string(ingredient.get('Expiry Date', ''))
+    return to_epoch_day(expiry_date) if expiry_date else None
+
+def _build_inventory_frame(docs: List[Dict]) -> pd.DataFrame:
+    frame = pd.DataFrame(docs)
+    for column in INVENTORY_TEXT_COLUMNS + ['id']:
+        if column not in frame.columns:
+            frame[column] = ''
+        frame[column] = frame[column].fillna('').astype(str).str.strip()
+    frame['doc_id'] = frame['id']
+
+    # "4 kg" carries its own unit; "4" falls back to the Unit field
+    quantity = parse_quantity_series(frame['Quantity'], frame['Unit'])
+    for column in ['base_quantity', 'base_unit']:
+        if column in frame.columns:
+            # Prefer the canonical values stored at write time
+            quantity[column] = frame[column].where(frame[column].notna(), quantity[column])
+    for column in quantity.columns:
+        frame[column] = quantity[column]
+
+    stored_day = frame['expiry_day'] if 'expiry_day' in frame.columns else pd.Series(np.nan, index=frame.index)
+    expiry_day = pd.to_numeric(stored_day, errors='coerce')
+    missing = expiry_day.isna()
+    if missing.any():
+        date_part = frame.loc[missing, 'Expiry Date'].str.replace(_EXPIRY_PREFIX_RE, '', regex=True).str.strip()
+        parsed = pd.to_datetime(date_part, format=EXPIRY_DATE_FORMAT, errors='coerce')
+        expiry_day[missing] = (parsed - pd.Timestamp('1970-01-01')).dt.days
+    frame['expiry_day'] = expiry_day
+    return frame
+
+def get_inventory_frame() -> pd.DataFrame:
+    entry = _get_snapshot_entry(INVENTORY_COLLECTION)
+    with _snapshot_lock:
+        if entry['frame'] is None:
+            entry['frame'] = _build_inventory_frame(entry['docs'])
+            logger.info(f"Built inventory frame: {len(entry['frame'])} rows")
+        frame = entry['frame'].copy()
+
+    # Day-relative columns are computed per call so a cached frame never goes stale at midnight
+    days = frame['expiry_day'] - today_epoch_day()
+    frame['days_until_expiry'] = days.fillna(MISSING_EXPIRY_DAYS).astype(int)
+    frame['expiry_status'] = np.select(
+        [days.isna(), days < 0, days <= 3, days <= 7],
+        ['invalid', 'expired', 'critical', 'warning'],
+        default='fresh'
+    )
+    return frame
+
+def inventory_records(frame: pd.DataFrame) -> List[Dict]:
+    return frame.astype(object).where(frame.notna(), None).to_dict('records')
+
 def search_recipes_by_ingredients(ingredients: List[str], limit: int = 10) -> List[Dict]:
     try:
-        recipes = fetch_recipe_archive()
-        if not recipes:
+        index = _get_search_index('recipe_archive')
+        if not index.docs:
             return []
         
-        matching_recipes = []
         ingredients_lower = [ing.lower().strip() for ing in ingredients]
-        
-        for recipe in recipes:
-            recipe_ingredients = recipe.get('ingredients', [])
-            recipe_name = recipe.get('name', '').lower()
-            recipe_description = recipe.get('description', '').lower()
-            
-            if isinstance(recipe_ingredients, list):
-                recipe_ingredients_lower = [str(ing).lower() for ing in recipe_ingredients]
-            else:
-                recipe_ingredients_lower = [str(recipe_ingredients).lower()]
-            
-            ingredient_match = any(
-                any(search_ing in recipe_ing for recipe_ing in recipe_ingredients_lower)
-                for search_ing in ingredients_lower
-            )
-            
-            name_match = any(ing in recipe_name for ing in ingredients_lower)
-            desc_match = any(ing in recipe_description for ing in ingredients_lower)
-            
-            if ingredient_match or name_match or desc_match:
-                match_score = 0
-                for ing in ingredients_lower:
-                    if any(ing in recipe_ing for recipe_ing in recipe_ingredients_lower):
-                        match_score += 2
-                    if ing in recipe_name:
-                        match_score += 1
-                    if ing in recipe_description:
-                        match_score += 0.5
-                
-                recipe['match_score'] = match_score
-                matching_recipes.append(recipe)
-        
-        matching_recipes.sort(key=lambda x: x.get('match_score', 0), reverse=True)
-        
-        return matching_recipes[:limit]
+        return index.search(ingredients_lower, limit)
         
     except Exception as e:
         logger.error(f"Error searching recipes by ingredients: {str(e)}")
@@ -119,47 +594,12 @@ def search_recipes_by_ingredients(ingredients: List[str], limit: int = 10) -> Li
 
 def search_menu_by_ingredients(ingredients: List[str], limit: int = 10) -> List[Dict]:
     try:
-        menu_items = fetch_menu_items()
-        if not menu_items:
+        index = _get_search_index('menu')
+        if not index.docs:
             return []
         
-        matching_items = []
         ingredients_lower = [ing.lower().strip() for ing in ingredients]
-        
-        for item in menu_items:
-            item_name = item.get('name', '').lower()
-            item_description = item.get('description', '').lower()
-            item_ingredients = item.get('ingredients', [])
-            
-            if isinstance(item_ingredients, list):
-                item_ingredients_lower = [str(ing).lower() for ing in item_ingredients]
-            else:
-                item_ingredients_lower = [str(item_ingredients).lower()]
-            
-            ingredient_match = any(
-                any(search_ing in item_ing for item_ing in item_ingredients_lower)
-                for search_ing in ingredients_lower
-            )
-            
-            name_match = any(ing in item_name for ing in ingredients_lower)
-            desc_match = any(ing in item_description for ing in ingredients_lower)
-            
-            if ingredient_match or name_match or desc_match:
-                match_score = 0
-                for ing in ingredients_lower:
-                    if any(ing in item_ing for item_ing in item_ingredients_lower):
-                        match_score += 2
-                    if ing in item_name:
-                        match_score += 1
-                    if ing in item_description:
-                        match_score += 0.5
-                
-                item['match_score'] = match_score
-                matching_items.append(item)
-        
-        matching_items.sort(key=lambda x: x.get('match_score', 0), reverse=True)
-        
-        return matching_items[:limit]
+        return index.search(ingredients_lower, limit)
         
     except Exception as e:
         logger.error(f"Error searching menu by ingredients: {str(e)}")
@@ -181,7 +621,9 @@ def get_popular_recipes(limit: int = 20) -> List[Dict]:
 
 def get_menu_categories() -> List[str]:
     try:
-        menu_items = fetch_menu_items()
+        menu_items = _peek_snapshot_docs('menu')
+        if menu_items is None:
+            menu_items = query_collection('menu', fields=['category'])
         if not menu_items:
             return []
         
@@ -199,17 +641,24 @@ def get_menu_categories() -> List[str]:
 
 def get_recipes_by_category(category: str, limit: int = 10) -> List[Dict]:
     try:
-        recipes = fetch_recipe_archive()
-        if not recipes:
-            return []
-        
-        category_recipes = []
-        for recipe in recipes:
+        category_variants = list(dict.fromkeys([category, category.strip(), category.title(), category.lower(), category.upper()]))
+        category_recipes = query_collection(
+            'recipe_archive', filters=[('category', 'in', category_variants)], limit=limit
+        )
+        if len(category_recipes) >= limit:
+            return category_recipes
+        
+        # Top up with substring matches ("Main" also finds "Main Course") from the cached archive
+        seen_ids = {recipe.get('id') for recipe in category_recipes}
+        for recipe in fetch_recipe_archive():
+            if len(category_recipes) >= limit:
+                break
             recipe_category = recipe.get('category', '').lower()
-            if category.lower() in recipe_category:
+            if category.lower() in recipe_category and recipe.get('id') not in seen_ids:
                 category_recipes.append(recipe)
+                seen_ids.add(recipe.get('id'))
         
-        return category_recipes[:limit]
+        return category_recipes
         
     except Exception as e:
         logger.error(f"Error getting recipes by category: {str(e)}")
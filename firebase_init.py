@@ -1,15 +1,113 @@
+import logging
+import threading
 import firebase_admin
-from firebase_admin import credentials
+from firebase_admin import credentials, firestore, firestore_async
 import streamlit as st
 
-def init_firebase():
-    if not firebase_admin._apps:
+logger = logging.getLogger(__name__)
+
+MAIN_APP = firebase_admin._DEFAULT_APP_NAME
+EVENT_APP = 'event_app'
+
+# app name -> (secrets section, label used in error messages)
+_APP_CONFIG = {
+    MAIN_APP: ('firebase', 'Main'),
+    EVENT_APP: ('event_firebase', 'Event'),
+}
+
+_registry_lock = threading.RLock()
+_clients = {}
+_async_clients = {}
+_metrics = {
+    'app_inits': 0,
+    'init_failures': 0,
+    'client_creates': 0,
+    'client_hits': 0,
+    'async_client_creates': 0,
+}
+
+def init_firebase_app(app_name: str = MAIN_APP) -> bool:
+    if app_name in firebase_admin._apps:
+        return True
+
+    with _registry_lock:
+        if app_name in firebase_admin._apps:
+            return True
+
+        secrets_key, label = _APP_CONFIG[app_name]
         try:
-            config_dict = dict(st.secrets["firebase"])
+            config_dict = dict(st.secrets[secrets_key])
             cred = credentials.Certificate(config_dict)
-            firebase_admin.initialize_app(cred)
+            if app_name == MAIN_APP:
+                firebase_admin.initialize_app(cred)
+            else:
+                firebase_admin.initialize_app(cred, name=app_name)
+            _metrics['app_inits'] += 1
+            logger.info(f"Initialized Firebase app '{app_name}'")
             return True
         except Exception as e:
-            st.error(f"Couldn't initialize Main firebase {str(e)}")
+            _metrics['init_failures'] += 1
+            st.error(f"Couldn't initialize {label} firebase: {str(e)}")
             return False
-    return True
+
+def init_firebase():
+    return init_firebase_app(MAIN_APP)
+
+def get_client(app_name: str = MAIN_APP):
+    client = _clients.get(app_name)
+    if client is not None:
+        _metrics['client_hits'] += 1
+        return client
+
+    with _registry_lock:
+        client = _clients.get(app_name)
+        if client is not None:
+            _metrics['client_hits'] += 1
+            return client
+
+        if not init_firebase_app(app_name):
+            return None
+
+        try:
+            client = firestore.client(app=firebase_admin.get_app(name=app_name))
+        except Exception as e:
+            logger.error(f"Error creating Firestore client for '{app_name}': {str(e)}")
+            return None
+
+        _clients[app_name] = client
+        _metrics['client_creates'] += 1
+        logger.info(f"Created Firestore client for '{app_name}'")
+        return client
+
+def get_async_client(app_name: str = MAIN_APP):
+    # Async clients are bound to the event loop they are first used on, so callers
+    # must only use them from the firebase_data background loop.
+    with _registry_lock:
+        client = _async_clients.get(app_name)
+        if client is not None:
+            return client
+
+        if not init_firebase_app(app_name):
+            return None
+
+        try:
+            client = firestore_async.client(app=firebase_admin.get_app(name=app_name))
+        except Exception as e:
+            logger.error(f"Error creating async Firestore client for '{app_name}': {str(e)}")
+            return None
+
+        _async_clients[app_name] = client
+        _metrics['async_client_creates'] += 1
+        return client
+
+def warm_up_firebase():
+    return {app_name: get_client(app_name) is not None for app_name in _APP_CONFIG}
+
+def get_registry_metrics():
+    with _registry_lock:
+        metrics = dict(_metrics)
+        metrics['cached_clients'] = sorted(_clients.keys())
+
+    lookups = metrics['client_hits'] + metrics['client_creates']
+    metrics['client_reuse_ratio'] = metrics['client_hits'] / lookups if lookups else 0.0
+    return metrics
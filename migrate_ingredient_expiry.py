@@ -0,0 +1,27 @@
+"""
+One-time migration that adds normalized expiry, search and base quantity fields to ingredient_inventory.
+Reads Firebase credentials from .streamlit/secrets.toml like the app does.
+
+Usage:
+    python migrate_ingredient_expiry.py [--dry-run]
+"""
+
+import argparse
+import logging
+
+from modules.ingredients_management import backfill_ingredient_query_fields
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Add expiry_at, expiry_day, name search and base quantity fields to ingredients")
+    arg_parser.add_argument("--dry-run", action="store_true", help="Only count the documents that would be updated")
+    args = arg_parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    updated, errors = backfill_ingredient_query_fields(dry_run=args.dry_run)
+    action = "Would update" if args.dry_run else "Updated"
+    print(f"{action} {updated} ingredients ({errors} errors)")
+    return 1 if errors else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -3,8 +3,7 @@ import uuid
 import logging
 from typing import Dict, Optional, Tuple
 import datetime
-from firebase_admin import firestore
-from firebase_init import init_firebase
+from firebase_init import get_client, MAIN_APP
 
 logger = logging.getLogger(__name__)
 
@@ -27,8 +26,7 @@ def validate_email(email: str) -> Tuple[bool, str]:
     return True, ""
 
 def get_firestore_db():
-    init_firebase()
-    return firestore.client()
+    return get_client(MAIN_APP)
 
 def email_exists(email: str) -> bool:
     try:
@@ -4,13 +4,15 @@ Handles menu generation, chef submissions, and analytics using event_firebase co
 """
 
 import streamlit as st
-import google.generativeai as genai
+from modules.llm_gateway import get_gemini_model
 import re
 import json
-from datetime import datetime
-from dateutil import parser
-import firebase_admin
-from firebase_admin import firestore
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from firebase_init import get_client, EVENT_APP
+from firebase_data import get_inventory_frame
+from modules.quantity_units import parse_to_base
 import logging
 
 logger = logging.getLogger(__name__)
@@ -22,7 +24,7 @@ REQUIRED_MENU_FIELDS = [
 ]
 
 # Optional fields that will be set if missing
-OPTIONAL_MENU_FIELDS = ["rating", "rating_comment"]
+OPTIONAL_MENU_FIELDS = ["rating", "rating_comment", "ingredient_quantities"]
 
 DIET_TYPES = [
     "Vegan", "Vegetarian", "Keto", "Gluten-Free", "Nut-Free",
@@ -34,31 +36,42 @@ MENU_CATEGORIES = [
     "Special Items", "Seasonal Items", "Chef Special Items"
 ]
 
+# Weekly menu shards: (shard name, dish category value, dishes requested)
+MENU_SHARDS = [
+    ("Starters", "Starter", "8-10"),
+    ("Main Course", "Main Course", "15-18"),
+    ("Desserts", "Dessert", "6-8"),
+    ("Beverages", "Beverage", "6-8"),
+    ("Special", "Special Items", "4-6"),
+]
+
+# Capacity planning reads these per-portion amounts, so every generated dish must list them
+INGREDIENT_QUANTITIES_INSTRUCTION = (
+    'Give "ingredient_quantities" the amount of every listed ingredient needed for ONE portion, '
+    'keyed by the exact ingredient name, using g, kg, ml, l or pcs (e.g. "120 g", "2 pcs").'
+)
+
+MENU_SHARD_WORKERS = 4
+MENU_SHARD_ATTEMPTS = 2
+
+# Firestore allows at most 500 writes per batch commit
+FIRESTORE_BATCH_LIMIT = 500
+
 def get_chef_firebase_db():
     """Get Firestore client for chef services using event_firebase configuration"""
-    try:
-        # Use the event Firebase app
-        if 'event_app' in [app.name for app in firebase_admin._apps.values()]:
-            return firestore.client(app=firebase_admin.get_app(name='event_app'))
-        else:
-            # Initialize event Firebase if not already done
-            from modules.event_planner import init_event_firebase
-            init_event_firebase()
-            return firestore.client(app=firebase_admin.get_app(name='event_app'))
-    except Exception as e:
-        logger.error(f"Error getting chef Firebase DB: {str(e)}")
+    db = get_client(EVENT_APP)
+    if not db:
+        logger.error("Error getting chef Firebase DB")
         st.error("Failed to connect to database. Please check your Firebase configuration.")
-        return None
+    return db
 
 def configure_gemini_ai():
     """Configure Gemini AI using Streamlit secrets"""
     try:
-        api_key = st.secrets.get("GEMINI_API_KEY")
-        if not api_key:
+        model = get_gemini_model()
+        if not model:
             raise ValueError("GEMINI_API_KEY not found in Streamlit secrets")
-        
-        genai.configure(api_key=api_key)
-        return genai.GenerativeModel("gemini-1.5-flash")
+        return model
     except Exception as e:
         logger.error(f"Error configuring Gemini AI: {str(e)}")
         st.error("Failed to configure AI service. Please check your API key configuration.")
@@ -100,6 +113,8 @@ def validate_and_fix_dish(dish):
                 dish[field] = None
             elif field == "rating_comment":
                 dish[field] = ""
+            elif field == "ingredient_quantities":
+                dish[field] = {}
             logger.info(f"Added missing optional field '{field}' to dish '{dish.get('name')}'")
     
     # Ensure ingredients is a list
@@ -114,8 +129,331 @@ def validate_and_fix_dish(dish):
     if isinstance(dish.get("types"), str):
         dish["types"] = [dish["types"]]
     
+    dish["ingredient_quantities"] = normalize_ingredient_quantities(dish["ingredient_quantities"])
+    
     return dish, []
 
+def normalize_ingredient_quantities(quantities) -> dict:
+    """Keep the per-portion amounts that parse to a known unit, keyed by ingredient name"""
+    if not isinstance(quantities, dict):
+        return {}
+    
+    normalized = {}
+    for name, quantity in quantities.items():
+        name = str(name).strip()
+        base_quantity, _ = parse_to_base(str(quantity))
+        if name and base_quantity:
+            normalized[name] = str(quantity).strip()
+        else:
+            logger.info(f"Dropped unparseable quantity '{quantity}' for ingredient '{name}'")
+    return normalized
+
+def parse_ingredient_quantities(text: str) -> dict:
+    """Parse 'Ingredient: amount' entries, one per line or comma separated"""
+    quantities = {}
+    for entry in re.split(r"[\n,]", text or ""):
+        name, separator, quantity = entry.partition(":")
+        if separator:
+            quantities[name.strip()] = quantity.strip()
+    return normalize_ingredient_quantities(quantities)
+
+def iter_json_array_objects(text_chunks):
+    """Yield each object of the first top-level JSON array as soon as it is complete"""
+    buffer = ""
+    scanned = 0
+    started = False
+    depth = 0
+    in_string = False
+    escape = False
+    obj_start = None
+    
+    for chunk in text_chunks:
+        buffer += chunk
+        
+        for i in range(scanned, len(buffer)):
+            char = buffer[i]
+            
+            if in_string:
+                if escape:
+                    escape = False
+                elif char == "\\":
+                    escape = True
+                elif char == '"':
+                    in_string = False
+                continue
+            
+            if not started:
+                if char == "[":
+                    started = True
+                continue
+            
+            if char == '"':
+                in_string = True
+            elif char == "{":
+                if depth == 0:
+                    obj_start = i
+                depth += 1
+            elif char == "}" and depth > 0:
+                depth -= 1
+                if depth == 0 and obj_start is not None:
+                    try:
+                        yield json.loads(buffer[obj_start:i + 1])
+                    except json.JSONDecodeError as e:
+                        logger.warning(f"Skipping malformed dish object in stream: {str(e)}")
+                    obj_start = None
+            elif char == "]" and depth == 0:
+                return
+        
+        # Drop text that can no longer be part of an object
+        if obj_start is None:
+            buffer = ""
+        else:
+            buffer = buffer[obj_start:]
+            obj_start = 0
+        scanned = len(buffer)
+
+def generate_dish_stream(prompt: str):
+    """Stream dishes from Gemini, yielding each validated dish as soon as it is parsed.
+
+    Errors are re-raised after logging so callers can tell a truncated menu from a complete one.
+    """
+    try:
+        model = configure_gemini_ai()
+        if not model:
+            return
+        
+        response = model.generate_content(prompt, stream=True)
+        yielded = set()
+        
+        # A rate-limited stream restarts from scratch; dishes already yielded are skipped
+        for chunks in response.attempts():
+            text_chunks = (chunk.text for chunk in chunks if getattr(chunk, "text", None))
+            
+            for dish in iter_json_array_objects(text_chunks):
+                if not isinstance(dish, dict):
+                    continue
+                fixed_dish, missing = validate_and_fix_dish(dish)
+                if not fixed_dish:
+                    continue
+                key = normalize_dish_name(fixed_dish.get("name", ""))
+                if key in yielded:
+                    continue
+                yielded.add(key)
+                yield fixed_dish
+    except Exception as e:
+        logger.error(f"Gemini streaming error: {str(e)}")
+        raise
+
+def _dish_structure_example(category: str = "Main Course") -> str:
+    """JSON example of a single dish used in menu prompts"""
+    return f"""{{
+    "name": "Dish Name",
+    "description": "Detailed description",
+    "ingredients": ["ingredient1", "ingredient2"],
+    "ingredient_quantities": {{"ingredient1": "120 g", "ingredient2": "2 pcs"}},
+    "cook_time": "30 minutes",
+    "cuisine": "Italian",
+    "diet": ["Vegetarian"],
+    "category": "{category}",
+    "types": ["Seasonal Items"],
+    "source": "Gemini",
+    "rating": null,
+    "rating_comment": "",
+    "timestamp": "{datetime.now().isoformat()}"
+}}"""
+
+def build_weekly_menu_prompt(ingredient_names, priority_ingredients):
+    """Build the single-request prompt for a full weekly menu"""
+    return f"""
+You are an AI chef. Generate a full weekly restaurant menu (at least 35 dishes).
+Include:
+- Starters (8-10 dishes)
+- Main Course (15-18 dishes) 
+- Desserts (6-8 dishes)
+- Beverages (6-8 dishes)
+- Special dishes using: {', '.join(priority_ingredients)}
+- Seasonal dishes based on the current month and available ingredients: {', '.join(ingredient_names)}
+- Normal dishes based on the same available ingredients
+
+Use this EXACT structure for each dish:
+{_dish_structure_example()}
+
+{INGREDIENT_QUANTITIES_INSTRUCTION}
+
+Return ONLY a JSON array of dishes. No explanation or additional text.
+"""
+
+def build_menu_shard_prompt(shard_name, category, dish_count, ingredient_names, priority_ingredients):
+    """Build the prompt for one category shard of the weekly menu"""
+    if shard_name == "Special":
+        featured = ", ".join(priority_ingredients) or "the freshest available ingredients"
+        focus = f"Special dishes that feature these priority ingredients: {featured}"
+    else:
+        focus = f"{shard_name} dishes, mixing seasonal dishes for the current month with normal dishes"
+    
+    return f"""
+You are an AI chef planning one section of a weekly restaurant menu.
+Generate {dish_count} {focus}.
+Use the available ingredients: {', '.join(ingredient_names)}
+
+Every dish must have "category": "{category}".
+
+Use this EXACT structure for each dish:
+{_dish_structure_example(category)}
+
+{INGREDIENT_QUANTITIES_INSTRUCTION}
+
+Return ONLY a JSON array of dishes. No explanation or additional text.
+"""
+
+def normalize_dish_name(name) -> str:
+    """Normalize a dish name for de-duplication"""
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", str(name).lower()).split())
+
+def merge_menu_dishes(existing_dishes, new_dishes):
+    """Append new dishes, skipping any whose normalized name is already present"""
+    seen = {normalize_dish_name(dish.get("name", "")) for dish in existing_dishes}
+    merged = list(existing_dishes)
+    for dish in new_dishes:
+        key = normalize_dish_name(dish.get("name", ""))
+        if key and key not in seen:
+            seen.add(key)
+            merged.append(dish)
+    return merged
+
+def generate_menu_shard(prompt: str, category: str):
+    """Generate and validate one menu shard, retrying malformed responses"""
+    for attempt in range(1, MENU_SHARD_ATTEMPTS + 1):
+        dishes = generate_dish(prompt)
+        if isinstance(dishes, list):
+            valid_dishes = []
+            for dish in dishes:
+                if not isinstance(dish, dict):
+                    continue
+                dish.setdefault("category", category)
+                fixed_dish, missing = validate_and_fix_dish(dish)
+                if fixed_dish:
+                    valid_dishes.append(fixed_dish)
+            if valid_dishes:
+                return valid_dishes
+        logger.warning(f"Shard '{category}' attempt {attempt} returned no valid dishes")
+    return []
+
+def generate_menu_sharded(ingredient_names, priority_ingredients, max_workers: int = MENU_SHARD_WORKERS):
+    """Generate every menu shard concurrently, yielding (shard name, dishes) as each finishes"""
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {}
+        for shard_name, category, dish_count in MENU_SHARDS:
+            prompt = build_menu_shard_prompt(shard_name, category, dish_count, ingredient_names, priority_ingredients)
+            futures[executor.submit(generate_menu_shard, prompt, category)] = shard_name
+        
+        for future in as_completed(futures):
+            shard_name = futures[future]
+            try:
+                dishes = future.result()
+            except Exception as e:
+                logger.error(f"Menu shard '{shard_name}' failed: {str(e)}")
+                dishes = []
+            logger.info(f"Menu shard '{shard_name}' finished with {len(dishes)} dishes")
+            yield shard_name, dishes
+
+def menu_dish_doc_id(dish, reference_date=None) -> str:
+    """Deterministic document ID for a dish within its menu week"""
+    reference_date = reference_date or datetime.now()
+    week_start = (reference_date - timedelta(days=reference_date.weekday())).strftime("%Y-%m-%d")
+    digest = hashlib.sha1(f"{week_start}:{normalize_dish_name(dish.get('name', ''))}".encode()).hexdigest()
+    return f"{week_start}_{digest[:16]}"
+
+def save_dishes_batched(db, dishes, collections=("menu", "recipe_archive"), on_progress=None):
+    """Write dishes to each collection using chunked batch commits.
+
+    Returns (saved, errors): saved is a list of (doc_id, dish) and errors a list of (dish name, reason).
+    """
+    saved = []
+    errors = []
+    pending = []
+    seen_ids = set()
+    
+    for dish in dishes:
+        name = dish.get("name", "Unknown")
+        missing = [f for f in REQUIRED_MENU_FIELDS if f not in dish or not dish[f]]
+        if missing:
+            logger.warning(f"Skipping dish '{name}' due to missing fields: {missing}")
+            errors.append((name, f"missing fields: {', '.join(missing)}"))
+            continue
+        
+        doc_id = menu_dish_doc_id(dish)
+        if doc_id in seen_ids:
+            errors.append((name, "duplicate dish name"))
+            continue
+        seen_ids.add(doc_id)
+        pending.append((doc_id, dish))
+    
+    dishes_per_batch = max(1, FIRESTORE_BATCH_LIMIT // len(collections))
+    chunks = [pending[i:i + dishes_per_batch] for i in range(0, len(pending), dishes_per_batch)]
+    
+    for chunk_index, chunk in enumerate(chunks):
+        batch = db.batch()
+        for doc_id, dish in chunk:
+            for collection_name in collections:
+                batch.set(db.collection(collection_name).document(doc_id), dish)
+        
+        try:
+            batch.commit()
+            saved.extend(chunk)
+            logger.info(f"Committed batch {chunk_index + 1}/{len(chunks)} with {len(chunk)} dishes")
+        except Exception as e:
+            logger.error(f"Error committing batch {chunk_index + 1}/{len(chunks)}: {str(e)}")
+            errors.extend((dish.get("name", "Unnamed"), str(e)) for _, dish in chunk)
+        
+        if on_progress:
+            on_progress((chunk_index + 1) / len(chunks))
+    
+    return saved, errors
+
+def delete_collection_docs(db, collection_name: str, page_size: int = FIRESTORE_BATCH_LIMIT):
+    """Delete every document in a collection, paging over references and committing one batch per page.
+
+    Returns (deleted count, list of error messages).
+    """
+    collection = db.collection(collection_name)
+    deleted = 0
+    errors = []
+    last_doc = None
+    
+    while True:
+        # Empty projection: only document references come back, no field payload
+        query = collection.select([]).order_by("__name__").limit(page_size)
+        if last_doc is not None:
+            query = query.start_after(last_doc)
+        
+        try:
+            page = list(query.stream())
+        except Exception as e:
+            logger.error(f"Error listing {collection_name} documents: {str(e)}")
+            errors.append(str(e))
+            break
+        
+        if not page:
+            break
+        last_doc = page[-1]
+        
+        batch = db.batch()
+        for doc in page:
+            batch.delete(doc.reference)
+        try:
+            batch.commit()
+            deleted += len(page)
+        except Exception as e:
+            logger.error(f"Error deleting page of {len(page)} {collection_name} documents: {str(e)}")
+            errors.append(str(e))
+        
+        if len(page) < page_size:
+            break
+    
+    logger.info(f"Deleted {deleted} documents from {collection_name}")
+    return deleted, errors
+
 def generate_dish_rating(dish_name, description, ingredients, cook_time, cuisine):
     """Generate AI rating for a chef's dish submission"""
     prompt = f"""
@@ -163,37 +501,21 @@ def parse_ingredients(db):
         return []
         
     try:
-        ingredients_ref = db.collection("ingredient_inventory")
-        ingredients = []
+        frame = get_inventory_frame()
+        frame = frame[(frame["Ingredient"] != "") & (frame["Expiry Date"] != "") & frame["expiry_day"].notna()]
 
-        for doc in ingredients_ref.stream():
-            data = doc.to_dict()
-
-            name = data.get("Ingredient", "").strip()
-            expiry_str = data.get("Expiry Date", "").strip()
-            quantity_raw = data.get("Quantity", "").strip()
-
-            # Parse quantity: extract number from string like "4 kg"
-            try:
-                quantity = float("".join(c for c in quantity_raw if c.isdigit() or c == '.'))
-            except:
-                quantity = 0
-
-            if not name or not expiry_str:
-                continue
-
-            try:
-                expiry_date = parser.parse(expiry_str)
-                days_to_expiry = (expiry_date - datetime.now()).days
-            except Exception:
-                continue
-
-            ingredients.append({
+        ingredients = [
+            {
                 "name": name,
                 "expiry_date": expiry_str,
-                "quantity": quantity,
-                "days_to_expiry": days_to_expiry
-            })
+                "quantity": float(quantity),
+                "days_to_expiry": int(days_to_expiry)
+            }
+            for name, expiry_str, quantity, days_to_expiry in zip(
+                frame["Ingredient"], frame["Expiry Date"],
+                frame["base_quantity"].fillna(0), frame["days_until_expiry"]
+            )
+        ]
 
         logger.info(f"Parsed {len(ingredients)} ingredients from inventory")
         return ingredients
@@ -1,12 +1,10 @@
 import streamlit as st
-import google.generativeai as genai
-import os
+from modules.llm_gateway import get_gemini_model
 import json
 import re
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional
-import firebase_admin
-from firebase_admin import firestore, credentials
+from firebase_init import init_firebase_app, get_client, EVENT_APP
 import logging
 import pandas as pd
 from fpdf import FPDF
@@ -18,44 +16,26 @@ from modules.leftover import (
     generate_dynamic_quiz_questions, calculate_quiz_score, update_user_stats
 )
 from firebase_data import (
-    fetch_recipe_archive, fetch_menu_items, get_popular_recipes,
+    fetch_archive_and_menu, get_popular_recipes,
     format_recipe_for_display, format_menu_item_for_display
 )
+from modules.menu_feasibility import plan_menu_capacity, allocate_portions
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger('event_planner')
 
 def init_event_firebase():
-    if not firebase_admin._apps or 'event_app' not in [app.name for app in firebase_admin._apps.values()]:
-        try:
-            config_dict = dict(st.secrets["event_firebase"])
-            cred = credentials.Certificate(config_dict)
-            firebase_admin.initialize_app(cred, name="event_app")
-            return True
-        except Exception as e:
-            st.error(f"Couldn't initialize Event firebase: {str(e)}")
-            return False
-        return True
-    
-
+    return init_firebase_app(EVENT_APP)
 
 def get_event_db():
-    if init_event_firebase():
-        return firestore.client(app=firebase_admin.get_app(name='event_app'))
-    return None
+    return get_client(EVENT_APP)
 
 def configure_ai_model():
     try:
-        api_key = os.environ.get("GEMINI_API_KEY")
-        if not api_key:
-            api_key = st.secrets.get("GEMINI_API_KEY")
-            
-        if not api_key:
+        model = get_gemini_model()
+        if not model:
             st.error("GEMINI_API_KEY not found!")
             return None
-            
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-1.5-flash')
         return model
     except Exception as e:
         logger.error(f"Error configuring AI model: {str(e)}")
@@ -224,8 +204,7 @@ def clean_text_for_pdf(text: str) -> str:
 
 def get_firebase_menu_suggestions(guest_count: int, event_type: str = "") -> List[str]:
     try:
-        recipes = fetch_recipe_archive()
-        menu_items = fetch_menu_items()
+        recipes, menu_items = fetch_archive_and_menu()
         
         suggestions = []
         
@@ -236,6 +215,23 @@ def get_firebase_menu_suggestions(guest_count: int, event_type: str = "") -> Lis
                 suggestions.append(f"Recipe: {formatted}")
         
         if menu_items:
+            # Prefer dishes the kitchen has enough stock to serve every guest
+            capacity = plan_menu_capacity()
+            if capacity:
+                # Dishes without listed quantities have no plan and are kept as they are
+                planned = [item for item in menu_items if item.get('name') in capacity]
+                servable = [item for item in planned if capacity[item.get('name')]['portions'] >= guest_count]
+                servable.sort(key=lambda item: -capacity[item.get('name')]['portions'])
+                
+                # Dishes share ingredients, so check the stock covers them together
+                allocation = allocate_portions({item.get('name'): guest_count for item in servable})
+                servable = [item for item in servable if allocation.get(item.get('name'), 0) >= guest_count]
+                servable += [item for item in menu_items if item.get('name') not in capacity]
+                if servable:
+                    menu_items = servable
+                else:
+                    logger.warning(f"No menu item has {guest_count} portions in stock")
+            
             popular_menu = menu_items[:5]
             for item in popular_menu:
                 formatted = format_menu_item_for_display(item)
@@ -493,8 +489,7 @@ def event_planner():
     """)
     
     try:
-        recipes = fetch_recipe_archive()
-        menu_items = fetch_menu_items()
+        recipes, menu_items = fetch_archive_and_menu()
         
         col1, col2 = st.columns(2)
         with col1:
@@ -8,45 +8,53 @@ import logging
 from typing import List, Dict, Optional, Tuple
 from datetime import datetime, date, timedelta
 import firebase_admin
-from firebase_admin import firestore
-import google.generativeai as genai
-import os
+from modules.llm_gateway import get_gemini_model, get_gemini_api_key
 import uuid
+import hashlib
+from firebase_init import get_client, EVENT_APP
+from modules.quantity_units import base_quantity_fields
+from firebase_data import (
+    parse_expiry_string, expiry_fields, ingredient_expiry_day, today_epoch_day,
+    get_inventory_frame, inventory_records, invalidate_collection_cache, get_facet_values,
+    get_snapshot_derived, get_collection_version, INVENTORY_COLLECTION
+)
 
 logger = logging.getLogger(__name__)
 
+ALTERNATIVES_CACHE_COLLECTION = 'ingredient_alternatives_cache'
+ALTERNATIVES_CACHE_TTL_DAYS = 30
+
+# Inventory query engine: page size for the view tab, prefix length indexed for search,
+# and the days-until-expiry threshold for "expiring soon"
+INVENTORY_PAGE_SIZE = 50
+NAME_PREFIX_MAX_LENGTH = 20
+EXPIRING_SOON_DAYS = 7
+BACKFILL_BATCH_SIZE = 400
+
+# Fields every document needs before the indexed queries can see it
+QUERY_FIELDS = ('name_lower', 'name_prefixes', 'type_lower', 'expiry_day')
+UNMIGRATED_COUNT_NAME = 'unmigrated_query_fields'
+INDEX_DEPLOY_HINT = "Deploy firestore.indexes.json with `firebase deploy --only firestore:indexes`."
+
+_alternatives_memory_cache = {}
+_alternatives_cache_stats = {'hits': 0, 'misses': 0}
+_ingredient_count_cache = {'version': None, 'counts': {}}
+
 def get_event_firestore_db():
     """Get the Firestore client for ingredient management"""
-    try:
-        if 'event_app' in [app.name for app in firebase_admin._apps.values()]:
-            logger.info("Using existing event_app Firestore client")
-            return firestore.client(app=firebase_admin.get_app(name='event_app'))
-        else:
-            from modules.event_planner import init_event_firebase
-            if init_event_firebase():
-                logger.info("Initialized new event_app Firestore client")
-                return firestore.client(app=firebase_admin.get_app(name='event_app'))
-            logger.error("init_event_firebase returned False")
-            return None
-    except Exception as e:
-        logger.error(f"Error getting event Firestore client: {str(e)}")
-        return None
+    db = get_client(EVENT_APP)
+    if not db:
+        logger.error("Event Firestore client unavailable")
+    return db
 
 def validate_date_format(date_string: str) -> bool:
     """Validate date format dd/mm/yyyy"""
-    try:
-        datetime.strptime(date_string, "%d/%m/%Y")
-        return True
-    except ValueError:
-        return False
+    return parse_expiry_string(date_string) is not None
 
 def is_future_date(date_string: str) -> bool:
     """Check if date is in the future"""
-    try:
-        input_date = datetime.strptime(date_string, "%d/%m/%Y").date()
-        return input_date > date.today()
-    except ValueError:
-        return False
+    input_date = parse_expiry_string(date_string)
+    return input_date is not None and input_date > date.today()
 
 def validate_quantity(quantity_str: str) -> Tuple[bool, float]:
     """Validate quantity is positive number"""
@@ -58,76 +66,297 @@ def validate_quantity(quantity_str: str) -> Tuple[bool, float]:
     except ValueError:
         return False, 0
 
-def get_all_ingredients(search_term: str = "", expiry_filter: str = "all", type_filter: str = "all") -> List[Dict]:
-    """Get all ingredients with optional filtering"""
+def _name_prefixes(name_lower: str) -> List[str]:
+    """Get the prefixes of a name and of each word in it, used for indexed search"""
+    prefixes = set()
+    for part in [name_lower] + name_lower.split():
+        for end in range(1, min(len(part), NAME_PREFIX_MAX_LENGTH) + 1):
+            prefixes.add(part[:end])
+    return sorted(prefixes)
+
+def name_matches_search(name, search: str) -> bool:
+    """Match the indexed search in memory: a prefix of the name or of one of its words"""
+    name_lower = " ".join(str(name).lower().split())
+    prefix = search[:NAME_PREFIX_MAX_LENGTH]
+    if not any(part.startswith(prefix) for part in [name_lower] + name_lower.split()):
+        return False
+    # Prefixes are capped, so longer search terms are checked in full
+    return len(search) <= NAME_PREFIX_MAX_LENGTH or search in name_lower
+
+def normalize_ingredient_type(ingredient_type) -> str:
+    """Normalize a type for case-insensitive filtering"""
+    return " ".join(str(ingredient_type or "").lower().split())
+
+def build_ingredient_query_fields(ingredient_name: str, expiry_date: str, ingredient_type: str = "") -> Dict:
+    """Get the derived fields that the inventory query engine filters and sorts on"""
+    name_lower = " ".join(ingredient_name.strip().lower().split())
+    fields = {
+        'name_lower': name_lower,
+        'name_prefixes': _name_prefixes(name_lower),
+        'type_lower': normalize_ingredient_type(ingredient_type),
+    }
+    fields.update(expiry_fields(expiry_date))
+    return fields
+
+def _expiry_bounds(expiry_filter: str) -> Tuple[Optional[int], Optional[int]]:
+    """Get the [lower, upper) expiry_day range for an expiry filter"""
+    today = today_epoch_day()
+    if expiry_filter == "expired":
+        return None, today
+    if expiry_filter == "expiring_soon":
+        return today, today + EXPIRING_SOON_DAYS + 1
+    if expiry_filter == "fresh":
+        return today + EXPIRING_SOON_DAYS + 1, None
+    return None, None
+
+def _build_ingredient_query(db, search_term: str = "", expiry_filter: str = "all", type_filter: str = "all"):
+    """Build the Firestore query for the inventory filters, ordered by expiry"""
+    query = db.collection('ingredient_inventory')
+    
+    search = " ".join(search_term.strip().lower().split())
+    if search:
+        query = query.where('name_prefixes', 'array_contains', search[:NAME_PREFIX_MAX_LENGTH])
+    
+    if type_filter != "all":
+        query = query.where('type_lower', '==', normalize_ingredient_type(type_filter))
+    
+    lower, upper = _expiry_bounds(expiry_filter)
+    if lower is not None:
+        query = query.where('expiry_day', '>=', lower)
+    if upper is not None and lower is None:
+        # Unparseable dates are stored as null, which a range filter drops but which
+        # sorts before every number, so ending the ordered query keeps them as expired
+        query = query.order_by('expiry_day').order_by('__name__')
+        return query.end_before({'expiry_day': upper})
+    if upper is not None:
+        query = query.where('expiry_day', '<', upper)
+    
+    return query.order_by('expiry_day').order_by('__name__')
+
+def _ingredient_from_doc(doc, today: int) -> Dict:
+    """Convert an inventory document to the dict used by the views, with expiry status"""
+    data = doc.to_dict()
+    data['doc_id'] = doc.id
+    
+    expiry_day = ingredient_expiry_day(data)
+    if expiry_day is not None:
+        days_until_expiry = expiry_day - today
+        data['days_until_expiry'] = days_until_expiry
+        data['expiry_status'] = get_expiry_status(days_until_expiry)
+    else:
+        data['days_until_expiry'] = -999
+        data['expiry_status'] = 'invalid'
+    
+    # Handle missing Unit field
+    data['Unit'] = data.get('Unit', 'N/A')
+    return data
+
+def _count_unmigrated(docs: List[Dict]) -> int:
+    return sum(1 for doc in docs if any(field not in doc for field in QUERY_FIELDS))
+
+def count_unmigrated_ingredients() -> int:
+    """Count inventory documents that predate the query fields and are invisible to indexed queries"""
+    try:
+        return get_snapshot_derived(INVENTORY_COLLECTION, UNMIGRATED_COUNT_NAME, _count_unmigrated)
+    except Exception as e:
+        logger.error(f"Error checking ingredient query fields: {str(e)}")
+        return 0
+
+def _filter_inventory_frame(search_term: str = "", expiry_filter: str = "all", type_filter: str = "all"):
+    """Apply the view filters to the in-memory inventory frame, soonest expiry first"""
+    frame = get_inventory_frame()
+    
+    search = " ".join(search_term.strip().lower().split())
+    if search:
+        frame = frame[frame['Ingredient'].map(lambda name: name_matches_search(name, search))]
+    
+    if type_filter != "all":
+        frame = frame[frame['Type'].map(normalize_ingredient_type) == normalize_ingredient_type(type_filter)]
+    
+    lower, upper = _expiry_bounds(expiry_filter)
+    if lower is not None:
+        frame = frame[frame['expiry_day'] >= lower]
+    if upper is not None and lower is None:
+        # Unparseable dates count as expired, as in the indexed query
+        frame = frame[frame['expiry_day'].isna() | (frame['expiry_day'] < upper)]
+    elif upper is not None:
+        frame = frame[frame['expiry_day'] < upper]
+    
+    frame = frame.assign(Unit=frame['Unit'].replace('', 'N/A'))
+    return frame.sort_values('days_until_expiry', kind='stable')
+
+def _query_error_message(error: Exception) -> str:
+    text = str(error)
+    if type(error).__name__ == 'FailedPrecondition' or 'FAILED_PRECONDITION' in text or 'requires an index' in text:
+        return f"This filter combination needs a Firestore composite index. {INDEX_DEPLOY_HINT} Details: {text}"
+    return f"Error querying ingredients: {text}"
+
+def query_ingredients(search_term: str = "", expiry_filter: str = "all", type_filter: str = "all",
+                      page_size: int = INVENTORY_PAGE_SIZE, start_after=None) -> Tuple[List[Dict], Optional[object], Optional[str]]:
+    """Get one page of filtered ingredients, soonest expiry first.
+
+    Returns the ingredients, a cursor for the next page (None on the last page) and an error
+    message (None on success). Until every document has the query fields, pages come from the
+    in-memory inventory frame instead, so older documents stay visible.
+    """
     try:
+        if count_unmigrated_ingredients():
+            offset = start_after or 0
+            frame = _filter_inventory_frame(search_term, expiry_filter, type_filter)
+            page = inventory_records(frame.iloc[offset:offset + page_size])
+            next_offset = offset + page_size if offset + page_size < len(frame) else None
+            return page, next_offset, None
+        
         db = get_event_firestore_db()
         if not db:
-            logger.error("No Firestore client available for get_all_ingredients")
-            return []
+            logger.error("No Firestore client available for query_ingredients")
+            return [], None, "Database connection failed"
         
-        inventory_ref = db.collection('ingredient_inventory')
-        docs = inventory_ref.get()
+        query = _build_ingredient_query(db, search_term, expiry_filter, type_filter).limit(page_size)
+        if start_after is not None:
+            query = query.start_after(start_after)
         
-        ingredients = []
-        current_date = date.today()
+        docs = list(query.stream())
+        today = today_epoch_day()
+        ingredients = [_ingredient_from_doc(doc, today) for doc in docs]
         
-        for doc in docs:
-            data = doc.to_dict()
-            data['doc_id'] = doc.id
-            
-            # Calculate days until expiry
-            expiry_str = data.get('Expiry Date', '')
-            try:
-                expiry_date = datetime.strptime(expiry_str, "%d/%m/%Y").date()
-                days_until_expiry = (expiry_date - current_date).days
-                data['days_until_expiry'] = days_until_expiry
-                data['expiry_status'] = get_expiry_status(days_until_expiry)
-            except:
-                data['days_until_expiry'] = -999
-                data['expiry_status'] = 'invalid'
-            
-            # Handle missing Unit field
-            data['Unit'] = data.get('Unit', 'N/A')
-            
-            ingredients.append(data)
+        # Prefixes are capped, so longer search terms are checked in full here
+        search = " ".join(search_term.strip().lower().split())
+        if len(search) > NAME_PREFIX_MAX_LENGTH:
+            ingredients = [ing for ing in ingredients if name_matches_search(ing.get('name_lower', ''), search)]
         
-        # Apply filters
-        filtered_ingredients = []
+        next_cursor = docs[-1] if len(docs) == page_size else None
+        return ingredients, next_cursor, None
         
-        for ingredient in ingredients:
-            # Search filter
-            if search_term:
-                ingredient_name = ingredient.get('Ingredient', '').lower()
-                if search_term.lower() not in ingredient_name:
-                    continue
-            
-            # Expiry filter
-            if expiry_filter != "all":
-                if expiry_filter == "expired" and ingredient['days_until_expiry'] >= 0:
-                    continue
-                elif expiry_filter == "expiring_soon" and not (0 <= ingredient['days_until_expiry'] <= 7):
-                    continue
-                elif expiry_filter == "fresh" and ingredient['days_until_expiry'] <= 7:
-                    continue
-            
-            # Type filter
-            if type_filter != "all":
-                ingredient_type = ingredient.get('Type', '').lower()
-                if type_filter.lower() != ingredient_type.lower():
-                    continue
-            
-            filtered_ingredients.append(ingredient)
+    except Exception as e:
+        logger.error(f"Error querying ingredients: {str(e)}")
+        return [], None, _query_error_message(e)
+
+def count_ingredients(search_term: str = "", expiry_filter: str = "all", type_filter: str = "all") -> Optional[int]:
+    """Count ingredients matching the filters with a server-side aggregation"""
+    try:
+        if count_unmigrated_ingredients():
+            return len(_filter_inventory_frame(search_term, expiry_filter, type_filter))
+        
+        db = get_event_firestore_db()
+        if not db:
+            return None
+        
+        query = _build_ingredient_query(db, search_term, expiry_filter, type_filter)
+        result = query.count().get()
+        return int(result[0][0].value)
+        
+    except Exception as e:
+        logger.error(f"Error counting ingredients: {str(e)}")
+        return None
+
+def get_ingredient_counts(search_term: str = "", expiry_filter: str = "all", type_filter: str = "all") -> Dict[str, Optional[int]]:
+    """Get total and per-expiry-bucket counts for the filters, cached until the inventory changes"""
+    try:
+        version = get_collection_version(INVENTORY_COLLECTION)
+    except Exception as e:
+        logger.error(f"Error reading inventory version: {str(e)}")
+        version = None
+    
+    if version is None or _ingredient_count_cache['version'] != version:
+        _ingredient_count_cache['version'] = version
+        _ingredient_count_cache['counts'] = {}
+    
+    key = (" ".join(search_term.strip().lower().split()), expiry_filter, normalize_ingredient_type(type_filter))
+    counts = _ingredient_count_cache['counts'].get(key)
+    if counts is None:
+        buckets = ("expired", "expiring_soon", "fresh")
+        if expiry_filter == "all":
+            counts = {bucket: count_ingredients(search_term, bucket, type_filter) for bucket in buckets}
+            counts['total'] = count_ingredients(search_term, "all", type_filter)
+        else:
+            # A single bucket is selected: its count is the total and the others are empty
+            total = count_ingredients(search_term, expiry_filter, type_filter)
+            counts = {bucket: total if bucket == expiry_filter else 0 for bucket in buckets}
+            counts['total'] = total
+        if version is not None and None not in counts.values():
+            _ingredient_count_cache['counts'][key] = counts
+    return counts
+
+def get_all_ingredients(search_term: str = "", expiry_filter: str = "all", type_filter: str = "all") -> List[Dict]:
+    """Get all ingredients with optional filtering"""
+    try:
+        if search_term or expiry_filter != "all" or type_filter != "all":
+            ingredients = []
+            cursor = None
+            while True:
+                page, cursor, error = query_ingredients(search_term, expiry_filter, type_filter, start_after=cursor)
+                if error:
+                    logger.error(error)
+                    return ingredients
+                ingredients.extend(page)
+                if cursor is None:
+                    return ingredients
+        
+        # Unfiltered reads come from the shared inventory frame, which also covers
+        # documents that predate the query fields
+        frame = get_inventory_frame()
+        frame['Unit'] = frame['Unit'].replace('', 'N/A')
         
         # Sort by expiry date (soonest first)
-        filtered_ingredients.sort(key=lambda x: x['days_until_expiry'])
+        frame = frame.sort_values('days_until_expiry', kind='stable')
         
-        return filtered_ingredients
+        return inventory_records(frame)
         
     except Exception as e:
         logger.error(f"Error getting ingredients: {str(e)}")
         return []
 
+def backfill_ingredient_query_fields(dry_run: bool = False) -> Tuple[int, int]:
+    """Add the query engine, expiry and base quantity fields to inventory documents that are missing them.
+
+    Returns (updated count, error count). With dry_run, counts the documents that would change.
+    """
+    db = get_event_firestore_db()
+    if not db:
+        return 0, 0
+    
+    updated = 0
+    errors = 0
+    batch = db.batch()
+    pending = 0
+    
+    for doc in db.collection('ingredient_inventory').stream():
+        data = doc.to_dict()
+        fields = build_ingredient_query_fields(data.get('Ingredient', ''), data.get('Expiry Date', ''), data.get('Type', ''))
+        fields.update(base_quantity_fields(data.get('Quantity', ''), data.get('Unit')))
+        if all(data.get(key) == value for key, value in fields.items()):
+            continue
+        if dry_run:
+            updated += 1
+            continue
+        
+        batch.update(doc.reference, fields)
+        pending += 1
+        if pending == BACKFILL_BATCH_SIZE:
+            try:
+                batch.commit()
+                updated += pending
+            except Exception as e:
+                logger.error(f"Error committing ingredient backfill batch: {str(e)}")
+                errors += pending
+            batch = db.batch()
+            pending = 0
+    
+    if pending:
+        try:
+            batch.commit()
+            updated += pending
+        except Exception as e:
+            logger.error(f"Error committing ingredient backfill batch: {str(e)}")
+            errors += pending
+    
+    if updated and not dry_run:
+        invalidate_collection_cache(INVENTORY_COLLECTION)
+    
+    logger.info(f"Backfilled query fields on {updated} ingredients ({errors} errors)")
+    return updated, errors
+
 def get_expiry_status(days_until_expiry: int) -> str:
     """Get expiry status based on days until expiry"""
     if days_until_expiry < 0:
@@ -142,21 +371,7 @@ def get_expiry_status(days_until_expiry: int) -> str:
 def get_ingredient_types() -> List[str]:
     """Get all unique ingredient types"""
     try:
-        db = get_event_firestore_db()
-        if not db:
-            return []
-        
-        inventory_ref = db.collection('ingredient_inventory')
-        docs = inventory_ref.get()
-        
-        types = set()
-        for doc in docs:
-            data = doc.to_dict()
-            ingredient_type = data.get('Type', '').strip()
-            if ingredient_type:
-                types.add(ingredient_type)
-        
-        return sorted(list(types))
+        return get_facet_values(INVENTORY_COLLECTION, 'Type')
         
     except Exception as e:
         logger.error(f"Error getting ingredient types: {str(e)}")
@@ -194,6 +409,8 @@ def add_ingredient(ingredient_name: str, quantity: float, ingredient_type: str,
             'Unit': unit.strip(),
             'Created At': datetime.now().strftime("%d/%m/%Y %H:%M")
         }
+        ingredient_data.update(build_ingredient_query_fields(ingredient_name, expiry_date, ingredient_type))
+        ingredient_data.update(base_quantity_fields(quantity, unit))
         
         inventory_ref = db.collection('ingredient_inventory')
         logger.info(f"Adding ingredient {ingredient_name} to collection: ingredient_inventory")
@@ -210,6 +427,7 @@ def add_ingredient(ingredient_name: str, quantity: float, ingredient_type: str,
         
         # Write the new document
         doc_ref.set(ingredient_data)
+        invalidate_collection_cache(INVENTORY_COLLECTION)
         
         logger.info(f"Successfully added ingredient: {ingredient_name} with document ID: {doc_id}")
         return True, f"Successfully added {ingredient_name} with document ID: {doc_id}", doc_id
@@ -245,9 +463,12 @@ def update_ingredient(doc_id: str, ingredient_name: str, quantity: float, ingred
             'Alternatives': alternatives.strip(),
             'Last Modified': datetime.now().strftime("%d/%m/%Y %H:%M")
         }
+        update_data.update(build_ingredient_query_fields(ingredient_name, expiry_date, ingredient_type))
+        update_data.update(base_quantity_fields(quantity, unit))
         
         inventory_ref = db.collection('ingredient_inventory').document(doc_id)
         inventory_ref.update(update_data)
+        invalidate_collection_cache(INVENTORY_COLLECTION)
         
         logger.info(f"Updated ingredient: {ingredient_name}")
         return True, f"Successfully updated {ingredient_name}"
@@ -265,6 +486,7 @@ def delete_ingredient(doc_id: str, ingredient_name: str) -> Tuple[bool, str]:
         
         inventory_ref = db.collection('ingredient_inventory').document(doc_id)
         inventory_ref.delete()
+        invalidate_collection_cache(INVENTORY_COLLECTION)
         
         logger.info(f"Deleted ingredient: {ingredient_name}")
         return True, f"Successfully deleted {ingredient_name}"
@@ -288,6 +510,7 @@ def bulk_delete_ingredients(doc_ids: List[str]) -> Tuple[bool, str]:
             batch.delete(doc_ref)
         
         batch.commit()
+        invalidate_collection_cache(INVENTORY_COLLECTION)
         
         logger.info(f"Bulk deleted {len(doc_ids)} ingredients")
         return True, f"Successfully deleted {len(doc_ids)} ingredients"
@@ -316,10 +539,12 @@ def bulk_update_expiry(doc_ids: List[str], new_expiry_date: str) -> Tuple[bool,
             doc_ref = inventory_ref.document(doc_id)
             batch.update(doc_ref, {
                 'Expiry Date': new_expiry_date,
-                'Last Modified': datetime.now().strftime("%d/%m/%Y %H:%M")
+                'Last Modified': datetime.now().strftime("%d/%m/%Y %H:%M"),
+                **expiry_fields(new_expiry_date)
             })
         
         batch.commit()
+        invalidate_collection_cache(INVENTORY_COLLECTION)
         
         logger.info(f"Bulk updated expiry for {len(doc_ids)} ingredients")
         return True, f"Successfully updated expiry date for {len(doc_ids)} ingredients"
@@ -328,15 +553,58 @@ def bulk_update_expiry(doc_ids: List[str], new_expiry_date: str) -> Tuple[bool,
         logger.error(f"Error bulk updating expiry: {str(e)}")
         return False, f"Error bulk updating expiry: {str(e)}"
 
-def suggest_alternatives_with_ai(ingredient_name: str) -> List[str]:
-    """Use Gemini AI to suggest ingredient alternatives"""
+def normalize_ingredient_name(ingredient_name: str) -> str:
+    """Normalize an ingredient name for use as a cache key"""
+    return " ".join(ingredient_name.lower().split())
+
+def alternatives_doc_id(cache_key: str) -> str:
+    """Firestore-safe document id for a cache key (names may contain '/' or be '.')"""
+    return hashlib.sha1(cache_key.encode('utf-8')).hexdigest()
+
+def _get_cached_alternatives(cache_key: str) -> Optional[List[str]]:
+    """Look up cached alternatives in memory, then in Firestore"""
+    entry = _alternatives_memory_cache.get(cache_key)
+    
+    if entry is None:
+        db = get_event_firestore_db()
+        if not db:
+            return None
+        doc = db.collection(ALTERNATIVES_CACHE_COLLECTION).document(alternatives_doc_id(cache_key)).get()
+        if not doc.exists:
+            return None
+        entry = doc.to_dict()
+        _alternatives_memory_cache[cache_key] = entry
+    
     try:
-        api_key = os.environ.get("GEMINI_API_KEY")
-        if not api_key:
-            return ["AI suggestions unavailable - API key not found"]
-        
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-1.5-flash')
+        cached_at = datetime.fromisoformat(entry.get('cached_at', ''))
+    except ValueError:
+        return None
+    
+    if datetime.now() - cached_at > timedelta(days=ALTERNATIVES_CACHE_TTL_DAYS):
+        _alternatives_memory_cache.pop(cache_key, None)
+        return None
+    
+    return list(entry.get('alternatives', [])) or None
+
+def _store_cached_alternatives(cache_key: str, ingredient_name: str, alternatives: List[str]):
+    """Save AI alternatives to the memory and Firestore cache"""
+    entry = {
+        'ingredient': ingredient_name.strip(),
+        'alternatives': alternatives,
+        'cached_at': datetime.now().isoformat()
+    }
+    _alternatives_memory_cache[cache_key] = entry
+    
+    db = get_event_firestore_db()
+    if db:
+        db.collection(ALTERNATIVES_CACHE_COLLECTION).document(alternatives_doc_id(cache_key)).set(entry)
+
+def _generate_alternatives_with_ai(ingredient_name: str) -> Optional[List[str]]:
+    """Ask Gemini for exactly 2 alternatives, returning None if it fails"""
+    try:
+        model = get_gemini_model()
+        if not model:
+            return None
         
         prompt = f'''Suggest exactly 2 practical cooking alternatives for the ingredient "{ingredient_name}".
 
@@ -363,11 +631,82 @@ Ingredient: {ingredient_name}'''
         elif len(alternatives) == 1:
             return alternatives + ["Similar ingredient"]
         else:
-            return ["Similar ingredient", "Substitute ingredient"]
+            return None
             
     except Exception as e:
         logger.error(f"Error getting AI alternatives: {str(e)}")
+        return None
+
+def suggest_alternatives_with_ai(ingredient_name: str, use_cache: bool = True) -> List[str]:
+    """Use Gemini AI to suggest ingredient alternatives, served from cache when possible"""
+    cache_key = normalize_ingredient_name(ingredient_name)
+    
+    if use_cache and cache_key:
+        try:
+            cached = _get_cached_alternatives(cache_key)
+        except Exception as e:
+            logger.warning(f"Alternatives cache lookup failed for '{cache_key}': {str(e)}")
+            cached = None
+        
+        if cached:
+            _alternatives_cache_stats['hits'] += 1
+            return cached
+        _alternatives_cache_stats['misses'] += 1
+    
+    if not get_gemini_api_key():
+        return ["AI suggestions unavailable - API key not found"]
+    
+    alternatives = _generate_alternatives_with_ai(ingredient_name)
+    if not alternatives:
         return ["Similar ingredient", "Substitute ingredient"]
+    
+    if cache_key:
+        try:
+            _store_cached_alternatives(cache_key, ingredient_name, alternatives)
+        except Exception as e:
+            logger.warning(f"Could not cache alternatives for '{cache_key}': {str(e)}")
+    
+    return alternatives
+
+def get_alternatives_cache_stats() -> Dict:
+    """Get hit/miss counters for the alternatives cache"""
+    lookups = _alternatives_cache_stats['hits'] + _alternatives_cache_stats['misses']
+    return {
+        'hits': _alternatives_cache_stats['hits'],
+        'misses': _alternatives_cache_stats['misses'],
+        'hit_rate': _alternatives_cache_stats['hits'] / lookups if lookups else 0.0,
+        'memory_entries': len(_alternatives_memory_cache)
+    }
+
+def prefill_alternatives_cache(max_items: Optional[int] = None) -> Tuple[int, int]:
+    """Generate and cache alternatives for every inventory ingredient not already cached"""
+    db = get_event_firestore_db()
+    if not db:
+        return 0, 0
+    
+    names = {}
+    for doc in db.collection('ingredient_inventory').stream():
+        name = doc.to_dict().get('Ingredient', '').strip()
+        cache_key = normalize_ingredient_name(name)
+        if cache_key and cache_key not in names:
+            names[cache_key] = name
+    
+    generated = 0
+    skipped = 0
+    for cache_key, name in names.items():
+        if max_items is not None and generated >= max_items:
+            break
+        if _get_cached_alternatives(cache_key):
+            skipped += 1
+            continue
+        
+        alternatives = _generate_alternatives_with_ai(name)
+        if alternatives:
+            _store_cached_alternatives(cache_key, name, alternatives)
+            generated += 1
+    
+    logger.info(f"Prefilled alternatives cache: {generated} generated, {skipped} already cached")
+    return generated, skipped
 
 def render_ingredient_management():
     """Main ingredient management interface"""
@@ -416,26 +755,45 @@ def render_view_ingredients():
         type_filter = st.selectbox("🏷️ Filter by Type", options=ingredient_types,
                                  format_func=lambda x: "All Types" if x == "all" else x)
     
-    ingredients = get_all_ingredients(search_term, expiry_filter, type_filter)
+    # Reset pagination whenever the filters or the query mode change: cursors
+    # are row offsets in memory and document snapshots in indexed queries
+    unmigrated = count_unmigrated_ingredients()
+    filter_key = (search_term, expiry_filter, type_filter, bool(unmigrated))
+    if st.session_state.get('inventory_filter_key') != filter_key:
+        st.session_state.inventory_filter_key = filter_key
+        st.session_state.inventory_page_cursors = [None]
     
-    if not ingredients:
+    page_cursors = st.session_state.inventory_page_cursors
+    ingredients, next_cursor, error = query_ingredients(search_term, expiry_filter, type_filter, start_after=page_cursors[-1])
+    
+    if error:
+        st.error(f"❌ {error}")
+        return
+    
+    if unmigrated:
+        st.info(f"ℹ️ {unmigrated} ingredients predate the search fields, so filters run in memory. "
+                "Run the backfill under Bulk Operations → Maintenance to use indexed queries.")
+    
+    if not ingredients and len(page_cursors) == 1:
         st.info("No ingredients found matching your criteria.")
         return
     
     col1, col2, col3, col4 = st.columns(4)
     
-    expired_count = len([ing for ing in ingredients if ing['days_until_expiry'] < 0])
-    expiring_soon_count = len([ing for ing in ingredients if 0 <= ing['days_until_expiry'] <= 7])
-    fresh_count = len([ing for ing in ingredients if ing['days_until_expiry'] > 7])
+    counts = get_ingredient_counts(search_term, expiry_filter, type_filter)
+    total_count = counts['total']
+    expired_count = counts['expired']
+    expiring_soon_count = counts['expiring_soon']
+    fresh_count = counts['fresh']
     
     with col1:
-        st.metric("Total Items", len(ingredients))
+        st.metric("Total Items", total_count if total_count is not None else "N/A")
     with col2:
-        st.metric("Expired", expired_count, delta=f"-{expired_count}" if expired_count > 0 else None)
+        st.metric("Expired", expired_count if expired_count is not None else "N/A", delta=f"-{expired_count}" if expired_count else None)
     with col3:
-        st.metric("Expiring Soon", expiring_soon_count, delta=f"⚠️ {expiring_soon_count}" if expiring_soon_count > 0 else None)
+        st.metric("Expiring Soon", expiring_soon_count if expiring_soon_count is not None else "N/A", delta=f"⚠️ {expiring_soon_count}" if expiring_soon_count else None)
     with col4:
-        st.metric("Fresh", fresh_count, delta=f"✅ {fresh_count}" if fresh_count > 0 else None)
+        st.metric("Fresh", fresh_count if fresh_count is not None else "N/A", delta=f"✅ {fresh_count}" if fresh_count else None)
     
     st.divider()
     
@@ -488,6 +846,21 @@ def render_view_ingredients():
                     st.rerun()
         
         st.divider()
+    
+    col1, col2, col3 = st.columns([1, 2, 1])
+    
+    with col1:
+        if len(page_cursors) > 1 and st.button("⬅️ Previous", use_container_width=True):
+            page_cursors.pop()
+            st.rerun()
+    
+    with col2:
+        st.caption(f"Page {len(page_cursors)}")
+    
+    with col3:
+        if next_cursor is not None and st.button("Next ➡️", use_container_width=True):
+            page_cursors.append(next_cursor)
+            st.rerun()
 
 def render_add_ingredient():
     """Render the add ingredient interface"""
@@ -833,6 +1206,16 @@ def render_bulk_operations():
     """Render bulk operations interface"""
     st.markdown("### 🔧 Bulk Operations")
     
+    with st.expander("🛠️ Maintenance"):
+        st.write("Add search and expiry fields to ingredients created before the inventory query engine.")
+        if st.button("🔄 Backfill Query Fields", use_container_width=True):
+            with st.spinner("Backfilling ingredient fields..."):
+                updated, errors = backfill_ingredient_query_fields()
+            if errors:
+                st.warning(f"⚠️ Updated {updated} ingredients, {errors} failed")
+            else:
+                st.success(f"✅ Updated {updated} ingredients")
+    
     ingredients = get_all_ingredients()
     
     if not ingredients:
@@ -1,23 +1,217 @@
 import pandas as pd
 from typing import List, Optional, Dict, Tuple
-import os
 import google.generativeai as genai
+from modules.llm_gateway import get_gemini_model, PRIORITY_BACKGROUND
 import logging
 import random
 import json
-from datetime import datetime, date
+import hashlib
+import re
+import heapq
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, date, timedelta
+from collections import Counter
 
 from firebase_admin import firestore
-from firebase_init import init_firebase
+from firebase_init import get_client, MAIN_APP, EVENT_APP
 from firebase_data import (
     search_recipes_by_ingredients, search_menu_by_ingredients,
     format_recipe_for_display, format_menu_item_for_display,
-    get_popular_recipes, fetch_recipe_archive, fetch_menu_items
+    get_popular_recipes, fetch_archive_and_menu,
+    ingredient_expiry_day, today_epoch_day, get_inventory_frame, inventory_records,
+    get_snapshot_derived, INVENTORY_COLLECTION
 )
-from modules.xp_utils import calculate_level_from_xp
+from modules.xp_utils import calculate_level_from_xp, calculate_levels_from_xp
+from modules.menu_feasibility import normalize_ingredient_key
 
 logger = logging.getLogger('leftover_combined')
 
+EXPIRY_SCHEDULER_NAME = 'expiry_scheduler'
+URGENT_EXPIRY_DAYS = 7
+
+# Materialized restaurant profile used as style context for recipe generation
+PROFILE_COLLECTION = 'restaurant_profile'
+PROFILE_DOC_ID = 'context'
+PROFILE_MAX_AGE_HOURS = 24
+PROFILE_CACHE_SECONDS = 300
+PROFILE_TOP_VALUES = 10
+
+# Concurrent Gemini calls for batch recipe generation; the gateway still enforces the rate limit
+RECIPE_BATCH_WORKERS = 4
+
+# Leading "1.", "10)", "3 -" etc. on free-text recipe lines
+RECIPE_LINE_PREFIX = re.compile(r'^\s*\d+\s*[.):-]\s*')
+
+# Gemini response schema for structured recipe suggestions
+RECIPE_RESPONSE_SCHEMA = {
+    'type': 'ARRAY',
+    'items': {
+        'type': 'OBJECT',
+        'properties': {
+            'name': {'type': 'STRING'},
+            'description': {'type': 'STRING'},
+            'ingredients_used': {'type': 'ARRAY', 'items': {'type': 'STRING'}},
+            'prep_time_minutes': {'type': 'INTEGER'},
+        },
+        'required': ['name', 'ingredients_used', 'prep_time_minutes'],
+    },
+}
+
+# response_schema is only accepted by newer SDKs (see requirements.txt)
+STRUCTURED_OUTPUT_SDK = 'google-generativeai>=0.7.0'
+
+
+# Persisted quiz question bank, keyed by topic and difficulty and topped up in the background
+QUIZ_BANK_COLLECTION = 'quiz_question_bank'
+QUIZ_SEEN_COLLECTION = 'quiz_seen_questions'
+# Only the most recent seen ids are kept, so the per-user document stays small and old questions come back around
+QUIZ_SEEN_MAX_IDS = 500
+QUIZ_DIFFICULTIES = ['easy', 'medium', 'hard']
+QUIZ_XP_REWARDS = {'easy': 10, 'medium': 15, 'hard': 20}
+QUIZ_BANK_MIN_PER_KEY = 4
+QUIZ_BANK_GENERATE_COUNT = 6
+QUIZ_BANK_CACHE_SECONDS = 600
+QUIZ_BANK_REFILL_MAX_CALLS = 10
+
+QUIZ_RESPONSE_SCHEMA = {
+    'type': 'ARRAY',
+    'items': {
+        'type': 'OBJECT',
+        'properties': {
+            'question': {'type': 'STRING'},
+            'options': {'type': 'ARRAY', 'items': {'type': 'STRING'}},
+            'correct': {'type': 'INTEGER'},
+            'explanation': {'type': 'STRING'},
+        },
+        'required': ['question', 'options', 'correct', 'explanation'],
+    },
+}
+
+QUIZ_TOPICS = [
+    "food safety and temperatures",
+    "knife skills and cutting techniques",
+    "baking and pastry fundamentals",
+    "sauce making and emulsions",
+    "meat cooking and doneness",
+    "vegetable preparation methods",
+    "spice and herb knowledge",
+    "cooking equipment and tools",
+    "food storage and preservation",
+    "international cuisine techniques",
+    "fermentation and pickling",
+    "grilling and barbecue methods",
+    "soup and stock preparation",
+    "bread making techniques",
+    "egg cooking methods",
+    "dairy and cheese knowledge",
+    "seafood preparation",
+    "nutrition and dietary needs",
+    "kitchen safety protocols",
+    "food presentation and plating",
+    "wine and beverage pairing",
+    "molecular gastronomy basics",
+    "smoking and curing techniques",
+    "pasta and noodle preparation",
+    "dessert and confection making"
+]
+
+CUISINE_KEYWORDS = {
+    'Indian': ['curry', 'masala', 'biryani', 'dal', 'tikka', 'paneer', 'tandoori'],
+    'Italian': ['pasta', 'pizza', 'risotto', 'lasagna', 'gnocchi'],
+    'Asian': ['stir fry', 'fried rice', 'noodles', 'sushi', 'ramen', 'dim sum'],
+    'Mexican': ['taco', 'burrito', 'quesadilla', 'enchilada', 'salsa'],
+    'Mediterranean': ['hummus', 'falafel', 'pita', 'tzatziki'],
+}
+SPICE_KEYWORDS = [
+    'cumin', 'turmeric', 'garam masala', 'coriander', 'cardamom', 'clove', 'cinnamon',
+    'chili', 'chilli', 'paprika', 'oregano', 'basil', 'thyme', 'pepper', 'ginger', 'saffron'
+]
+DISH_TYPE_KEYWORDS = {
+    'curries': ['curry', 'masala', 'korma'],
+    'rice dishes': ['rice', 'biryani', 'pulao', 'risotto'],
+    'breads': ['bread', 'naan', 'roti', 'paratha'],
+    'pasta': ['pasta', 'spaghetti', 'penne', 'lasagna'],
+    'salads': ['salad'],
+    'soups': ['soup', 'broth'],
+    'desserts': ['cake', 'pudding', 'kheer', 'ice cream', 'halwa'],
+    'beverages': ['lassi', 'juice', 'smoothie', 'tea', 'coffee', 'mocktail'],
+}
+
+_restaurant_profile_cache = {'profile': None, 'loaded_at': None}
+_quiz_bank_cache = {'questions': None, 'loaded_at': None}
+_quiz_bank_lock = threading.Lock()
+_quiz_refill_lock = threading.Lock()
+
+class ExpiryScheduler:
+    """Min-heap of inventory items keyed by expiry epoch-day; expired items are popped as the day advances"""
+
+    def __init__(self, items: List[Dict]):
+        self._lock = threading.Lock()
+        self._sequence = itertools.count()
+        self._heap = []
+        self.today = today_epoch_day()
+        for item in items:
+            expiry_day = ingredient_expiry_day(item)
+            if expiry_day is not None and item.get('Ingredient'):
+                self._heap.append((expiry_day, next(self._sequence), item))
+        heapq.heapify(self._heap)
+        self.advance(self.today)
+
+    def advance(self, today: int) -> List[Dict]:
+        """Move the scheduler to a new day and pop the items that have expired"""
+        expired = []
+        with self._lock:
+            self.today = max(self.today, today)
+            while self._heap and self._heap[0][0] < self.today:
+                expired.append(heapq.heappop(self._heap)[2])
+        if expired:
+            logger.info(f"Expiry scheduler dropped {len(expired)} expired items")
+        return expired
+
+    def soonest(self, limit: Optional[int] = None, within_days: Optional[int] = None) -> List[Tuple[int, Dict]]:
+        """Get up to limit (days until expiry, item) pairs, soonest first; no limit walks the whole window"""
+        self.advance(today_epoch_day())
+        results = []
+        with self._lock:
+            today = self.today
+            # Walk the heap in order without copying it: a small frontier heap of positions
+            # whose parents were already taken, O(k log k) for k results
+            frontier = [(self._heap[0], 0)] if self._heap else []
+            while frontier and (limit is None or len(results) < limit):
+                (expiry_day, _, item), position = heapq.heappop(frontier)
+                if within_days is not None and expiry_day - today > within_days:
+                    break
+                results.append((expiry_day - today, item))
+                for child in (2 * position + 1, 2 * position + 2):
+                    if child < len(self._heap):
+                        heapq.heappush(frontier, (self._heap[child], child))
+        return results
+
+    def __len__(self):
+        with self._lock:
+            return len(self._heap)
+
+def get_expiry_scheduler() -> ExpiryScheduler:
+    return get_snapshot_derived(INVENTORY_COLLECTION, EXPIRY_SCHEDULER_NAME, ExpiryScheduler)
+
+def _priority_details(scheduled: List[Tuple[int, Dict]]) -> Tuple[List[str], List[Dict]]:
+    ingredient_names = []
+    detailed_info = []
+    for days_until_expiry, item in scheduled:
+        ingredient_names.append(item['Ingredient'])
+        detailed_info.append({
+            'name': item['Ingredient'],
+            'expiry_date': item.get('Expiry Date', 'No expiry date'),
+            'type': item.get('Type', 'No type'),
+            'days_until_expiry': days_until_expiry
+        })
+    return ingredient_names, detailed_info
+
+def get_priority_ingredients(max_ingredients: int = 10) -> Tuple[List[str], List[Dict]]:
+    return _priority_details(get_expiry_scheduler().soonest(max_ingredients))
+
 def load_leftovers(csv_path: str) -> List[str]:
     try:
         df = pd.read_csv(csv_path)
@@ -60,9 +254,10 @@ def filter_valid_ingredients(ingredients: List[Dict]) -> List[Dict]:
     valid_ingredients = []
     expired_count = 0
     
+    today = today_epoch_day()
     for ingredient in ingredients:
-        expiry_date_str = ingredient.get('Expiry Date', '')
-        if is_ingredient_valid(expiry_date_str):
+        expiry_day = ingredient_expiry_day(ingredient)
+        if expiry_day is not None and expiry_day >= today:
             valid_ingredients.append(ingredient)
         else:
             expired_count += 1
@@ -72,31 +267,17 @@ def filter_valid_ingredients(ingredients: List[Dict]) -> List[Dict]:
 
 def fetch_ingredients_from_firebase() -> List[Dict]:
     try:
-        from firebase_admin import firestore
-        import firebase_admin
-        
-        if 'event_app' in [app.name for app in firebase_admin._apps.values()]:
-            db = firestore.client(app=firebase_admin.get_app(name='event_app'))
-        else:
+        db = get_client(EVENT_APP)
+        if not db:
             from app_integration import check_event_firebase_config
             check_event_firebase_config()
-            from modules.event_planner import init_event_firebase
-            init_event_firebase()
-            db = firestore.client(app=firebase_admin.get_app(name='event_app'))
-        
-        inventory_ref = db.collection('ingredient_inventory')
-        inventory_docs = inventory_ref.get()
+            raise Exception("Event Firebase is not available")
         
-        all_ingredients = []
-        for doc in inventory_docs:
-            item = doc.to_dict()
-            item['id'] = doc.id
-            all_ingredients.append(item)
+        # Unexpired items, soonest expiry first
+        frame = get_inventory_frame()
+        frame = frame[frame['days_until_expiry'] >= 0].sort_values('expiry_day', kind='stable')
         
-        valid_ingredients = filter_valid_ingredients(all_ingredients)
-        valid_ingredients.sort(key=lambda x: parse_expiry_date(x.get('Expiry Date', '')) or datetime.max)
-        
-        return valid_ingredients
+        return inventory_records(frame)
         
     except Exception as e:
         logger.error(f"Error fetching ingredients from Firebase: {str(e)}")
@@ -106,28 +287,7 @@ def get_ingredients_by_expiry_priority(firebase_ingredients: List[Dict], max_ing
     if not firebase_ingredients:
         return [], []
     
-    valid_ingredients = [ing for ing in firebase_ingredients if is_ingredient_valid(ing.get('Expiry Date', ''))]
-    
-    if not valid_ingredients:
-        return [], []
-    
-    priority_ingredients = valid_ingredients[:max_ingredients]
-    
-    ingredient_names = []
-    detailed_info = []
-    
-    for item in priority_ingredients:
-        if 'Ingredient' in item and item['Ingredient']:
-            ingredient_names.append(item['Ingredient'])
-            days_until_expiry = calculate_days_until_expiry(item.get('Expiry Date', ''))
-            detailed_info.append({
-                'name': item['Ingredient'],
-                'expiry_date': item.get('Expiry Date', 'No expiry date'),
-                'type': item.get('Type', 'No type'),
-                'days_until_expiry': days_until_expiry
-            })
-    
-    return ingredient_names, detailed_info
+    return _priority_details(ExpiryScheduler(firebase_ingredients).soonest(max_ingredients))
 
 def calculate_days_until_expiry(expiry_string: str) -> int:
     try:
@@ -143,91 +303,136 @@ def calculate_days_until_expiry(expiry_string: str) -> int:
 
 def parse_firebase_ingredients(firebase_ingredients: List[Dict]) -> List[str]:
     ingredients = []
-    for item in firebase_ingredients:
+    for item in filter_valid_ingredients(firebase_ingredients):
         if 'Ingredient' in item and item['Ingredient']:
-            if is_ingredient_valid(item.get('Expiry Date', '')):
-                ingredients.append(item['Ingredient'])
+            ingredients.append(item['Ingredient'])
     return ingredients
 
-def get_restaurant_context() -> str:
-    try:
-        recipes = fetch_recipe_archive()
-        menu_items = fetch_menu_items()
-        
-        context_info = []
-        
-        cooking_styles = set()
-        common_spices = set()
-        
-        for recipe in recipes[:10]:
-            name = recipe.get('name', '').lower()
-            description = recipe.get('description', '').lower()
-            ingredients = recipe.get('ingredients', [])
-            
-            if any(style in name or style in description for style in ['curry', 'masala', 'biryani', 'dal']):
-                cooking_styles.add('Indian')
-            if any(style in name or style in description for style in ['pasta', 'pizza', 'risotto']):
-                cooking_styles.add('Italian')
-            if any(style in name or style in description for style in ['stir fry', 'fried rice', 'noodles']):
-                cooking_styles.add('Asian')
-            
-            if isinstance(ingredients, list):
-                for ing in ingredients:
-                    ing_str = str(ing).lower()
-                    if any(spice in ing_str for spice in ['cumin', 'turmeric', 'garam masala', 'coriander']):
-                        common_spices.add(ing_str)
+def build_restaurant_profile(recipes: List[Dict], menu_items: List[Dict]) -> Dict:
+    cuisine_mix = Counter()
+    common_spices = Counter()
+    dish_types = Counter()
+    
+    for dish in recipes + menu_items:
+        name = str(dish.get('name', '')).lower()
+        description = str(dish.get('description', '')).lower()
+        text = f"{name} {description}"
         
-        if cooking_styles:
-            context_info.append(f"Restaurant specializes in: {', '.join(cooking_styles)} cuisine")
+        if dish.get('cuisine'):
+            cuisine_mix[str(dish['cuisine']).strip().title()] += 1
+        else:
+            for cuisine, keywords in CUISINE_KEYWORDS.items():
+                if any(keyword in text for keyword in keywords):
+                    cuisine_mix[cuisine] += 1
         
-        if common_spices:
-            context_info.append(f"Commonly used spices: {', '.join(list(common_spices)[:5])}")
+        ingredients = dish.get('ingredients', [])
+        if isinstance(ingredients, str):
+            ingredients = ingredients.split(',')
+        if isinstance(ingredients, list):
+            for ing in ingredients:
+                ing_str = str(ing).strip().lower()
+                if any(spice in ing_str for spice in SPICE_KEYWORDS):
+                    common_spices[ing_str] += 1
         
-        dish_types = set()
-        for item in menu_items[:5]:
-            name = item.get('name', '').lower()
-            if 'curry' in name:
-                dish_types.add('curries')
-            elif 'rice' in name:
-                dish_types.add('rice dishes')
-            elif 'bread' in name or 'naan' in name or 'roti' in name:
-                dish_types.add('breads')
+        for dish_type, keywords in DISH_TYPE_KEYWORDS.items():
+            if any(keyword in name for keyword in keywords):
+                dish_types[dish_type] += 1
+                break
+    
+    return {
+        'cuisine_mix': dict(cuisine_mix.most_common(PROFILE_TOP_VALUES)),
+        'common_spices': dict(common_spices.most_common(PROFILE_TOP_VALUES)),
+        'dish_types': dict(dish_types.most_common(PROFILE_TOP_VALUES)),
+        'recipe_count': len(recipes),
+        'menu_count': len(menu_items),
+        'updated_at': datetime.now().isoformat()
+    }
+
+def format_restaurant_context(profile: Dict) -> str:
+    context_info = []
+    
+    cuisines = list(profile.get('cuisine_mix', {}))[:3]
+    if cuisines:
+        context_info.append(f"Restaurant specializes in: {', '.join(cuisines)} cuisine")
+    
+    spices = list(profile.get('common_spices', {}))[:5]
+    if spices:
+        context_info.append(f"Commonly used spices: {', '.join(spices)}")
+    
+    dish_types = list(profile.get('dish_types', {}))[:4]
+    if dish_types:
+        context_info.append(f"Restaurant serves: {', '.join(dish_types)}")
+    
+    return " | ".join(context_info) if context_info else "General restaurant kitchen"
+
+def refresh_restaurant_profile() -> Optional[Dict]:
+    try:
+        recipes, menu_items = fetch_archive_and_menu()
+        profile = build_restaurant_profile(recipes, menu_items)
         
-        if dish_types:
-            context_info.append(f"Restaurant serves: {', '.join(dish_types)}")
+        db = get_client(EVENT_APP)
+        if db:
+            db.collection(PROFILE_COLLECTION).document(PROFILE_DOC_ID).set(profile)
         
-        return " | ".join(context_info) if context_info else "General restaurant kitchen"
+        _restaurant_profile_cache.update(profile=profile, loaded_at=datetime.now())
+        logger.info(f"Refreshed restaurant profile from {len(recipes)} recipes and {len(menu_items)} menu items")
+        return profile
         
     except Exception as e:
-        logger.error(f"Error getting restaurant context: {str(e)}")
-        return "General restaurant kitchen"
+        logger.error(f"Error refreshing restaurant profile: {str(e)}")
+        return None
 
-def suggest_recipes(leftovers: List[str], max_suggestions: int = 3, notes: str = "", priority_ingredients: List[Dict] = None) -> List[str]:
-    if not leftovers:
-        return []
+def get_restaurant_profile() -> Optional[Dict]:
+    loaded_at = _restaurant_profile_cache['loaded_at']
+    if loaded_at and datetime.now() - loaded_at < timedelta(seconds=PROFILE_CACHE_SECONDS):
+        return _restaurant_profile_cache['profile']
+    
+    try:
+        db = get_client(EVENT_APP)
+        doc = db.collection(PROFILE_COLLECTION).document(PROFILE_DOC_ID).get() if db else None
+        profile = doc.to_dict() if doc is not None and doc.exists else None
+    except Exception as e:
+        logger.error(f"Error reading restaurant profile: {str(e)}")
+        profile = None
+    
+    # Rebuild when missing or older than the refresh schedule
+    if not profile or datetime.now() - datetime.fromisoformat(profile.get('updated_at', '1970-01-01')) > timedelta(hours=PROFILE_MAX_AGE_HOURS):
+        return refresh_restaurant_profile() or profile
+    
+    _restaurant_profile_cache.update(profile=profile, loaded_at=datetime.now())
+    return profile
 
+def get_restaurant_context() -> str:
     try:
-        api_key = os.environ.get("GEMINI_API_KEY")
-        if not api_key:
-            return ["GEMINI_API_KEY not found - cannot generate new recipes"]
+        profile = get_restaurant_profile()
+        return format_restaurant_context(profile) if profile else "General restaurant kitchen"
         
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-1.5-flash')
+    except Exception as e:
+        logger.error(f"Error getting restaurant context: {str(e)}")
+        return "General restaurant kitchen"
 
-        restaurant_context = get_restaurant_context()
-        
-        ingredients_list = ", ".join(leftovers)
-        
-        notes_text = f"\nSpecial requirements: {notes}" if notes else ""
-        
-        priority_text = ""
-        if priority_ingredients:
-            urgent_ingredients = [ing for ing in priority_ingredients if 0 <= ing['days_until_expiry'] <= 7]
-            if urgent_ingredients:
-                urgent_details = [f"{ing['name']} (expires in {ing['days_until_expiry']} days)" for ing in urgent_ingredients]
-                priority_text = f"\nURGENT: Must use these ingredients first: {', '.join(urgent_details)}"
-        
-        prompt = f'''You are a creative chef tasked with creating NEW, ORIGINAL recipes using leftover ingredients. 
+def _urgent_priority_ingredients(leftovers: List[str]) -> List[Dict]:
+    # Pull urgent items for these leftovers straight from the expiry scheduler
+    leftover_names = {name.strip().lower() for name in leftovers}
+    scheduled = get_expiry_scheduler().soonest(within_days=URGENT_EXPIRY_DAYS)
+    return _priority_details([
+        (days, item) for days, item in scheduled if item['Ingredient'].strip().lower() in leftover_names
+    ])[1]
+
+def _recipe_prompt(leftovers: List[str], max_suggestions: int, notes: str,
+                   priority_ingredients: List[Dict], restaurant_context: str) -> str:
+    ingredients_list = ", ".join(leftovers)
+    
+    notes_text = f"\nSpecial requirements: {notes}" if notes else ""
+    
+    priority_text = ""
+    if priority_ingredients:
+        urgent_ingredients = [ing for ing in priority_ingredients if 0 <= ing['days_until_expiry'] <= URGENT_EXPIRY_DAYS]
+        if urgent_ingredients:
+            urgent_details = [f"{ing['name']} (expires in {ing['days_until_expiry']} days)" for ing in urgent_ingredients]
+            priority_text = f"\nURGENT: Must use these ingredients first: {', '.join(urgent_details)}"
+    
+    return f'''You are a creative chef tasked with creating NEW, ORIGINAL recipes using leftover ingredients. 
 
 LEFTOVER INGREDIENTS TO USE: {ingredients_list}
 
@@ -247,85 +452,178 @@ IMPORTANT RULES:
 - Focus on creative combinations of the leftover ingredients
 - Make them sound appetizing and restaurant-quality
 - Each recipe should be a complete dish name
-- Consider fusion approaches if appropriate
+- Consider fusion approaches if appropriate'''
+
+def _parse_recipe_lines(response_text: str, max_suggestions: int) -> List[str]:
+    new_recipes = []
+    for line in response_text.split('\n'):
+        line = RECIPE_LINE_PREFIX.sub('', line.strip()).strip().strip('"\'*').strip()
+        if line and len(new_recipes) < max_suggestions:
+            new_recipes.append(line)
+    return new_recipes
+
+def _leftover_coverage(leftovers: List[str], ingredients_used: List[str]) -> Tuple[float, List[str]]:
+    # Share of the leftovers a recipe actually uses, matched on normalized ingredient names
+    used_keys = {normalize_ingredient_key(name) for name in ingredients_used}
+    covered = [name for name in leftovers if normalize_ingredient_key(name) in used_keys]
+    return (len(covered) / len(leftovers) if leftovers else 0.0), covered
+
+def _parse_structured_recipes(response_text: str, leftovers: List[str], max_suggestions: int) -> List[Dict]:
+    payload = json.loads(response_text)
+    if isinstance(payload, dict):
+        payload = payload.get('recipes', [])
+
+    recipes = []
+    for entry in payload if isinstance(payload, list) else []:
+        if not isinstance(entry, dict) or not str(entry.get('name', '')).strip():
+            continue
+        ingredients_used = [str(name).strip() for name in entry.get('ingredients_used') or [] if str(name).strip()]
+        coverage, covered = _leftover_coverage(leftovers, ingredients_used)
+        try:
+            prep_time = max(0, int(entry.get('prep_time_minutes') or 0))
+        except (TypeError, ValueError):
+            prep_time = 0
+        recipes.append({
+            'name': str(entry['name']).strip(),
+            'description': str(entry.get('description') or '').strip(),
+            'ingredients_used': ingredients_used,
+            'leftovers_used': covered,
+            'leftover_coverage': round(coverage, 3),
+            'prep_time_minutes': prep_time,
+        })
+
+    # Most leftovers used first, quicker dishes break ties
+    recipes.sort(key=lambda recipe: (-recipe['leftover_coverage'], recipe['prep_time_minutes'] or float('inf')))
+    return recipes[:max_suggestions]
+
+def _json_generation_config(schema: Dict):
+    try:
+        return genai.GenerationConfig(response_mime_type="application/json", response_schema=schema)
+    except TypeError as e:
+        raise RuntimeError(f"Structured output needs {STRUCTURED_OUTPUT_SDK}: {str(e)}") from e
+
+def _generate_recipes(model, leftovers: List[str], max_suggestions: int, notes: str,
+                      priority_ingredients: List[Dict], restaurant_context: str, structured: bool = False) -> List:
+    prompt = _recipe_prompt(leftovers, max_suggestions, notes, priority_ingredients, restaurant_context)
+
+    if structured:
+        prompt += f"""
+
+Return a JSON array of exactly {max_suggestions} recipes. For each recipe give its name, a one-sentence description,
+the ingredients it uses (list leftover ingredients exactly as written above) and the estimated prep time in minutes."""
+        response = model.generate_content(prompt, generation_config=_json_generation_config(RECIPE_RESPONSE_SCHEMA))
+        new_recipes = _parse_structured_recipes(response.text, leftovers, max_suggestions)
+        if not new_recipes:
+            raise ValueError("Gemini returned no usable recipes in the structured response")
+    else:
+        prompt += f"""
 
 Format: Return only the recipe names, one per line, numbered 1-{max_suggestions}.
 
 Example format:
 1. Spiced Leftover Vegetable Biryani Bowl
 2. Fusion Leftover Curry Pasta
-3. Crispy Leftover Vegetable Fritters with Mint Chutney'''
-
+3. Crispy Leftover Vegetable Fritters with Mint Chutney"""
         response = model.generate_content(prompt)
-        response_text = response.text.strip()
-        
-        recipe_lines = [line.strip() for line in response_text.split('\n') if line.strip()]
-        new_recipes = []
-        
-        for line in recipe_lines:
-            if line and line[0].isdigit() and line[1:3] in ['. ', '- ', ') ']:
-                line = line[3:].strip()
-            
-            line = line.strip('"\'')
-            
-            if line and len(new_recipes) < max_suggestions:
-                new_recipes.append(line)
+        new_recipes = _parse_recipe_lines(response.text.strip(), max_suggestions)
+    
+    if not new_recipes:
+        return []
+    
+    logger.info(f"Generated {len(new_recipes)} new creative recipes using leftovers")
+    return new_recipes
+
+def suggest_recipes(leftovers: List[str], max_suggestions: int = 3, notes: str = "", priority_ingredients: List[Dict] = None,
+                    structured: bool = False) -> List:
+    """Get new recipe names, or with structured=True dicts with name, description, ingredients_used,
+    leftovers_used, leftover_coverage and prep_time_minutes ranked by leftover coverage.
+
+    Structured mode raises on failure so callers can show the reason instead of an empty list.
+    """
+    if not leftovers:
+        return []
+
+    try:
+        model = get_gemini_model()
+        if not model:
+            return ["GEMINI_API_KEY not found - cannot generate new recipes"]
+
+        restaurant_context = get_restaurant_context()
         
-        if not new_recipes:
-            return []
+        if priority_ingredients is None:
+            priority_ingredients = _urgent_priority_ingredients(leftovers)
         
-        logger.info(f"Generated {len(new_recipes)} new creative recipes using leftovers")
-        return new_recipes[:max_suggestions]
+        return _generate_recipes(model, leftovers, max_suggestions, notes, priority_ingredients, restaurant_context, structured)
 
     except Exception as e:
         logger.error(f"Error generating new recipes: {str(e)}")
+        if structured:
+            raise
         return []
 
+def suggest_recipes_batch(leftover_sets: Dict[str, List[str]], max_suggestions: int = 3, notes: str = "",
+                          max_workers: int = RECIPE_BATCH_WORKERS, structured: bool = False) -> Dict[str, Dict]:
+    """Generate recipes for many leftover sets (e.g. one per station) on a bounded pool.
+
+    Returns {set name: {'recipes': [...], 'error': None or message}}; one failed set does not affect the others.
+    """
+    results = {name: {'recipes': [], 'error': None} for name in leftover_sets}
+    pending = {name: leftovers for name, leftovers in leftover_sets.items() if leftovers}
+    for name in leftover_sets:
+        if name not in pending:
+            results[name]['error'] = "No leftovers provided"
+    if not pending:
+        return results
+
+    model = get_gemini_model()
+    if not model:
+        for name in pending:
+            results[name]['error'] = "GEMINI_API_KEY not found - cannot generate new recipes"
+        return results
+
+    # Shared inputs are computed once on the calling thread
+    restaurant_context = get_restaurant_context()
+    priorities = {}
+    for name, leftovers in pending.items():
+        try:
+            priorities[name] = _urgent_priority_ingredients(leftovers)
+        except Exception as e:
+            logger.warning(f"Could not load expiry priorities for '{name}': {str(e)}")
+            priorities[name] = []
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(pending)))) as executor:
+        futures = {
+            executor.submit(
+                _generate_recipes, model, leftovers, max_suggestions, notes, priorities[name], restaurant_context, structured
+            ): name
+            for name, leftovers in pending.items()
+        }
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                results[name]['recipes'] = future.result()
+            except Exception as e:
+                logger.error(f"Error generating recipes for '{name}': {str(e)}")
+                results[name]['error'] = str(e)
+
+    failed = sum(1 for result in results.values() if result['error'])
+    logger.info(f"Batch recipe generation finished: {len(results) - failed} sets succeeded, {failed} failed")
+    return results
+
 def get_firestore_db():
-    init_firebase()
-    return firestore.client()
+    return get_client(MAIN_APP)
 
 def generate_dynamic_quiz_questions(ingredients: List[str], num_questions: int = 5) -> List[Dict]:
     try:
-        api_key = os.environ.get("GEMINI_API_KEY")
-        if not api_key:
-            logger.error("GEMINI_API_KEY not found")
+        model = get_gemini_model()
+        if not model:
             return []
-            
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-1.5-flash')
 
         import random
         import time
         random_seed = int(time.time() * 1000) % 10000
         
-        all_cooking_topics = [
-            "food safety and temperatures",
-            "knife skills and cutting techniques", 
-            "baking and pastry fundamentals",
-            "sauce making and emulsions",
-            "meat cooking and doneness",
-            "vegetable preparation methods",
-            "spice and herb knowledge",
-            "cooking equipment and tools",
-            "food storage and preservation",
-            "international cuisine techniques",
-            "fermentation and pickling",
-            "grilling and barbecue methods",
-            "soup and stock preparation",
-            "bread making techniques",
-            "egg cooking methods",
-            "dairy and cheese knowledge",
-            "seafood preparation",
-            "nutrition and dietary needs",
-            "kitchen safety protocols",
-            "food presentation and plating",
-            "wine and beverage pairing",
-            "molecular gastronomy basics",
-            "smoking and curing techniques",
-            "pasta and noodle preparation",
-            "dessert and confection making"
-        ]
+        all_cooking_topics = list(QUIZ_TOPICS)
         
         random.shuffle(all_cooking_topics)
         selected_topics = all_cooking_topics[:num_questions]
@@ -353,7 +651,8 @@ Return as valid JSON array:
         "correct": 0,
         "difficulty": "easy",
         "xp_reward": 10,
-        "explanation": "Brief explanation"
+        "explanation": "Brief explanation",
+        "topic": "the topic from the list above"
     }}
 ]
 
@@ -376,14 +675,13 @@ Make each question completely unique and random - no patterns or similarities!''
                 selected_questions = questions[:num_questions]
                 
                 valid_questions = []
-                for q in selected_questions:
-                    if (isinstance(q, dict) and 
-                        'question' in q and 
-                        'options' in q and 
-                        'correct' in q and
-                        isinstance(q['options'], list) and 
-                        len(q['options']) == 4):
-                        valid_questions.append(q)
+                for i, q in enumerate(selected_questions):
+                    if _valid_quiz_question(q):
+                        topic = q.get('topic') if q.get('topic') in QUIZ_TOPICS else selected_topics[i % len(selected_topics)]
+                        valid_questions.append(_bank_question(q, topic, q.get('difficulty', 'medium')))
+                
+                # Live questions go into the bank too, so they can be served again later
+                save_quiz_questions(valid_questions)
                 
                 if len(valid_questions) >= num_questions:
                     logger.info(f"Generated {len(valid_questions)} completely random quiz questions")
@@ -403,6 +701,197 @@ Make each question completely unique and random - no patterns or similarities!''
         logger.error(f"Error generating quiz questions: {str(e)}")
         return []
 
+def quiz_bank_key(topic: str, difficulty: str) -> str:
+    return f"{topic}|{difficulty}"
+
+def quiz_question_id(question: Dict) -> str:
+    # Content hash, so the same question generated twice is stored once
+    return hashlib.sha1(question['question'].strip().lower().encode('utf-8')).hexdigest()[:20]
+
+def _valid_quiz_question(q) -> bool:
+    return (isinstance(q, dict) and
+            isinstance(q.get('question'), str) and q['question'].strip() and
+            isinstance(q.get('options'), list) and len(q['options']) == 4 and
+            isinstance(q.get('correct'), int) and 0 <= q['correct'] < 4)
+
+def _bank_question(q: Dict, topic: str, difficulty: str) -> Dict:
+    difficulty = difficulty if difficulty in QUIZ_XP_REWARDS else 'medium'
+    question = {
+        'question': q['question'].strip(),
+        'options': [str(option) for option in q['options']],
+        'correct': q['correct'],
+        'difficulty': difficulty,
+        'xp_reward': QUIZ_XP_REWARDS[difficulty],
+        'explanation': q.get('explanation', ''),
+        'topic': topic,
+        'bank_key': quiz_bank_key(topic, difficulty),
+    }
+    question['id'] = quiz_question_id(question)
+    return question
+
+def _load_quiz_bank(force: bool = False) -> Dict[str, List[Dict]]:
+    with _quiz_bank_lock:
+        loaded_at = _quiz_bank_cache['loaded_at']
+        if not force and loaded_at and datetime.now() - loaded_at < timedelta(seconds=QUIZ_BANK_CACHE_SECONDS):
+            return _quiz_bank_cache['questions']
+    
+    bank = {}
+    try:
+        db = get_firestore_db()
+        for doc in db.collection(QUIZ_BANK_COLLECTION).stream():
+            question = doc.to_dict()
+            question['id'] = doc.id
+            bank.setdefault(question.get('bank_key', ''), []).append(question)
+    except Exception as e:
+        logger.error(f"Error loading quiz question bank: {str(e)}")
+        return _quiz_bank_cache['questions'] or {}
+    
+    with _quiz_bank_lock:
+        _quiz_bank_cache.update(questions=bank, loaded_at=datetime.now())
+    return bank
+
+def save_quiz_questions(questions: List[Dict]) -> int:
+    if not questions:
+        return 0
+    try:
+        db = get_firestore_db()
+        batch = db.batch()
+        for question in questions:
+            data = {key: value for key, value in question.items() if key != 'id'}
+            data['created_at'] = firestore.SERVER_TIMESTAMP
+            batch.set(db.collection(QUIZ_BANK_COLLECTION).document(question['id']), data)
+        batch.commit()
+    except Exception as e:
+        logger.error(f"Error saving quiz questions: {str(e)}")
+        return 0
+    
+    with _quiz_bank_lock:
+        bank = _quiz_bank_cache['questions']
+        if bank is not None:
+            for question in questions:
+                entries = bank.setdefault(question['bank_key'], [])
+                if all(existing['id'] != question['id'] for existing in entries):
+                    entries.append(question)
+    return len(questions)
+
+def generate_bank_questions(topic: str, difficulty: str, count: int = QUIZ_BANK_GENERATE_COUNT) -> List[Dict]:
+    try:
+        # Bank refills run in the background and must not eat into the interactive rate limit
+        model = get_gemini_model(priority=PRIORITY_BACKGROUND)
+        if not model:
+            return []
+        
+        prompt = f'''Generate {count} different {difficulty} multiple-choice cooking quiz questions about {topic}.
+
+Each question must have exactly 4 options, the index (0-3) of the correct option and a brief explanation.
+Make the questions distinct from each other and suitable for restaurant kitchen staff.'''
+        
+        response = model.generate_content(prompt, generation_config=_json_generation_config(QUIZ_RESPONSE_SCHEMA))
+        questions = json.loads(response.text)
+        return [_bank_question(q, topic, difficulty) for q in questions if _valid_quiz_question(q)]
+        
+    except Exception as e:
+        logger.error(f"Error generating bank questions for {topic} ({difficulty}): {str(e)}")
+        return []
+
+def top_up_quiz_bank(min_per_key: int = QUIZ_BANK_MIN_PER_KEY, max_calls: int = QUIZ_BANK_REFILL_MAX_CALLS) -> int:
+    bank = _load_quiz_bank()
+    shortfall = sorted(
+        ((len(bank.get(quiz_bank_key(topic, difficulty), [])), topic, difficulty)
+         for topic in QUIZ_TOPICS for difficulty in QUIZ_DIFFICULTIES),
+    )
+    
+    added = 0
+    for stocked, topic, difficulty in shortfall[:max_calls]:
+        if stocked >= min_per_key:
+            break
+        questions = generate_bank_questions(topic, difficulty)
+        if not questions:
+            # A failed call would fail the same way for the next key; leave the rest for a later refill
+            logger.warning(f"Stopping quiz bank refill after no questions for {topic} ({difficulty})")
+            break
+        added += save_quiz_questions(questions)
+    
+    if added:
+        logger.info(f"Added {added} questions to the quiz bank")
+    return added
+
+def _run_quiz_bank_refill():
+    try:
+        top_up_quiz_bank()
+    finally:
+        _quiz_refill_lock.release()
+
+def start_quiz_bank_refill() -> bool:
+    # At most one refill runs at a time; later requests are dropped while it is busy
+    if not _quiz_refill_lock.acquire(blocking=False):
+        return False
+    threading.Thread(target=_run_quiz_bank_refill, name="quiz-bank-refill", daemon=True).start()
+    return True
+
+def get_seen_question_ids(user_id: str) -> set:
+    try:
+        doc = get_firestore_db().collection(QUIZ_SEEN_COLLECTION).document(user_id).get()
+        return set(doc.to_dict().get('question_ids', [])) if doc.exists else set()
+    except Exception as e:
+        logger.error(f"Error reading seen quiz questions: {str(e)}")
+        return set()
+
+def mark_questions_seen(user_id: str, question_ids: List[str]):
+    if not question_ids:
+        return
+    try:
+        doc_ref = get_firestore_db().collection(QUIZ_SEEN_COLLECTION).document(user_id)
+        doc = doc_ref.get()
+        previous = doc.to_dict().get('question_ids', []) if doc.exists else []
+        
+        # Oldest first, so re-seen questions move to the end and the oldest are dropped past the cap
+        new_ids = list(dict.fromkeys(question_ids))
+        recent = [qid for qid in previous if qid not in new_ids] + new_ids
+        doc_ref.set(
+            {'question_ids': recent[-QUIZ_SEEN_MAX_IDS:], 'updated_at': firestore.SERVER_TIMESTAMP},
+            merge=True
+        )
+    except Exception as e:
+        logger.error(f"Error marking quiz questions seen: {str(e)}")
+
+def sample_quiz_questions(bank: Dict[str, List[Dict]], seen_ids: set, num_questions: int) -> List[Dict]:
+    # One question per topic while topics last, with a random difficulty mix
+    topics = list(QUIZ_TOPICS)
+    random.shuffle(topics)
+    selected = []
+    for round_topics in (topics, topics):
+        for topic in round_topics:
+            if len(selected) >= num_questions:
+                return selected
+            difficulties = random.sample(QUIZ_DIFFICULTIES, len(QUIZ_DIFFICULTIES))
+            for difficulty in difficulties:
+                chosen_ids = {q['id'] for q in selected}
+                unseen = [q for q in bank.get(quiz_bank_key(topic, difficulty), [])
+                          if q['id'] not in seen_ids and q['id'] not in chosen_ids]
+                if unseen:
+                    selected.append(random.choice(unseen))
+                    break
+    return selected
+
+def get_quiz_questions(user_id: str, num_questions: int = 5, ingredients: List[str] = None) -> List[Dict]:
+    """Get unseen questions for a user from the question bank, generating live only when it runs dry"""
+    bank = _load_quiz_bank()
+    seen_ids = get_seen_question_ids(user_id) if user_id else set()
+    questions = sample_quiz_questions(bank, seen_ids, num_questions)
+    
+    if len(questions) < num_questions:
+        start_quiz_bank_refill()
+        generated = generate_dynamic_quiz_questions(ingredients or [], num_questions - len(questions))
+        chosen_ids = {q['id'] for q in questions}
+        questions += [q for q in generated if q['id'] not in chosen_ids and q['id'] not in seen_ids]
+    elif any(len(bank.get(quiz_bank_key(q['topic'], q['difficulty']), [])) <= QUIZ_BANK_MIN_PER_KEY for q in questions):
+        start_quiz_bank_refill()
+    
+    if user_id:
+        mark_questions_seen(user_id, [q['id'] for q in questions])
+    return questions[:num_questions]
+
 def calculate_quiz_score(answers: List[int], questions: List[Dict]) -> Tuple[int, int, int]:
     correct_answers = 0
     xp_earned = 0
@@ -554,13 +1043,13 @@ def get_leaderboard(limit: int = 10) -> List[Dict]:
         db = get_firestore_db()
 
         stats_query = db.collection('user_stats').order_by('total_xp', direction=firestore.Query.DESCENDING).limit(limit)
-        stats_docs = stats_query.get()
+        stats = [stat_doc.to_dict() for stat_doc in stats_query.get()]
+        levels = calculate_levels_from_xp([stat_data.get('total_xp', 0) for stat_data in stats])
 
         users_ref = db.collection('users')
         leaderboard = []
 
-        for i, stat_doc in enumerate(stats_docs):
-            stat_data = stat_doc.to_dict()
+        for i, stat_data in enumerate(stats):
             user_id = stat_data['user_id']
 
             try:
@@ -573,7 +1062,7 @@ def get_leaderboard(limit: int = 10) -> List[Dict]:
                 'rank': i + 1,
                 'username': username,
                 'total_xp': stat_data.get('total_xp', 0),
-                'level': stat_data.get('level', 1),
+                'level': int(levels[i]),
                 'quizzes_taken': stat_data.get('quizzes_taken', 0),
                 'perfect_scores': stat_data.get('perfect_scores', 0),
                 'achievements': len(stat_data.get('achievements', []))
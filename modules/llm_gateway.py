@@ -0,0 +1,279 @@
+"""
+Shared Gemini gateway for the Smart Restaurant Menu Management App.
+Holds long-lived model instances and applies rate limiting, retries and metrics to every AI call.
+"""
+
+import streamlit as st
+import google.generativeai as genai
+import os
+import random
+import threading
+import time
+import logging
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_NAME = "gemini-1.5-flash"
+
+# Token bucket: sustained requests per minute and the burst allowed on top of it
+GEMINI_REQUESTS_PER_MINUTE = 15
+GEMINI_BURST_SIZE = 5
+MAX_CONCURRENT_CALLS = 4
+
+# Background work (e.g. the quiz bank refill) gets its own smaller budget on top of the shared one,
+# and only draws shared tokens while a reserve is left for interactive calls
+PRIORITY_INTERACTIVE = 'interactive'
+PRIORITY_BACKGROUND = 'background'
+BACKGROUND_REQUESTS_PER_MINUTE = 3
+BACKGROUND_BURST_SIZE = 1
+BACKGROUND_RESERVE_TOKENS = 2
+
+MAX_RETRIES = 4
+BASE_BACKOFF_SECONDS = 1.0
+MAX_BACKOFF_SECONDS = 30.0
+
+_gateway_lock = threading.Lock()
+_configured_api_key = None
+_models = {}
+
+_concurrency = threading.BoundedSemaphore(MAX_CONCURRENT_CALLS)
+
+_metrics_lock = threading.Lock()
+_metrics = {
+    'calls': 0,
+    'errors': 0,
+    'retries': 0,
+    'rate_limited': 0,
+    'in_flight': 0,
+    'peak_in_flight': 0,
+    'total_latency_seconds': 0.0,
+    'last_latency_seconds': 0.0,
+    'prompt_tokens': 0,
+    'response_tokens': 0,
+}
+
+def get_gemini_api_key() -> Optional[str]:
+    """Get the Gemini API key from Streamlit secrets, falling back to the environment"""
+    try:
+        api_key = st.secrets.get("GEMINI_API_KEY")
+    except Exception:
+        api_key = None
+    return api_key or os.environ.get("GEMINI_API_KEY")
+
+class GatewayModel:
+    """GenerativeModel stand-in whose generate_content goes through the gateway"""
+
+    def __init__(self, model, model_name: str, priority: str = PRIORITY_INTERACTIVE):
+        self._model = model
+        self.model_name = model_name
+        self.priority = priority
+
+    def generate_content(self, *args, **kwargs):
+        return call_with_gateway(self._model.generate_content, self.model_name, *args, priority=self.priority, **kwargs)
+
+def get_gemini_model(model_name: str = DEFAULT_MODEL_NAME,
+                     priority: str = PRIORITY_INTERACTIVE) -> Optional[GatewayModel]:
+    """Get a cached, gateway-wrapped Gemini model, or None if no API key is configured"""
+    global _configured_api_key
+
+    api_key = get_gemini_api_key()
+    if not api_key:
+        logger.error("GEMINI_API_KEY not found")
+        return None
+
+    with _gateway_lock:
+        if api_key != _configured_api_key:
+            genai.configure(api_key=api_key)
+            _configured_api_key = api_key
+            _models.clear()
+
+        model = _models.get((model_name, priority))
+        if model is None:
+            model = GatewayModel(genai.GenerativeModel(model_name), model_name, priority)
+            _models[(model_name, priority)] = model
+            logger.info(f"Created Gemini model instance: {model_name} ({priority})")
+        return model
+
+class _TokenBucket:
+    """Sustained requests per minute with a burst allowance on top"""
+
+    def __init__(self, requests_per_minute: float, burst_size: int):
+        self.refill_per_second = requests_per_minute / 60.0
+        self.burst_size = float(burst_size)
+        self.tokens = float(burst_size)
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, reserve: float = 0.0):
+        """Block until a token can be taken while leaving at least reserve tokens in the bucket"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst_size, self.tokens + (now - self.updated_at) * self.refill_per_second)
+                self.updated_at = now
+
+                if self.tokens >= 1 + reserve:
+                    self.tokens -= 1
+                    return
+                wait_seconds = (1 + reserve - self.tokens) / self.refill_per_second
+
+            time.sleep(wait_seconds)
+
+_shared_bucket = _TokenBucket(GEMINI_REQUESTS_PER_MINUTE, GEMINI_BURST_SIZE)
+_background_bucket = _TokenBucket(BACKGROUND_REQUESTS_PER_MINUTE, BACKGROUND_BURST_SIZE)
+
+def _acquire_rate_limit_token(priority: str = PRIORITY_INTERACTIVE):
+    """Block until the token buckets allow another request at this priority"""
+    if priority == PRIORITY_BACKGROUND:
+        _background_bucket.acquire()
+        _shared_bucket.acquire(reserve=BACKGROUND_RESERVE_TOKENS)
+    else:
+        _shared_bucket.acquire()
+
+def _is_retryable_error(error: Exception) -> bool:
+    """Check whether an error is a quota (429) or transient availability error"""
+    error_text = str(error)
+    return (
+        type(error).__name__ in ("ResourceExhausted", "ServiceUnavailable", "TooManyRequests")
+        or "429" in error_text
+        or "503" in error_text
+    )
+
+def _record_usage(response):
+    """Add token counts from a Gemini response to the metrics"""
+    usage = getattr(response, "usage_metadata", None)
+    if not usage:
+        return
+    with _metrics_lock:
+        _metrics['prompt_tokens'] += getattr(usage, "prompt_token_count", 0) or 0
+        _metrics['response_tokens'] += getattr(usage, "candidates_token_count", 0) or 0
+
+def _start_call():
+    """Count a call as in flight and return its start time"""
+    with _metrics_lock:
+        _metrics['calls'] += 1
+        _metrics['in_flight'] += 1
+        _metrics['peak_in_flight'] = max(_metrics['peak_in_flight'], _metrics['in_flight'])
+    return time.monotonic()
+
+def _finish_call(started_at: float, model_name: str, attempt: int):
+    latency = time.monotonic() - started_at
+    with _metrics_lock:
+        _metrics['total_latency_seconds'] += latency
+        _metrics['last_latency_seconds'] = latency
+    logger.info(f"Gemini call to {model_name} took {latency:.2f}s (attempt {attempt + 1})")
+
+def _record_failure(error: Exception, model_name: str, attempt: int) -> bool:
+    """Count a failed call and return whether it should be retried"""
+    retryable = _is_retryable_error(error)
+    with _metrics_lock:
+        _metrics['errors'] += 1
+        if retryable:
+            _metrics['rate_limited'] += 1
+    if not retryable or attempt >= MAX_RETRIES:
+        logger.error(f"Gemini call to {model_name} failed after {attempt + 1} attempts: {str(error)}")
+        return False
+    return True
+
+def _backoff(attempt: int):
+    delay = min(MAX_BACKOFF_SECONDS, BASE_BACKOFF_SECONDS * (2 ** attempt))
+    delay += random.uniform(0, delay / 2)
+    with _metrics_lock:
+        _metrics['retries'] += 1
+    logger.warning(f"Gemini rate limited, retrying in {delay:.1f}s (attempt {attempt + 2})")
+    time.sleep(delay)
+
+class GatewayStream:
+    """Streaming response whose iteration runs under the gateway's rate limit, retries and metrics.
+
+    A stream cannot be resumed part-way, so a retryable error mid-stream restarts the request.
+    Iterating attempts() yields one chunk iterator per attempt so callers can reset their
+    parsing state; iterating the stream directly yields the chunks of every attempt in turn.
+    """
+
+    def __init__(self, func, model_name: str, args, kwargs, priority: str = PRIORITY_INTERACTIVE):
+        self._func = func
+        self.model_name = model_name
+        self._args = args
+        self._kwargs = kwargs
+        self.priority = priority
+        self.restarts = 0
+
+    def _run_attempt(self, attempt: int, state: Dict):
+        _acquire_rate_limit_token(self.priority)
+        with _concurrency:
+            started_at = _start_call()
+            try:
+                last_chunk = None
+                for chunk in self._func(*self._args, **self._kwargs):
+                    last_chunk = chunk
+                    yield chunk
+                _finish_call(started_at, self.model_name, attempt)
+                # Usage metadata arrives with the final chunk
+                if last_chunk is not None:
+                    _record_usage(last_chunk)
+            except Exception as e:
+                state['error'] = e
+            finally:
+                with _metrics_lock:
+                    _metrics['in_flight'] -= 1
+
+    def attempts(self):
+        attempt = 0
+        while True:
+            state = {'error': None}
+            chunks = self._run_attempt(attempt, state)
+            try:
+                yield chunks
+            finally:
+                # Release the concurrency slot even if the caller stopped reading early
+                chunks.close()
+            error = state['error']
+            if error is None:
+                return
+            if not _record_failure(error, self.model_name, attempt):
+                raise error
+            _backoff(attempt)
+            attempt += 1
+            self.restarts += 1
+
+    def __iter__(self):
+        for chunks in self.attempts():
+            yield from chunks
+
+def call_with_gateway(func, model_name: str, *args, priority: str = PRIORITY_INTERACTIVE, **kwargs):
+    """Run a Gemini call under the rate limit and concurrency cap, retrying 429s with backoff"""
+    if kwargs.get("stream"):
+        return GatewayStream(func, model_name, args, kwargs, priority)
+    
+    attempt = 0
+    while True:
+        _acquire_rate_limit_token(priority)
+
+        with _concurrency:
+            started_at = _start_call()
+            try:
+                response = func(*args, **kwargs)
+                _finish_call(started_at, model_name, attempt)
+                _record_usage(response)
+                return response
+
+            except Exception as e:
+                if not _record_failure(e, model_name, attempt):
+                    raise
+
+            finally:
+                with _metrics_lock:
+                    _metrics['in_flight'] -= 1
+
+        _backoff(attempt)
+        attempt += 1
+
+def get_llm_metrics() -> Dict:
+    """Get a snapshot of gateway call, latency and token metrics"""
+    with _metrics_lock:
+        metrics = dict(_metrics)
+    completed = metrics['calls'] - metrics['errors']
+    metrics['avg_latency_seconds'] = metrics['total_latency_seconds'] / completed if completed > 0 else 0.0
+    return metrics
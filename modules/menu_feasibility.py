@@ -0,0 +1,232 @@
+import re
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from firebase_data import get_snapshot_derived, get_inventory_frame
+from modules.quantity_units import parse_to_base
+
+logger = logging.getLogger(__name__)
+
+MENU_COLLECTION = 'menu'
+FEASIBILITY_INDEX_NAME = 'feasibility_index'
+BITS_PER_WORD = 64
+
+def normalize_ingredient_key(name) -> str:
+    text = re.sub(r"\(.*?\)", " ", str(name).lower())
+    words = []
+    for word in re.sub(r"[^a-z0-9]+", " ", text).split():
+        # Plural and singular forms share a key
+        if len(word) > 3 and word.endswith('ies'):
+            word = word[:-3] + 'y'
+        elif len(word) > 3 and word.endswith('oes'):
+            word = word[:-2]
+        elif len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        words.append(word)
+    return " ".join(words)
+
+def dish_ingredient_names(dish: Dict) -> List[str]:
+    ingredients = dish.get('ingredients')
+    if isinstance(ingredients, str):
+        names = ingredients.split(',')
+    elif isinstance(ingredients, list):
+        names = [str(i) for i in ingredients]
+    else:
+        return []
+    return [name.strip() for name in names if name.strip()]
+
+def _popcount(words: np.ndarray) -> np.ndarray:
+    if words.shape[1] == 0:
+        return np.zeros(words.shape[0], dtype=np.int64)
+    return np.unpackbits(words.view(np.uint8), axis=1).sum(axis=1)
+
+class DishFeasibilityIndex:
+    """Menu dishes encoded as bitsets over a shared, normalized ingredient vocabulary"""
+
+    def __init__(self, dishes: List[Dict]):
+        self.vocabulary = {}
+        self.dishes = []
+        self.requirements = []
+
+        required_keys = []
+        for dish in dishes:
+            names = dish_ingredient_names(dish)
+            if not names:
+                continue
+            keys = {}
+            for name in names:
+                key = normalize_ingredient_key(name)
+                if key:
+                    keys.setdefault(key, name)
+                    self.vocabulary.setdefault(key, len(self.vocabulary))
+            if not keys:
+                continue
+            self.dishes.append(dish)
+            self.requirements.append(keys)
+            required_keys.append(list(keys))
+
+        self.word_count = (len(self.vocabulary) + BITS_PER_WORD - 1) // BITS_PER_WORD
+        self.matrix = np.zeros((len(self.dishes), self.word_count), dtype=np.uint64)
+        for row, keys in enumerate(required_keys):
+            self.matrix[row] = self._encode(keys)
+
+    def _encode(self, keys) -> np.ndarray:
+        bits = np.zeros(self.word_count * BITS_PER_WORD, dtype=np.uint8)
+        positions = [self.vocabulary[key] for key in keys if key in self.vocabulary]
+        bits[positions] = 1
+        # Little-endian bit order inside each byte, bytes in native word order
+        return np.packbits(bits, bitorder='little').view(np.uint64)
+
+    def availability_mask(self, available_ingredients: List[str]) -> np.ndarray:
+        return self._encode({normalize_ingredient_key(name) for name in available_ingredients})
+
+    def missing_counts(self, available_ingredients: List[str]) -> np.ndarray:
+        mask = self.availability_mask(available_ingredients)
+        return _popcount(self.matrix & ~mask)
+
+    def evaluate(self, available_ingredients: List[str], max_missing: int = 0) -> List[Dict]:
+        """Get dishes missing at most max_missing ingredients, fewest missing first"""
+        if not self.dishes:
+            return []
+
+        available_keys = {normalize_ingredient_key(name) for name in available_ingredients}
+        counts = self.missing_counts(available_ingredients)
+        rows = np.flatnonzero(counts <= max_missing)
+        rows = rows[np.argsort(counts[rows], kind='stable')]
+
+        results = []
+        for row in rows:
+            requirements = self.requirements[row]
+            results.append({
+                'name': self.dishes[row].get('name', 'Unknown Dish'),
+                'missing_count': int(counts[row]),
+                'missing': [name for key, name in requirements.items() if key not in available_keys],
+                'dish': self.dishes[row],
+            })
+        return results
+
+def get_feasibility_index() -> Optional[DishFeasibilityIndex]:
+    try:
+        return get_snapshot_derived(MENU_COLLECTION, FEASIBILITY_INDEX_NAME, DishFeasibilityIndex)
+    except Exception as e:
+        logger.error(f"Error building dish feasibility index: {str(e)}")
+        return None
+
+def find_feasible_dishes(available_ingredients: List[str], max_missing: int = 0) -> List[Dict]:
+    index = get_feasibility_index()
+    if index is None:
+        return []
+    return index.evaluate(available_ingredients, max_missing)
+
+CAPACITY_MATRIX_NAME = 'capacity_matrix'
+
+def _dish_amounts(dish: Dict) -> Dict[str, tuple]:
+    amounts = {}
+    quantities = dish.get('ingredient_quantities')
+    if isinstance(quantities, dict):
+        for name, quantity in quantities.items():
+            base_quantity, base_unit = parse_to_base(quantity)
+            if base_quantity:
+                amounts[normalize_ingredient_key(name)] = (base_quantity, base_unit)
+    return amounts
+
+class CapacityMatrix:
+    """Per-portion amounts for the menu dishes that list ingredient quantities"""
+
+    def __init__(self, index: DishFeasibilityIndex):
+        # Dishes without ingredient_quantities are left out rather than planned on guessed amounts
+        rows = []
+        self.columns = []
+        column_by_pair = {}
+        for dish, requirements in zip(index.dishes, index.requirements):
+            amounts = {
+                (key, unit): quantity
+                for key, (quantity, unit) in _dish_amounts(dish).items()
+                if key in requirements
+            }
+            if not amounts:
+                continue
+            for pair in amounts:
+                if pair not in column_by_pair:
+                    column_by_pair[pair] = len(self.columns)
+                    self.columns.append(pair)
+            rows.append((dish.get('name', 'Unknown Dish'), amounts))
+
+        self.names = [name for name, _ in rows]
+        self.row_by_name = {name: row for row, name in enumerate(self.names)}
+        self.keys = [key for key, _ in self.columns]
+
+        # Stock only covers an amount given in the same base unit, so each (key, unit) pair is its own column
+        self.amounts = np.zeros((len(rows), len(self.columns)), dtype=np.float64)
+        for row, (_, amounts) in enumerate(rows):
+            for pair, quantity in amounts.items():
+                self.amounts[row, column_by_pair[pair]] = quantity
+
+def _build_capacity_matrix(docs: List[Dict]) -> CapacityMatrix:
+    return CapacityMatrix(DishFeasibilityIndex(docs))
+
+def get_inventory_stock(columns: List[tuple]) -> np.ndarray:
+    """Get usable stock in base units for each (ingredient key, base unit) pair"""
+    frame = get_inventory_frame()
+    frame = frame[(frame['days_until_expiry'] >= 0) & (frame['base_quantity'] > 0)]
+    frame = frame.assign(key=frame['Ingredient'].map(normalize_ingredient_key))
+    # Rows in different units are never added together
+    grouped = frame.groupby(['key', 'base_unit'])['base_quantity'].sum()
+    stock = [grouped.get(column, 0.0) for column in columns]
+    return np.array(stock, dtype=np.float64)
+
+def plan_menu_capacity() -> Dict[str, Dict]:
+    """Get how many portions of each menu dish the current inventory supports on its own
+
+    Only dishes that list ingredient_quantities are planned; the rest are absent from the result.
+    """
+    try:
+        matrix = get_snapshot_derived(MENU_COLLECTION, CAPACITY_MATRIX_NAME, _build_capacity_matrix)
+        if not matrix.names:
+            return {}
+
+        stock = get_inventory_stock(matrix.columns)
+        amounts = matrix.amounts
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratios = np.where(amounts > 0, stock / amounts, np.inf)
+        portions = np.floor(ratios.min(axis=1))
+        limiting = ratios.argmin(axis=1)
+
+        return {
+            name: {
+                'portions': int(portions[row]),
+                'limiting_ingredient': matrix.keys[limiting[row]],
+            }
+            for row, name in enumerate(matrix.names)
+        }
+    except Exception as e:
+        logger.error(f"Error planning menu capacity: {str(e)}")
+        return {}
+
+def allocate_portions(dish_demand: Dict[str, int]) -> Dict[str, int]:
+    """Greedily allocate shared stock to dishes in the given order, up to each dish's demand
+
+    Dishes without ingredient_quantities are not planned and are left out of the allocation.
+    """
+    try:
+        matrix = get_snapshot_derived(MENU_COLLECTION, CAPACITY_MATRIX_NAME, _build_capacity_matrix)
+        stock = get_inventory_stock(matrix.columns)
+
+        allocation = {}
+        for name, demand in dish_demand.items():
+            row = matrix.row_by_name.get(name)
+            if row is None:
+                continue
+            needed = matrix.amounts[row]
+            used = needed > 0
+            portions = int(np.floor((stock[used] / needed[used]).min()))
+            portions = max(0, min(int(demand), portions))
+            stock -= needed * portions
+            allocation[name] = portions
+        return allocation
+    except Exception as e:
+        logger.error(f"Error allocating portions: {str(e)}")
+        return {}
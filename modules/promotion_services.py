@@ -1,96 +1,57 @@
 import streamlit as st
-import google.generativeai as genai
-import re
+from modules.llm_gateway import get_gemini_model
 import json
-import pandas as pd
 from datetime import datetime
 from dateutil import parser
-import firebase_admin
 from firebase_admin import firestore
+from firebase_init import get_client, MAIN_APP, EVENT_APP
+from firebase_data import get_inventory_frame
+from modules.menu_feasibility import find_feasible_dishes, plan_menu_capacity
 import logging
 import time
 
 logger = logging.getLogger(__name__)
 
+# Dishes missing up to this many ingredients are reported as near-feasible
+NEAR_FEASIBLE_MAX_MISSING = 2
+# Dishes the kitchen can make fewer portions of are not promoted
+MIN_PROMOTION_PORTIONS = 20
+
 def get_promotion_firebase_db():
-    try:
-        if 'event_app' in [app.name for app in firebase_admin._apps.values()]:
-            return firestore.client(app=firebase_admin.get_app(name='event_app'))
-        else:
-            from modules.event_planner import init_event_firebase
-            init_event_firebase()
-            return firestore.client(app=firebase_admin.get_app(name='event_app'))
-    except Exception as e:
-        logger.error(f"Error getting promotion Firebase DB: {str(e)}")
+    db = get_client(EVENT_APP)
+    if not db:
+        logger.error("Error getting promotion Firebase DB")
         st.error("Failed to connect to database. Please check your Firebase configuration.")
-        return None
+    return db
 
 def get_main_firebase_db():
-    try:
-        if firebase_admin._DEFAULT_APP_NAME in [app.name for app in firebase_admin._apps.values()]:
-            return firestore.client()
-        else:
-            from firebase_init import init_firebase
-            init_firebase()
-            return firestore.client()
-    except Exception as e:
-        logger.error(f"Error getting main Firebase DB: {str(e)}")
+    db = get_client(MAIN_APP)
+    if not db:
+        logger.error("Error getting main Firebase DB")
         st.error("Failed to connect to main database. Please check your Firebase configuration.")
-        return None
+    return db
 
 def configure_promotion_gemini_ai():
     try:
-        api_key = st.secrets.get("GEMINI_API_KEY")
-        if not api_key:
+        model = get_gemini_model()
+        if not model:
             raise ValueError("GEMINI_API_KEY not found in Streamlit secrets")
-        
-        genai.configure(api_key=api_key)
-        return genai.GenerativeModel("gemini-1.5-flash")
+        return model
     except Exception as e:
         logger.error(f"Error configuring Gemini AI for promotions: {str(e)}")
         st.error("Failed to configure AI service. Please check your API key configuration.")
         return None
 
-def parse_quantity(qty_string):
-    match = re.match(r"([\d\.]+)\s*(\w+)", str(qty_string).lower())
-    return (float(match.group(1)), match.group(2)) if match else (None, None)
-
-def standardize_quantity(quantity, unit):
-    if unit == 'kg': 
-        return quantity * 1000
-    if unit == 'g': 
-        return quantity
-    if unit == 'l': 
-        return quantity * 1000
-    if unit == 'ml': 
-        return quantity
-    if unit in ['pcs', 'piece', 'pieces']: 
-        return quantity
-    return None
-
 def filter_valid_ingredients(db):
     try:
-        inventory_data = [doc.to_dict() for doc in db.collection('ingredient_inventory').stream()]
-        if not inventory_data:
+        inventory_df = get_inventory_frame()
+        if inventory_df.empty:
             logger.warning("No inventory data found")
             return []
-            
-        inventory_df = pd.DataFrame(inventory_data)
-        today = datetime.now()
-        
-        inventory_df['Expiry Date'] = pd.to_datetime(inventory_df['Expiry Date'], dayfirst=True, errors='coerce')
-        
-        parsed = inventory_df['Quantity'].apply(parse_quantity)
-        inventory_df['value'] = parsed.apply(lambda x: x[0] if x else None)
-        inventory_df['unit'] = parsed.apply(lambda x: x[1] if x else None)
-        inventory_df['standardized_quantity'] = inventory_df.apply(
-            lambda row: standardize_quantity(row['value'], row['unit']) if row['value'] and row['unit'] else None, 
-            axis=1
-        )
         
         valid_df = inventory_df[
-            (inventory_df['Expiry Date'] > today) & 
-            (inventory_df['standardized_quantity'] > 0)
+            (inventory_df['days_until_expiry'] > 0) & 
+            (inventory_df['base_quantity'] > 0)
         ]
         
         available_ingredients = valid_df['Ingredient'].str.lower().tolist()
@@ -103,23 +64,9 @@ def filter_valid_ingredients(db):
 
 def find_possible_dishes(db, available_ingredients):
     try:
-        menu_data = [doc.to_dict() for doc in db.collection('menu').stream()]
-        if not menu_data:
-            logger.warning("No menu data found")
-            return []
-            
-        possible_dishes = []
-        for dish in menu_data:
-            if 'ingredients' in dish and dish['ingredients']:
-                if isinstance(dish['ingredients'], str):
-                    required = [i.strip().lower() for i in dish['ingredients'].split(',')]
-                elif isinstance(dish['ingredients'], list):
-                    required = [str(i).strip().lower() for i in dish['ingredients']]
-                else:
-                    continue
-                    
-                if all(ingredient in available_ingredients for ingredient in required):
-                    possible_dishes.append(dish.get('name', 'Unknown Dish'))
+        possible_dishes = [result['name'] for result in find_feasible_dishes(available_ingredients)]
+        if not possible_dishes:
+            logger.warning("No feasible dishes found")
         
         logger.info(f"Found {len(possible_dishes)} possible dishes")
         return possible_dishes
@@ -128,6 +75,34 @@ def find_possible_dishes(db, available_ingredients):
         logger.error(f"Error finding possible dishes: {str(e)}")
         return []
 
+def find_near_feasible_dishes(db, available_ingredients, max_missing=NEAR_FEASIBLE_MAX_MISSING):
+    try:
+        near_dishes = [
+            {'name': result['name'], 'missing': result['missing']}
+            for result in find_feasible_dishes(available_ingredients, max_missing)
+            if result['missing_count'] > 0
+        ]
+        logger.info(f"Found {len(near_dishes)} dishes missing at most {max_missing} ingredients")
+        return near_dishes
+        
+    except Exception as e:
+        logger.error(f"Error finding near-feasible dishes: {str(e)}")
+        return []
+
+def filter_dishes_by_capacity(possible_dishes, min_portions=MIN_PROMOTION_PORTIONS):
+    capacity = plan_menu_capacity()
+    if not capacity:
+        return [(dish, None) for dish in possible_dishes]
+    
+    dishes = [(dish, capacity.get(dish, {}).get('portions')) for dish in possible_dishes]
+    stocked = [(dish, portions) for dish, portions in dishes if portions is None or portions >= min_portions]
+    if not stocked:
+        logger.warning(f"No dish has {min_portions}+ portions in stock, promoting all possible dishes")
+        return dishes
+    
+    logger.info(f"{len(stocked)} of {len(dishes)} possible dishes have at least {min_portions} portions")
+    return sorted(stocked, key=lambda item: -(item[1] or 0))
+
 def generate_campaign(staff_name, promotion_type, promotion_goal, target_audience, campaign_duration, possible_dishes):
     try:
         model = configure_promotion_gemini_ai()
@@ -135,6 +110,10 @@ def generate_campaign(staff_name, promotion_type, promotion_goal, target_audienc
             return None
             
         current_month = datetime.now().strftime("%B %Y")
+        dish_lines = [
+            f"{dish} (about {portions} portions in stock)" if portions is not None else dish
+            for dish, portions in filter_dishes_by_capacity(possible_dishes)
+        ]
         
         prompt_text = f"""
         You are a professional restaurant marketing expert creating a campaign for {current_month}.
@@ -147,7 +126,7 @@ def generate_campaign(staff_name, promotion_type, promotion_goal, target_audienc
         - Duration: {campaign_duration}
 
         AVAILABLE DISHES TODAY:
-        {', '.join(possible_dishes)}
+        {', '.join(dish_lines)}
 
         INSTRUCTIONS:
         1. Create an attractive, specific campaign using ONLY the dishes listed above
@@ -0,0 +1,118 @@
+import re
+import logging
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Every quantity is stored and compared in one base unit per dimension
+BASE_UNITS = {'mass': 'g', 'volume': 'ml', 'count': 'pcs'}
+
+# canonical unit -> (dimension, factor to the base unit)
+UNIT_DEFINITIONS = {
+    'mg': ('mass', 0.001),
+    'g': ('mass', 1.0),
+    'kg': ('mass', 1000.0),
+    'oz': ('mass', 28.349523125),
+    'lb': ('mass', 453.59237),
+    'ml': ('volume', 1.0),
+    'cl': ('volume', 10.0),
+    'dl': ('volume', 100.0),
+    'l': ('volume', 1000.0),
+    'tsp': ('volume', 5.0),
+    'tbsp': ('volume', 15.0),
+    'cup': ('volume', 240.0),
+    'pcs': ('count', 1.0),
+    'dozen': ('count', 12.0),
+}
+
+UNIT_ALIASES = {
+    'mg': ['milligram', 'milligrams'],
+    'g': ['gm', 'gms', 'gr', 'gram', 'grams', 'gramme', 'grammes'],
+    'kg': ['kgs', 'kilo', 'kilos', 'kilogram', 'kilograms'],
+    'oz': ['ounce', 'ounces'],
+    'lb': ['lbs', 'pound', 'pounds'],
+    'ml': ['mls', 'millilitre', 'millilitres', 'milliliter', 'milliliters'],
+    'cl': ['centilitre', 'centilitres', 'centiliter', 'centiliters'],
+    'dl': ['decilitre', 'decilitres', 'deciliter', 'deciliters'],
+    'l': ['lt', 'ltr', 'ltrs', 'litre', 'litres', 'liter', 'liters'],
+    'tsp': ['teaspoon', 'teaspoons'],
+    'tbsp': ['tbs', 'tablespoon', 'tablespoons'],
+    'cup': ['cups'],
+    'pcs': ['pc', 'piece', 'pieces', 'unit', 'units', 'each', 'ea', 'nos', 'no'],
+    'dozen': ['doz', 'dozens'],
+}
+
+def _build_unit_table() -> Dict[str, Tuple[str, float]]:
+    table = {}
+    for unit, (dimension, factor) in UNIT_DEFINITIONS.items():
+        conversion = (BASE_UNITS[dimension], factor)
+        table[unit] = conversion
+        for alias in UNIT_ALIASES.get(unit, []):
+            table[alias] = conversion
+    return table
+
+# alias (lowercase) -> (base unit, factor), precomputed once at import
+UNIT_TABLE = _build_unit_table()
+_BASE_UNIT_BY_ALIAS = {alias: base for alias, (base, _) in UNIT_TABLE.items()}
+_FACTOR_BY_ALIAS = {alias: factor for alias, (_, factor) in UNIT_TABLE.items()}
+
+_QUANTITY_PATTERN = r'^\s*(\d+(?:\.\d*)?|\.\d+)\s*([a-z][a-z ]*?)?\.?\s*$'
+_QUANTITY_RE = re.compile(_QUANTITY_PATTERN)
+
+def normalize_unit(unit) -> Optional[str]:
+    if unit is None:
+        return None
+    key = str(unit).strip().lower().rstrip('.')
+    return key if key in UNIT_TABLE else None
+
+def parse_quantity(qty_string, default_unit: Optional[str] = None) -> Tuple[Optional[float], Optional[str]]:
+    match = _QUANTITY_RE.match(str(qty_string).lower())
+    if not match:
+        return None, None
+    unit = match.group(2) or (str(default_unit).strip().lower() if default_unit else None)
+    return float(match.group(1)), unit
+
+def to_base_quantity(value, unit) -> Tuple[Optional[float], Optional[str]]:
+    key = normalize_unit(unit)
+    if value is None or key is None:
+        return None, None
+    base_unit, factor = UNIT_TABLE[key]
+    return float(value) * factor, base_unit
+
+def parse_to_base(qty_string, default_unit: Optional[str] = None) -> Tuple[Optional[float], Optional[str]]:
+    value, unit = parse_quantity(qty_string, default_unit)
+    return to_base_quantity(value, unit)
+
+def base_quantity_fields(quantity, unit) -> Dict:
+    # Written next to 'Quantity'/'Unit' so stock math never re-parses strings
+    base_quantity, base_unit = parse_to_base(quantity, unit)
+    return {'base_quantity': base_quantity, 'base_unit': base_unit}
+
+def parse_quantity_series(quantities: pd.Series, units: Optional[pd.Series] = None) -> pd.DataFrame:
+    text = quantities.fillna('').astype(str).str.lower()
+    extracted = text.str.extract(_QUANTITY_PATTERN)
+
+    unit = extracted[1].str.strip()
+    if units is not None:
+        fallback = units.fillna('').astype(str).str.strip().str.lower()
+        unit = unit.where(unit.fillna('') != '', fallback)
+    unit = unit.str.rstrip('.')
+
+    value = pd.to_numeric(extracted[0], errors='coerce')
+    factor = unit.map(_FACTOR_BY_ALIAS)
+    base_quantity = value * factor
+    return pd.DataFrame({
+        'quantity_value': value,
+        'quantity_unit': unit,
+        'base_quantity': base_quantity,
+        # Same as parse_to_base: no unit without a usable amount
+        'base_unit': unit.map(_BASE_UNIT_BY_ALIAS).where(base_quantity.notna()),
+    }, index=quantities.index)
+
+def convert_base_quantity(base_quantity, base_unit: str, target_unit: str) -> Optional[float]:
+    key = normalize_unit(target_unit)
+    if key is None or UNIT_TABLE[key][0] != base_unit:
+        return None
+    return base_quantity / UNIT_TABLE[key][1]
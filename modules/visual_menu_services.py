@@ -1,9 +1,9 @@
 import streamlit as st
-import google.generativeai as genai
+from modules.llm_gateway import get_gemini_model
 from google.cloud import vision
 from google.oauth2 import service_account
-import firebase_admin
 from firebase_admin import firestore
+from firebase_init import get_client, MAIN_APP, EVENT_APP
 from PIL import Image, ImageEnhance
 import io
 import time
@@ -17,29 +17,17 @@ import json
 logger = logging.getLogger(__name__)
 
 def get_visual_menu_firebase_db():
-    try:
-        if 'event_app' in [app.name for app in firebase_admin._apps.values()]:
-            return firestore.client(app=firebase_admin.get_app(name='event_app'))
-        else:
-            from modules.event_planner import init_event_firebase
-            init_event_firebase()
-            return firestore.client(app=firebase_admin.get_app(name='event_app'))
-    except Exception as e:
-        logger.error(f"Error getting visual menu Firebase DB: {str(e)}")
+    db = get_client(EVENT_APP)
+    if not db:
+        logger.error("Error getting visual menu Firebase DB")
         st.error("Failed to connect to database. Please check your Firebase configuration.")
-        return None
+    return db
 
 def get_main_firebase_db():
-    try:
-        if firebase_admin._DEFAULT_APP_NAME in [app.name for app in firebase_admin._apps.values()]:
-            return firestore.client()
-        else:
-            from firebase_init import init_firebase
-            init_firebase()
-            return firestore.client()
-    except Exception as e:
-        logger.error(f"Error getting main Firebase DB: {str(e)}")
-        return None
+    db = get_client(MAIN_APP)
+    if not db:
+        logger.error("Error getting main Firebase DB")
+    return db
 
 def configure_vision_api():
     try:
@@ -57,12 +45,10 @@ def configure_vision_api():
 
 def configure_visual_gemini_ai():
     try:
-        api_key = st.secrets.get("GEMINI_API_KEY")
-        if not api_key:
+        model = get_gemini_model()
+        if not model:
             raise ValueError("GEMINI_API_KEY not found in Streamlit secrets")
-        
-        genai.configure(api_key=api_key)
-        return genai.GenerativeModel("gemini-1.5-flash")
+        return model
     except Exception as e:
         logger.error(f"Error configuring Gemini AI for visual menu: {str(e)}")
         st.error("Failed to configure AI service. Please check your API key configuration.")
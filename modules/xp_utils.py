@@ -1,42 +1,59 @@
 import logging
+from bisect import bisect_right
+
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
+BASE_LEVEL_XP = 100
+LEVEL_XP_GROWTH = 0.2
+MAX_LEVEL = 100
+
+def _xp_to_advance(level):
+    # XP needed to go from level to level + 1
+    return int(BASE_LEVEL_XP * (1.0 + (level - 1) * LEVEL_XP_GROWTH))
+
+def _build_level_thresholds(max_level):
+    thresholds = [0]
+    for level in range(1, max_level + 1):
+        thresholds.append(thresholds[-1] + _xp_to_advance(level))
+    return thresholds
+
+# Cumulative XP to reach each level: LEVEL_THRESHOLDS[level - 1], up to MAX_LEVEL + 1 for progress at the cap
+LEVEL_THRESHOLDS = _build_level_thresholds(MAX_LEVEL)
+_LEVEL_THRESHOLD_ARRAY = np.array(LEVEL_THRESHOLDS[:MAX_LEVEL], dtype=np.int64)
+
 def calculate_xp_for_level(level):
     if level <= 1:
         return 0
-    
-    total_xp = 0
-    base_xp = 100
-    
-    for current_level in range(1, level):
-        multiplier = 1.0 + (current_level - 1) * 0.2
-        level_xp = int(base_xp * multiplier)
-        total_xp += level_xp
-        
-        logger.debug(f"Level {current_level} -> {current_level + 1}: {level_xp} XP (Total: {total_xp})")
-    
-    return total_xp
+    if level <= len(LEVEL_THRESHOLDS):
+        return LEVEL_THRESHOLDS[level - 1]
+    return LEVEL_THRESHOLDS[-1] + sum(_xp_to_advance(current) for current in range(len(LEVEL_THRESHOLDS), level))
 
 def calculate_level_from_xp(total_xp):
     if total_xp < 0:
         return 1
     
-    level = 1
-    
-    while True:
-        xp_for_next_level = calculate_xp_for_level(level + 1)
-        if total_xp < xp_for_next_level:
-            break
-        level += 1
-        
-        if level > 100:
-            logger.warning(f"User has extremely high XP ({total_xp}), capping at level 100")
-            break
-    
-    logger.debug(f"User with {total_xp} XP is level {level}")
+    level = bisect_right(LEVEL_THRESHOLDS, total_xp, 0, MAX_LEVEL)
+    if level == MAX_LEVEL and total_xp >= LEVEL_THRESHOLDS[MAX_LEVEL]:
+        logger.warning(f"User has extremely high XP ({total_xp}), capping at level {MAX_LEVEL}")
     return level
 
+def calculate_levels_from_xp(xp_values):
+    """Vectorized calculate_level_from_xp for a whole array of XP totals"""
+    xp = np.asarray(xp_values, dtype=np.int64)
+    levels = np.searchsorted(_LEVEL_THRESHOLD_ARRAY, xp, side='right')
+    return np.clip(levels, 1, MAX_LEVEL)
+
+def calculate_xp_progress_batch(xp_values):
+    """Get (levels, XP into current level, XP needed for next level) arrays for XP totals"""
+    xp = np.maximum(np.asarray(xp_values, dtype=np.int64), 0)
+    levels = calculate_levels_from_xp(xp)
+    thresholds = np.asarray(LEVEL_THRESHOLDS, dtype=np.int64)
+    current_level_xp = xp - thresholds[levels - 1]
+    xp_needed_for_next = np.maximum(thresholds[levels] - xp, 0)
+    return levels, current_level_xp, xp_needed_for_next
+
 def get_xp_progress(total_xp, current_level):
     try:
         xp_for_current_level = calculate_xp_for_level(current_level)
@@ -65,7 +82,6 @@ def get_xp_progress(total_xp, current_level):
 
 def get_xp_breakdown_for_levels(max_level=10):
     breakdown = []
-    base_xp = 100
     
     try:
         for level in range(1, max_level + 1):
@@ -73,8 +89,7 @@ def get_xp_breakdown_for_levels(max_level=10):
                 xp_for_this_level = 0
                 total_xp_required = 0
             else:
-                multiplier = 1.0 + (level - 2) * 0.2
-                xp_for_this_level = int(base_xp * multiplier)
+                xp_for_this_level = _xp_to_advance(level - 1)
                 total_xp_required = calculate_xp_for_level(level)
             
             breakdown.append((level, xp_for_this_level, total_xp_required))
@@ -92,7 +107,7 @@ def get_xp_for_next_levels(current_level, num_levels=5):
     try:
         for i in range(1, num_levels + 1):
             target_level = current_level + i
-            if target_level > 100:
+            if target_level > MAX_LEVEL:
                 break
                 
             total_xp_required = calculate_xp_for_level(target_level)
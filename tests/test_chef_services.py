@@ -0,0 +1,297 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from modules import chef_services
+from modules.chef_services import iter_json_array_objects
+
+
+def _dish(name):
+    return {
+        'name': name, 'description': 'd', 'ingredients': ['x'],
+        'cook_time': '10 minutes', 'cuisine': 'Indian', 'diet': ['Veg'],
+        'category': 'Starter', 'types': ['Normal'], 'source': 'Gemini',
+        'timestamp': '2026-01-01T00:00:00',
+    }
+
+
+def _split(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def test_objects_are_yielded_across_chunk_boundaries():
+    text = 'Sure! [{"name": "a {b}", "q": "say \\"}\\""}, {"name": "c"}] x'
+    objects = list(iter_json_array_objects(_split(text, 3)))
+    assert objects == [{'name': 'a {b}', 'q': 'say "}"'}, {'name': 'c'}]
+
+
+def test_malformed_objects_are_skipped():
+    text = '[{"name": "a",}, {"name": "b"}]'
+    assert list(iter_json_array_objects([text])) == [{'name': 'b'}]
+
+
+class _Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class _Stream:
+    def __init__(self, attempts, error=None):
+        self._attempts = attempts
+        self._error = error
+
+    def attempts(self):
+        for texts in self._attempts:
+            yield iter([_Chunk(text) for text in texts])
+        if self._error:
+            raise self._error
+
+
+class _Model:
+    def __init__(self, stream):
+        self.stream = stream
+
+    def generate_content(self, prompt, stream=False):
+        return self.stream
+
+
+def _use_stream(monkeypatch, stream):
+    monkeypatch.setattr(
+        chef_services, 'configure_gemini_ai', lambda: _Model(stream))
+
+
+def test_restarted_stream_skips_dishes_already_yielded(monkeypatch):
+    first = json.dumps([_dish('Dal Fry')])[:-1]
+    second = json.dumps([_dish('Dal  fry'), _dish('Paneer Tikka')])
+    _use_stream(monkeypatch, _Stream([_split(first, 7), _split(second, 7)]))
+    names = [d['name'] for d in chef_services.generate_dish_stream('p')]
+    assert names == ['Dal Fry', 'Paneer Tikka']
+
+
+def test_stream_failure_is_raised_after_partial_output(monkeypatch):
+    partial = json.dumps([_dish('Dal Fry')])[:-1]
+    _use_stream(monkeypatch, _Stream([[partial]], RuntimeError('cut off')))
+    received = []
+    with pytest.raises(RuntimeError):
+        for dish in chef_services.generate_dish_stream('p'):
+            received.append(dish['name'])
+    assert received == ['Dal Fry']
+
+
+def test_merge_menu_dishes_skips_duplicate_names():
+    merged = chef_services.merge_menu_dishes(
+        [{'name': 'Dal Fry'}], [{'name': 'dal-fry!'}, {'name': 'Kheer'}])
+    assert [d['name'] for d in merged] == ['Dal Fry', 'Kheer']
+
+
+def test_menu_shard_retries_malformed_responses(monkeypatch):
+    dish = _dish('Kheer')
+    del dish['category']
+    responses = iter([None, [dish, 'not a dish']])
+    monkeypatch.setattr(
+        chef_services, 'generate_dish', lambda prompt: next(responses))
+    dishes = chef_services.generate_menu_shard('p', 'Dessert')
+    assert [(d['name'], d['category']) for d in dishes] == [
+        ('Kheer', 'Dessert')]
+
+
+def test_menu_shard_gives_up_after_its_attempts(monkeypatch):
+    monkeypatch.setattr(chef_services, 'generate_dish', lambda prompt: None)
+    assert chef_services.generate_menu_shard('p', 'Dessert') == []
+
+
+def test_sharded_generation_reports_every_shard(monkeypatch):
+    def fake_shard(prompt, category):
+        if category == 'Beverage':
+            raise RuntimeError('quota')
+        return [_dish(category)]
+    monkeypatch.setattr(chef_services, 'generate_menu_shard', fake_shard)
+    results = dict(chef_services.generate_menu_sharded(['rice'], ['egg']))
+    assert set(results) == {name for name, _, _ in chef_services.MENU_SHARDS}
+    assert results['Beverages'] == []
+    assert results['Desserts'][0]['name'] == 'Dessert'
+
+
+class _Doc:
+    def __init__(self, name):
+        self.id = name
+        self.reference = name
+
+
+class _Query:
+    def __init__(self, db, after=None, size=None):
+        self.db = db
+        self.after = after
+        self.size = size
+
+    def select(self, fields):
+        return self
+
+    def order_by(self, field):
+        return self
+
+    def limit(self, size):
+        return _Query(self.db, self.after, size)
+
+    def start_after(self, doc):
+        return _Query(self.db, doc.id, self.size)
+
+    def stream(self):
+        self.db.streams += 1
+        names = sorted(self.db.docs)
+        if self.after is not None:
+            names = [name for name in names if name > self.after]
+        return [_Doc(name) for name in names[:self.size]]
+
+
+class _Batch:
+    def __init__(self, db):
+        self.db = db
+        self.pending = []
+
+    def delete(self, ref):
+        self.pending.append(ref)
+
+    def commit(self):
+        self.db.commits.append(len(self.pending))
+        self.db.docs.difference_update(self.pending)
+
+
+class _Db:
+    def __init__(self, count):
+        self.docs = {f'doc{i:03d}' for i in range(count)}
+        self.commits = []
+        self.streams = 0
+
+    def collection(self, name):
+        return _Query(self)
+
+    def batch(self):
+        return _Batch(self)
+
+
+def test_delete_collection_docs_pages_through_batches():
+    db = _Db(7)
+    deleted, errors = chef_services.delete_collection_docs(
+        db, 'menu', page_size=3)
+    assert (deleted, errors) == (7, [])
+    assert db.commits == [3, 3, 1]
+    assert not db.docs
+    # The short last page ends the loop without another listing
+    assert db.streams == 3
+
+
+def test_delete_collection_docs_checks_after_a_full_last_page():
+    db = _Db(6)
+    assert chef_services.delete_collection_docs(
+        db, 'menu', page_size=3) == (6, [])
+    assert db.commits == [3, 3]
+    assert db.streams == 3
+
+
+class _SaveBatch:
+    def __init__(self, db):
+        self.db = db
+        self.writes = []
+
+    def set(self, ref, data):
+        self.writes.append((ref, data['name']))
+
+    def commit(self):
+        if len(self.db.commits) in self.db.fail_commits:
+            self.db.commits.append(None)
+            raise RuntimeError('deadline exceeded')
+        self.db.commits.append(len(self.writes))
+        self.db.writes.extend(self.writes)
+
+
+class _SaveDb:
+    def __init__(self, fail_commits=()):
+        self.commits = []
+        self.writes = []
+        self.fail_commits = set(fail_commits)
+
+    def collection(self, name):
+        return type('Collection', (), {
+            'document': lambda _, doc_id: (name, doc_id)})()
+
+    def batch(self):
+        return _SaveBatch(self)
+
+
+def test_save_dishes_batched_chunks_to_the_batch_limit():
+    dishes = [_dish(f'Dish {i}') for i in range(600)]
+    progress = []
+    db = _SaveDb()
+    saved, errors = chef_services.save_dishes_batched(
+        db, dishes, on_progress=progress.append)
+
+    # Two collections per dish, so 250 dishes fill a 500-write batch
+    assert db.commits == [500, 500, 200]
+    assert progress == pytest.approx([1 / 3, 2 / 3, 1.0])
+    assert errors == [] and len(saved) == 600
+    menu_ids = [doc_id for (name, doc_id), _ in db.writes if name == 'menu']
+    archive_ids = [doc_id for (name, doc_id), _ in db.writes
+                   if name == 'recipe_archive']
+    assert menu_ids == archive_ids == [doc_id for doc_id, _ in saved]
+
+
+def test_save_dishes_batched_reports_skipped_and_failed_dishes():
+    dishes = [_dish(f'Dish {i}') for i in range(300)]
+    dishes.append(_dish('dish 0 '))
+    dishes.append(dict(_dish('No cuisine'), cuisine=''))
+    db = _SaveDb(fail_commits={1})
+    saved, errors = chef_services.save_dishes_batched(db, dishes)
+
+    assert [doc_id for doc_id, _ in saved] == [
+        chef_services.menu_dish_doc_id(d) for d in dishes[:250]]
+    reasons = dict(errors)
+    assert reasons['dish 0 '] == 'duplicate dish name'
+    assert reasons['No cuisine'] == 'missing fields: cuisine'
+    assert reasons['Dish 299'] == 'deadline exceeded'
+    assert len(errors) == 52
+
+
+def test_menu_dish_doc_id_is_stable_within_a_week():
+    monday = datetime(2026, 3, 2, 9)
+    sunday = datetime(2026, 3, 8, 23)
+    dish = _dish('Paneer Tikka')
+    doc_id = chef_services.menu_dish_doc_id(dish, monday)
+    assert doc_id.startswith('2026-03-02_')
+    assert chef_services.menu_dish_doc_id(
+        _dish(' paneer tikka'), sunday) == doc_id
+    assert chef_services.menu_dish_doc_id(
+        dish, datetime(2026, 3, 9)) != doc_id
+
+
+def test_generated_quantities_reach_capacity_planning(monkeypatch):
+    import pandas as pd
+    from modules import menu_feasibility
+
+    dish = dict(_dish('Kheer'), ingredients=['Rice', 'Milk', 'Sugar'])
+    dish['ingredient_quantities'] = {
+        'Rice': '50 g', 'Milk': '0.25 l', 'Sugar': 'to taste'}
+    _use_stream(monkeypatch, _Stream([_split(json.dumps([dish]), 9)]))
+    menu = list(chef_services.generate_dish_stream('p'))
+    assert menu[0]['ingredient_quantities'] == {
+        'Rice': '50 g', 'Milk': '0.25 l'}
+
+    frame = pd.DataFrame({
+        'Ingredient': ['Rice', 'Milk'], 'base_quantity': [500.0, 1000.0],
+        'base_unit': ['g', 'ml'], 'days_until_expiry': [30, 3]})
+    monkeypatch.setattr(menu_feasibility, 'get_inventory_frame',
+                        lambda: frame)
+    monkeypatch.setattr(
+        menu_feasibility, 'get_snapshot_derived',
+        lambda collection, name, builder: builder(menu))
+    assert menu_feasibility.plan_menu_capacity() == {
+        'Kheer': {'portions': 4, 'limiting_ingredient': 'milk'}}
+
+
+def test_ingredient_quantities_default_to_empty():
+    dish, missing = chef_services.validate_and_fix_dish(_dish('Dal'))
+    assert missing == [] and dish['ingredient_quantities'] == {}
+    assert chef_services.parse_ingredient_quantities(
+        'Rice: 120 g\nMilk: 0.2 l, Salt: a pinch, Eggs') == {
+        'Rice': '120 g', 'Milk': '0.2 l'}
@@ -0,0 +1,242 @@
+import firebase_data
+from firebase_data import (
+    _IngredientSearchIndex, _new_entry, record_collection_write,
+)
+
+
+def _index(docs):
+    index = _IngredientSearchIndex()
+    for doc in docs:
+        index.add(doc)
+    return index
+
+
+def test_search_ranks_ingredient_matches_above_name_matches():
+    index = _index([
+        {'id': 'a', 'name': 'Tomato Soup', 'ingredients': ['water']},
+        {'id': 'b', 'name': 'Salad', 'ingredients': ['tomato', 'lettuce']},
+    ])
+    results = index.search(['tomato'], limit=10)
+    assert [doc['id'] for doc in results] == ['b', 'a']
+    assert results[0]['match_score'] == 2
+
+
+def test_search_does_not_match_across_ingredient_boundaries():
+    index = _index([{'id': 'a', 'name': 'x', 'ingredients': ['rice', 'egg']}])
+    assert index.search(['riceegg'], limit=10) == []
+    assert index.search(['ice'], limit=10)[0]['id'] == 'a'
+
+
+def test_short_terms_scan_every_doc():
+    index = _index([{'id': 'a', 'name': 'Tofu', 'ingredients': []}])
+    assert list(index.candidates('to')) == [0]
+
+
+def test_record_collection_write_upserts_by_id():
+    key = ('test_app', 'menu')
+    firebase_data._snapshot_cache[key] = _new_entry(
+        [{'id': 'd1', 'name': 'Old', 'category': 'Main'}], 0.0)
+    try:
+        record_collection_write(
+            'menu', {'name': 'New', 'category': 'Dessert'}, 'd1', 'test_app')
+        record_collection_write(
+            'menu', {'name': 'Other', 'category': 'Main'}, 'd2', 'test_app')
+        entry = firebase_data._snapshot_cache[key]
+        assert [(d['id'], d['name']) for d in entry['docs']] == [
+            ('d1', 'New'), ('d2', 'Other')]
+    finally:
+        firebase_data._snapshot_cache.pop(key, None)
+
+
+def test_record_collection_write_defaults_to_the_data_app(monkeypatch):
+    monkeypatch.setattr(firebase_data, '_snapshot_cache', {
+        ('event_app', 'menu'): _new_entry([], 0.0),
+        ('[DEFAULT]', 'menu'): _new_entry([], 0.0),
+    })
+    monkeypatch.setattr(firebase_data, '_get_data_db',
+                        lambda: ('event_app', object()))
+    record_collection_write('menu', {'name': 'Dal'}, 'd1')
+    cache = firebase_data._snapshot_cache
+    assert [d['id'] for d in cache[('event_app', 'menu')]['docs']] == ['d1']
+    assert cache[('[DEFAULT]', 'menu')]['docs'] == []
+
+
+def test_parse_expiry_string_accepts_bare_and_prefixed_dates():
+    from datetime import date
+    assert firebase_data.parse_expiry_string('05/03/2026') == date(2026, 3, 5)
+    assert firebase_data.parse_expiry_string(
+        'Expiry date: 05/03/2026 ') == date(2026, 3, 5)
+    assert firebase_data.parse_expiry_string('expiry date:05/03/2026') == \
+        date(2026, 3, 5)
+    assert firebase_data.parse_expiry_string('2026-03-05') is None
+    assert firebase_data.parse_expiry_string(None) is None
+
+
+def test_expiry_fields_for_prefixed_date():
+    fields = firebase_data.expiry_fields('Expiry date: 02/01/1970')
+    assert fields['expiry_day'] == 1
+    assert fields['expiry_at'].isoformat() == '1970-01-02T00:00:00+00:00'
+
+
+def test_inventory_frame_derives_expiry_day_for_legacy_docs():
+    frame = firebase_data._build_inventory_frame([
+        {'id': 'new', 'Ingredient': 'Rice', 'Expiry Date': '02/01/1970',
+         'expiry_day': 1},
+        {'id': 'old', 'Ingredient': 'Dal',
+         'Expiry Date': 'Expiry date: 03/01/1970'},
+        {'id': 'bad', 'Ingredient': 'Salt', 'Expiry Date': 'soon'},
+    ])
+    assert frame['expiry_day'].tolist()[:2] == [1, 2]
+    assert frame['expiry_day'].isna().tolist() == [False, False, True]
+
+
+def test_legacy_ingredients_are_fetched_for_leftovers(monkeypatch):
+    from modules import leftover
+    today = firebase_data.today_epoch_day()
+    future = firebase_data.date.fromordinal(
+        today + firebase_data._EPOCH_ORDINAL + 3).strftime('%d/%m/%Y')
+    docs = [
+        {'id': 'old', 'Ingredient': 'Dal', 'Expiry Date':
+         'Expiry date: ' + future},
+        {'id': 'gone', 'Ingredient': 'Milk', 'Expiry Date': '01/01/2000'},
+    ]
+    monkeypatch.setattr(leftover, 'get_client', lambda app: object())
+    monkeypatch.setattr(firebase_data, '_get_snapshot_entry',
+                        lambda name: _new_entry(docs, 0.0))
+    fetched = leftover.fetch_ingredients_from_firebase()
+    assert [item['doc_id'] for item in fetched] == ['old']
+    assert fetched[0]['days_until_expiry'] == 3
+
+
+def test_inventory_frame_parses_quantities_and_prefers_stored_base():
+    frame = firebase_data._build_inventory_frame([
+        {'id': 'a', 'Ingredient': ' Rice ', 'Quantity': '2 kg',
+         'Unit': ''},
+        {'id': 'b', 'Ingredient': 'Milk', 'Quantity': '500',
+         'Unit': 'ml'},
+        {'id': 'c', 'Ingredient': 'Eggs', 'Quantity': '12',
+         'Unit': 'pcs', 'base_quantity': 10.0, 'base_unit': 'pc'},
+    ])
+    assert frame['Ingredient'].tolist() == ['Rice', 'Milk', 'Eggs']
+    assert frame['doc_id'].tolist() == ['a', 'b', 'c']
+    assert frame['Type'].tolist() == ['', '', '']
+    assert frame['base_unit'].tolist()[:2] == ['g', 'ml']
+    assert frame['base_quantity'].tolist()[:2] == [2000.0, 500.0]
+    assert frame.loc[2, 'base_quantity'] == 10.0
+
+
+def test_get_inventory_frame_computes_days_per_call(monkeypatch):
+    today = firebase_data.today_epoch_day()
+    docs = [
+        {'id': 'x', 'Ingredient': 'A', 'expiry_day': today - 1},
+        {'id': 'y', 'Ingredient': 'B', 'expiry_day': today + 2},
+        {'id': 'z', 'Ingredient': 'C', 'expiry_day': today + 5},
+        {'id': 'w', 'Ingredient': 'D', 'expiry_day': today + 30},
+        {'id': 'v', 'Ingredient': 'E'},
+    ]
+    entry = _new_entry(docs, 0.0)
+    monkeypatch.setattr(firebase_data, '_get_snapshot_entry',
+                        lambda name: entry)
+    frame = firebase_data.get_inventory_frame()
+    assert frame['days_until_expiry'].tolist() == [
+        -1, 2, 5, 30, firebase_data.MISSING_EXPIRY_DAYS]
+    assert frame['expiry_status'].tolist() == [
+        'expired', 'critical', 'warning', 'fresh', 'invalid']
+
+    # The cached frame is shared, callers only get copies
+    frame.loc[0, 'Ingredient'] = 'changed'
+    assert entry['frame'].loc[0, 'Ingredient'] == 'A'
+    assert 'days_until_expiry' not in entry['frame'].columns
+
+
+class _Watch:
+    def __init__(self, callback):
+        self.callback = callback
+        self.is_active = True
+        self.unsubscribed = False
+
+    def unsubscribe(self):
+        self.unsubscribed = True
+        self.is_active = False
+
+
+class _ListenDb:
+    def __init__(self):
+        self.watches = []
+
+    def collection(self, name):
+        return self
+
+    def on_snapshot(self, callback):
+        watch = _Watch(callback)
+        self.watches.append(watch)
+        callback(None, [], None)
+        return watch
+
+
+class _Change:
+    def __init__(self, kind, doc_id, data=None):
+        self.type = type('ChangeType', (), {'name': kind})()
+        self.document = type('Doc', (), {
+            'id': doc_id, 'to_dict': lambda _: dict(data or {})})()
+
+
+def _mirror(monkeypatch):
+    monkeypatch.setattr(firebase_data, '_snapshot_cache', {})
+    monkeypatch.setattr(firebase_data, '_mirrors', {})
+    db = _ListenDb()
+    key = ('app', 'ingredient_inventory')
+    return key, db, firebase_data._get_mirror(key, db)
+
+
+def test_mirror_applies_changes_until_closed(monkeypatch):
+    key, db, mirror = _mirror(monkeypatch)
+    assert mirror.active
+    mirror._on_snapshot(None, [_Change('ADDED', 'a', {'Ingredient': 'Rice'})],
+                        None)
+    assert firebase_data._snapshot_cache[key]['docs'] == [
+        {'Ingredient': 'Rice', 'id': 'a'}]
+
+    mirror.close()
+    assert db.watches[0].unsubscribed and not mirror.active
+    mirror._on_snapshot(None, [_Change('REMOVED', 'a')], None)
+    assert len(firebase_data._snapshot_cache[key]['docs']) == 1
+
+
+def test_mirror_stops_after_failed_change_set(monkeypatch):
+    key, db, mirror = _mirror(monkeypatch)
+    broken = _Change('ADDED', 'b')
+    broken.document.to_dict = None
+    mirror._on_snapshot(None, [broken], None)
+    assert not mirror.active
+
+    # The next read starts a fresh listener and closes the broken one
+    restarted = firebase_data._get_mirror(key, db)
+    assert restarted is not mirror and restarted.active
+    assert db.watches[0].unsubscribed
+
+
+def test_mirror_restarts_when_stream_ends(monkeypatch):
+    key, db, mirror = _mirror(monkeypatch)
+    db.watches[0].is_active = False
+    assert not mirror.active
+    assert firebase_data._get_mirror(key, db) is not mirror
+    assert len(db.watches) == 2
+
+
+def test_recipes_by_category_merges_substring_matches(monkeypatch):
+    archive = [
+        {'id': 'a', 'category': 'Main Course'},
+        {'id': 'b', 'category': 'Main'},
+        {'id': 'c', 'category': 'Dessert'},
+        {'id': 'd', 'category': 'main dishes'},
+    ]
+    monkeypatch.setattr(
+        firebase_data, 'query_collection',
+        lambda name, filters, limit: [r for r in archive
+                                      if r['category'] in filters[0][2]])
+    monkeypatch.setattr(firebase_data, 'fetch_recipe_archive',
+                        lambda: archive)
+    found = firebase_data.get_recipes_by_category('Main')
+    assert [r['id'] for r in found] == ['b', 'a', 'd']
+    assert len(firebase_data.get_recipes_by_category('Main', limit=2)) == 2
@@ -0,0 +1,174 @@
+from modules import ingredients_management as im
+
+
+def test_alternatives_doc_id_is_a_safe_document_id():
+    for name in ['.', '..', 'salt/pepper', 'olive oil']:
+        doc_id = im.alternatives_doc_id(im.normalize_ingredient_name(name))
+        assert len(doc_id) == 40 and '/' not in doc_id
+
+
+def test_cached_alternatives_do_not_need_an_api_key(monkeypatch):
+    monkeypatch.setattr(im, 'get_gemini_api_key', lambda: None)
+    monkeypatch.setattr(
+        im, '_get_cached_alternatives', lambda key: ['ghee', 'butter'])
+    assert im.suggest_alternatives_with_ai('Oil') == ['ghee', 'butter']
+
+
+def test_cache_miss_without_api_key_reports_unavailable(monkeypatch):
+    monkeypatch.setattr(im, 'get_gemini_api_key', lambda: None)
+    monkeypatch.setattr(im, '_get_cached_alternatives', lambda key: None)
+    result = im.suggest_alternatives_with_ai('Oil')
+    assert 'API key not found' in result[0]
+
+
+class _RecordingQuery:
+    def __init__(self, calls=None):
+        self.calls = calls if calls is not None else []
+
+    def where(self, field, op, value):
+        self.calls.append(('where', field, op, value))
+        return self
+
+    def order_by(self, field):
+        self.calls.append(('order_by', field))
+        return self
+
+    def end_before(self, fields):
+        self.calls.append(('end_before', fields))
+        return self
+
+
+class _RecordingDb:
+    def collection(self, name):
+        return _RecordingQuery()
+
+
+def test_query_fields_normalize_name_and_type():
+    fields = im.build_ingredient_query_fields(
+        '  Red  Onion ', '01/02/2026', ' Dry  GOODS')
+    assert fields['name_lower'] == 'red onion'
+    assert {'r', 'red onion', 'o', 'onion'} <= set(fields['name_prefixes'])
+    assert fields['type_lower'] == 'dry goods'
+    assert fields['expiry_day'] is not None
+
+
+def test_type_filter_is_case_insensitive(monkeypatch):
+    monkeypatch.setattr(im, 'today_epoch_day', lambda: 100)
+    query = im._build_ingredient_query(
+        _RecordingDb(), 'On', 'expiring_soon', 'Dry Goods')
+    assert query.calls == [
+        ('where', 'name_prefixes', 'array_contains', 'on'),
+        ('where', 'type_lower', '==', 'dry goods'),
+        ('where', 'expiry_day', '>=', 100),
+        ('where', 'expiry_day', '<', 100 + im.EXPIRING_SOON_DAYS + 1),
+        ('order_by', 'expiry_day'),
+        ('order_by', '__name__'),
+    ]
+
+
+def test_missing_index_error_is_reported(monkeypatch):
+    class FailedPrecondition(Exception):
+        pass
+
+    class _FailingDb:
+        def collection(self, name):
+            raise FailedPrecondition('The query requires an index.')
+
+    monkeypatch.setattr(im, 'count_unmigrated_ingredients', lambda: 0)
+    monkeypatch.setattr(im, 'get_event_firestore_db', lambda: _FailingDb())
+    items, cursor, error = im.query_ingredients('on')
+    assert (items, cursor) == ([], None)
+    assert 'composite index' in error
+
+
+def _inventory_frame():
+    import pandas as pd
+    return pd.DataFrame({
+        'doc_id': ['a', 'b', 'c'],
+        'Ingredient': ['Onion', 'Green Onion', 'Milk'],
+        'Type': ['Vegetable', 'vegetable ', 'Dairy'],
+        'Unit': ['kg', '', 'l'],
+        'expiry_day': [99.0, 105.0, None],
+        'days_until_expiry': [-1, 5, -999],
+    })
+
+
+def test_unmigrated_inventory_is_filtered_in_memory(monkeypatch):
+    monkeypatch.setattr(im, 'count_unmigrated_ingredients', lambda: 2)
+    monkeypatch.setattr(im, 'get_inventory_frame', _inventory_frame)
+    monkeypatch.setattr(im, 'today_epoch_day', lambda: 100)
+
+    items, cursor, error = im.query_ingredients(
+        'onion', 'all', 'VEGETABLE', page_size=1)
+    assert error is None and cursor == 1
+    assert [item['doc_id'] for item in items] == ['a']
+    items, cursor, error = im.query_ingredients(
+        'onion', 'all', 'VEGETABLE', page_size=1, start_after=cursor)
+    assert [item['doc_id'] for item in items] == ['b'] and cursor is None
+    assert items[0]['Unit'] == 'N/A'
+    assert im.count_ingredients('', 'expiring_soon') == 1
+
+
+def test_counts_are_cached_until_the_inventory_changes(monkeypatch):
+    calls = []
+    version = [1]
+
+    def fake_count(search_term, expiry_filter, type_filter):
+        calls.append(expiry_filter)
+        return 3
+
+    monkeypatch.setattr(im, 'count_ingredients', fake_count)
+    monkeypatch.setattr(im, 'get_collection_version', lambda c: version[0])
+    monkeypatch.setattr(im, '_ingredient_count_cache',
+                        {'version': None, 'counts': {}})
+
+    counts = im.get_ingredient_counts('', 'all', 'all')
+    assert counts == {'expired': 3, 'expiring_soon': 3, 'fresh': 3,
+                      'total': 3}
+    im.get_ingredient_counts('', 'all', 'all')
+    assert len(calls) == 4
+
+    assert im.get_ingredient_counts('', 'fresh', 'all')['expired'] == 0
+    assert len(calls) == 5
+
+    version[0] = 2
+    im.get_ingredient_counts('', 'all', 'all')
+    assert len(calls) == 9
+
+
+def test_memory_search_matches_the_indexed_prefixes():
+    names = ['Tomato', 'Cherry Tomatoes', 'Green  Chilli',
+             'Extra virgin olive oil (cold pressed)']
+    searches = ['t', 'mato', 'tom', 'cherry tom', 'chil', 'green ch',
+                'olive', 'extra virgin olive oil (cold', 'xtra virgin olive']
+    for name in names:
+        fields = im.build_ingredient_query_fields(name, '01/01/2026')
+        for search in searches:
+            indexed = search[:im.NAME_PREFIX_MAX_LENGTH] in \
+                fields['name_prefixes'] and search in fields['name_lower']
+            assert im.name_matches_search(name, search) == indexed, \
+                (name, search)
+
+
+def test_memory_search_uses_word_prefixes(monkeypatch):
+    monkeypatch.setattr(im, 'get_inventory_frame', _inventory_frame)
+    frame = im._filter_inventory_frame('nion')
+    assert frame.empty
+    frame = im._filter_inventory_frame('oni')
+    assert frame['doc_id'].tolist() == ['a', 'b']
+
+
+def test_expired_filter_keeps_unparseable_dates(monkeypatch):
+    monkeypatch.setattr(im, 'today_epoch_day', lambda: 100)
+    query = im._build_ingredient_query(_RecordingDb(), '', 'expired')
+    assert query.calls == [
+        ('order_by', 'expiry_day'),
+        ('order_by', '__name__'),
+        ('end_before', {'expiry_day': 100}),
+    ]
+
+    monkeypatch.setattr(im, 'get_inventory_frame', _inventory_frame)
+    frame = im._filter_inventory_frame('', 'expired')
+    assert frame['doc_id'].tolist() == ['c', 'a']
+    frame = im._filter_inventory_frame('', 'expiring_soon')
+    assert frame['doc_id'].tolist() == ['b']
@@ -0,0 +1,266 @@
+import random
+import threading
+
+import pytest
+
+from modules import leftover
+from modules.leftover import ExpiryScheduler
+
+
+def _items(days, today):
+    return [{'Ingredient': f'item{i}', 'expiry_day': today + day}
+            for i, day in enumerate(days)]
+
+
+def test_soonest_matches_sorted_order(monkeypatch):
+    today = 20000
+    monkeypatch.setattr(leftover, 'today_epoch_day', lambda: today)
+    rng = random.Random(7)
+    days = [rng.randint(-5, 40) for _ in range(300)]
+    scheduler = ExpiryScheduler(_items(days, today))
+
+    expected = sorted((day, i) for i, day in enumerate(days) if day >= 0)
+    assert len(scheduler) == len(expected)
+    for limit in (0, 1, 7, 50, len(expected) + 10):
+        result = scheduler.soonest(limit)
+        assert [(d, int(item['Ingredient'][4:])) for d, item in result] \
+            == expected[:limit]
+    within = scheduler.soonest(within_days=3)
+    assert [d for d, _ in within] == [d for d, _ in expected if d <= 3]
+
+
+def test_soonest_does_not_consume_the_heap(monkeypatch):
+    today = 20000
+    monkeypatch.setattr(leftover, 'today_epoch_day', lambda: today)
+    scheduler = ExpiryScheduler(_items([3, 1, 2], today))
+    assert [d for d, _ in scheduler.soonest(2)] == [1, 2]
+    assert [d for d, _ in scheduler.soonest()] == [1, 2, 3]
+    assert len(scheduler) == 3
+
+
+def test_advance_pops_expired_items(monkeypatch):
+    today = 20000
+    monkeypatch.setattr(leftover, 'today_epoch_day', lambda: today)
+    scheduler = ExpiryScheduler(_items([0, 1, 5, -2], today))
+    assert len(scheduler) == 3
+
+    monkeypatch.setattr(leftover, 'today_epoch_day', lambda: today + 2)
+    assert [d for d, _ in scheduler.soonest(5)] == [3]
+    assert len(scheduler) == 1
+    # The day never moves backwards
+    assert scheduler.advance(today) == []
+    assert scheduler.today == today + 2
+
+
+def test_urgent_priorities_only_cover_the_leftovers(monkeypatch):
+    today = 20000
+    monkeypatch.setattr(leftover, 'today_epoch_day', lambda: today)
+    scheduler = ExpiryScheduler(_items([1, 2, 30], today) + [
+        {'Ingredient': 'Rice', 'expiry_day': today + 2}])
+    monkeypatch.setattr(leftover, 'get_expiry_scheduler', lambda: scheduler)
+    urgent = leftover._urgent_priority_ingredients([' rice ', 'item2'])
+    assert [(u['name'], u['days_until_expiry']) for u in urgent] == [
+        ('Rice', 2)]
+
+
+class _Model:
+    def __init__(self):
+        self.prompts = []
+
+    def generate_content(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        if 'stale bread' in prompt:
+            raise RuntimeError('quota exceeded')
+        text = '1. Fried Rice Bowl\n2. Rice Pudding\n3. Rice Cutlets'
+        return type('Response', (), {'text': text})()
+
+
+def _batch_env(monkeypatch, model):
+    monkeypatch.setattr(leftover, 'get_gemini_model', lambda: model)
+    contexts = []
+    monkeypatch.setattr(leftover, 'get_restaurant_context',
+                        lambda: contexts.append(1) or 'Indian kitchen')
+
+    def priorities(leftovers):
+        if 'paneer' in leftovers:
+            raise RuntimeError('inventory offline')
+        return []
+    monkeypatch.setattr(leftover, '_urgent_priority_ingredients', priorities)
+    return contexts
+
+
+def test_batch_isolates_failures_per_set(monkeypatch):
+    model = _Model()
+    contexts = _batch_env(monkeypatch, model)
+    results = leftover.suggest_recipes_batch({
+        'grill': ['rice', 'paneer'],
+        'bakery': ['stale bread'],
+        'bar': [],
+    }, max_suggestions=2, max_workers=2)
+
+    assert results['grill'] == {
+        'recipes': ['Fried Rice Bowl', 'Rice Pudding'], 'error': None}
+    assert results['bakery'] == {'recipes': [], 'error': 'quota exceeded'}
+    assert results['bar'] == {'recipes': [],
+                              'error': 'No leftovers provided'}
+    # Context is loaded once and shared, not once per set
+    assert contexts == [1]
+    assert len(model.prompts) == 2
+    assert all('Indian kitchen' in prompt for prompt in model.prompts)
+
+
+def test_batch_without_model_reports_every_set(monkeypatch):
+    _batch_env(monkeypatch, None)
+    results = leftover.suggest_recipes_batch({'grill': ['rice'], 'bar': []})
+    assert results['grill']['error'].startswith('GEMINI_API_KEY not found')
+    assert results['bar']['error'] == 'No leftovers provided'
+
+
+class _JsonModel:
+    def __init__(self, text):
+        self.text = text
+        self.configs = []
+
+    def generate_content(self, prompt, generation_config=None):
+        self.configs.append(generation_config)
+        return type('Response', (), {'text': self.text})()
+
+
+def test_structured_recipes_rank_by_leftover_coverage(monkeypatch):
+    model = _JsonModel(
+        '[{"name": "Rice Bowl", "ingredients_used": ["Rice"],'
+        ' "prep_time_minutes": 10},'
+        ' {"name": "Paneer Pulao", "description": "One pot.",'
+        ' "ingredients_used": ["rice", "Paneer"], "prep_time_minutes": 30},'
+        ' {"name": " ", "ingredients_used": [], "prep_time_minutes": 5}]')
+    _batch_env(monkeypatch, model)
+    recipes = leftover.suggest_recipes(
+        ['rice', 'paneer'], 3, priority_ingredients=[], structured=True)
+    assert [r['name'] for r in recipes] == ['Paneer Pulao', 'Rice Bowl']
+    assert [r['leftover_coverage'] for r in recipes] == [1.0, 0.5]
+    assert model.configs[0].response_mime_type == 'application/json'
+
+
+def test_structured_failures_are_raised(monkeypatch):
+    _batch_env(monkeypatch, _JsonModel('[]'))
+    with pytest.raises(ValueError, match='no usable recipes'):
+        leftover.suggest_recipes(['rice'], 3, priority_ingredients=[],
+                                 structured=True)
+
+    _batch_env(monkeypatch, _JsonModel('not json'))
+    assert leftover.suggest_recipes_batch(
+        {'grill': ['rice']}, structured=True)['grill']['error']
+
+
+def _question(text, correct=1):
+    return {'question': text, 'options': ['a', 'b', 'c', 'd'],
+            'correct': correct, 'explanation': 'because'}
+
+
+def test_valid_quiz_question_checks_shape():
+    assert leftover._valid_quiz_question(_question('Why rest dough?'))
+    assert not leftover._valid_quiz_question(_question(' '))
+    assert not leftover._valid_quiz_question(_question('Q', correct=4))
+    assert not leftover._valid_quiz_question(
+        dict(_question('Q'), options=['a', 'b']))
+    assert not leftover._valid_quiz_question('Q')
+
+
+def test_bank_question_ids_by_content():
+    question = leftover._bank_question(
+        _question(' Why rest dough? '), 'Baking', 'expert')
+    assert question['difficulty'] == 'medium'
+    assert question['xp_reward'] == leftover.QUIZ_XP_REWARDS['medium']
+    assert question['bank_key'] == leftover.quiz_bank_key('Baking', 'medium')
+    again = leftover._bank_question(_question('why rest dough?'), 'Baking',
+                                    'hard')
+    assert again['id'] == question['id']
+
+
+def test_sample_skips_seen_and_spreads_topics():
+    topics = leftover.QUIZ_TOPICS[:3]
+    bank = {}
+    for topic in topics:
+        for n in range(2):
+            question = leftover._bank_question(
+                _question(f'{topic} {n}'), topic, 'easy')
+            bank.setdefault(question['bank_key'], []).append(question)
+    seen = {bank[leftover.quiz_bank_key(topics[0], 'easy')][0]['id']}
+
+    sampled = leftover.sample_quiz_questions(bank, seen, 5)
+    ids = [q['id'] for q in sampled]
+    assert len(sampled) == 5 and len(set(ids)) == 5
+    assert not seen & set(ids)
+    # Every stocked topic is used before any topic repeats
+    assert {q['topic'] for q in sampled[:3]} == set(topics)
+
+
+def test_refill_runs_one_at_a_time(monkeypatch):
+    release = threading.Event()
+    runs = []
+
+    def top_up():
+        runs.append(1)
+        release.wait(5)
+    monkeypatch.setattr(leftover, 'top_up_quiz_bank', top_up)
+
+    assert leftover.start_quiz_bank_refill()
+    assert not leftover.start_quiz_bank_refill()
+    release.set()
+    with leftover._quiz_refill_lock:
+        pass
+    assert leftover.start_quiz_bank_refill()
+    with leftover._quiz_refill_lock:
+        assert runs == [1, 1]
+
+
+def test_top_up_stops_at_first_failed_call(monkeypatch):
+    monkeypatch.setattr(leftover, '_load_quiz_bank', lambda: {})
+    calls = []
+
+    def generate(topic, difficulty):
+        calls.append((topic, difficulty))
+        return [] if len(calls) == 2 else [
+            leftover._bank_question(_question(topic), topic, difficulty)]
+    monkeypatch.setattr(leftover, 'generate_bank_questions', generate)
+    monkeypatch.setattr(leftover, 'save_quiz_questions', len)
+
+    assert leftover.top_up_quiz_bank(max_calls=10) == 1
+    assert len(calls) == 2
+
+
+class _SeenDoc:
+    def __init__(self, data):
+        self.data = data
+        self.exists = data is not None
+
+    def get(self):
+        return _SeenDoc(self.data)
+
+    def to_dict(self):
+        return dict(self.data)
+
+    def set(self, data, merge=False):
+        self.data = dict(self.data or {}, **data)
+
+
+class _SeenDb:
+    def __init__(self):
+        self.doc = _SeenDoc(None)
+
+    def collection(self, name):
+        return self
+
+    def document(self, user_id):
+        return self.doc
+
+
+def test_seen_question_ids_keep_only_the_most_recent(monkeypatch):
+    db = _SeenDb()
+    monkeypatch.setattr(leftover, 'get_firestore_db', lambda: db)
+    monkeypatch.setattr(leftover, 'QUIZ_SEEN_MAX_IDS', 4)
+
+    leftover.mark_questions_seen('u', ['a', 'b', 'c'])
+    leftover.mark_questions_seen('u', ['d', 'a', 'e', 'e'])
+    assert db.doc.data['question_ids'] == ['c', 'd', 'a', 'e']
+    assert leftover.get_seen_question_ids('u') == {'a', 'c', 'd', 'e'}
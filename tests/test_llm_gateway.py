@@ -0,0 +1,107 @@
+import pytest
+
+from modules import llm_gateway
+
+# Kept before the autouse fixture replaces it
+acquire_token = llm_gateway._acquire_rate_limit_token
+
+
+class _Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+def _fake_stream(script):
+    """Each call plays the next script entry: chunks, then maybe an error"""
+    calls = iter(script)
+
+    def generate(*args, **kwargs):
+        texts, error = next(calls)
+        for text in texts:
+            yield _Chunk(text)
+        if error:
+            raise error
+    return generate
+
+
+@pytest.fixture(autouse=True)
+def _no_waiting(monkeypatch):
+    monkeypatch.setattr(llm_gateway, '_acquire_rate_limit_token',
+                        lambda priority=None: None)
+    monkeypatch.setattr(llm_gateway.time, 'sleep', lambda seconds: None)
+
+
+def test_mid_stream_rate_limit_restarts_the_request():
+    func = _fake_stream([
+        (['a', 'b'], Exception('429 Resource exhausted')),
+        (['c', 'd'], None),
+    ])
+    stream = llm_gateway.call_with_gateway(func, 'm', 'prompt', stream=True)
+    attempts = [[chunk.text for chunk in chunks]
+                for chunks in stream.attempts()]
+    assert attempts == [['a', 'b'], ['c', 'd']]
+    assert stream.restarts == 1
+    assert llm_gateway.get_llm_metrics()['in_flight'] == 0
+
+
+def test_non_retryable_stream_error_is_raised():
+    func = _fake_stream([(['a'], ValueError('bad request'))])
+    stream = llm_gateway.call_with_gateway(func, 'm', 'prompt', stream=True)
+    with pytest.raises(ValueError):
+        list(stream)
+    assert llm_gateway.get_llm_metrics()['in_flight'] == 0
+
+
+def test_abandoned_stream_releases_its_slot():
+    func = _fake_stream([(['a', 'b', 'c'], None)])
+    stream = llm_gateway.call_with_gateway(func, 'm', 'prompt', stream=True)
+    for chunks in stream.attempts():
+        next(chunks)
+        break
+    assert llm_gateway.get_llm_metrics()['in_flight'] == 0
+
+
+def _clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(llm_gateway.time, 'monotonic', lambda: now[0])
+
+    def sleep(seconds):
+        now[0] += seconds
+    monkeypatch.setattr(llm_gateway.time, 'sleep', sleep)
+    return now
+
+
+def test_token_bucket_allows_burst_then_paces(monkeypatch):
+    now = _clock(monkeypatch)
+    bucket = llm_gateway._TokenBucket(requests_per_minute=6, burst_size=2)
+    bucket.acquire()
+    bucket.acquire()
+    assert now[0] == 1000.0
+    bucket.acquire()
+    assert now[0] == pytest.approx(1010.0)
+
+
+def test_background_calls_leave_a_reserve(monkeypatch):
+    now = _clock(monkeypatch)
+    shared = llm_gateway._TokenBucket(requests_per_minute=60, burst_size=5)
+    background = llm_gateway._TokenBucket(requests_per_minute=6,
+                                          burst_size=1)
+    monkeypatch.setattr(llm_gateway, '_shared_bucket', shared)
+    monkeypatch.setattr(llm_gateway, '_background_bucket', background)
+
+    background_call = llm_gateway.PRIORITY_BACKGROUND
+    acquire_token(background_call)
+    assert now[0] == 1000.0
+    # The background budget is spent, so the next one waits its own refill
+    acquire_token(background_call)
+    assert now[0] == pytest.approx(1010.0)
+
+    shared.tokens = 2.5
+    acquire_token()
+    assert now[0] == pytest.approx(1010.0)
+    # Only 1.5 shared tokens are left, below the reserve of 2 plus one
+    background.tokens = 1.0
+    acquire_token(background_call)
+    reserve = llm_gateway.BACKGROUND_RESERVE_TOKENS
+    assert shared.tokens == pytest.approx(reserve)
+    assert now[0] == pytest.approx(1011.5)
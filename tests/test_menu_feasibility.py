@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+
+from modules import menu_feasibility
+from modules.menu_feasibility import (
+    DishFeasibilityIndex,
+    dish_ingredient_names,
+    normalize_ingredient_key,
+)
+
+
+def test_normalize_ingredient_key_merges_plurals_and_notes():
+    assert normalize_ingredient_key('Tomatoes') == 'tomato'
+    assert normalize_ingredient_key('Cherries (fresh)') == 'cherry'
+    assert normalize_ingredient_key('Green  Chillies!') == 'green chilly'
+    assert normalize_ingredient_key('Onions') == 'onion'
+    assert normalize_ingredient_key('Glass') == 'glass'
+    assert normalize_ingredient_key('peas') == 'pea'
+
+
+def test_dish_ingredient_names_accepts_strings_and_lists():
+    assert dish_ingredient_names({'ingredients': 'rice, dal ,,'}) == [
+        'rice', 'dal']
+    assert dish_ingredient_names({'ingredients': ['rice', ' ']}) == ['rice']
+    assert dish_ingredient_names({'ingredients': None}) == []
+
+
+def _brute_force_missing(index, available):
+    keys = {normalize_ingredient_key(name) for name in available}
+    return [sum(key not in keys for key in requirements)
+            for requirements in index.requirements]
+
+
+def test_bitset_counts_match_set_difference_across_words():
+    # More than 64 ingredients so masks span several words
+    dishes = [
+        {'name': f'dish {d}',
+         'ingredients': [f'item{(d * 7 + i) % 150}'
+                         for i in range(d % 9 + 1)]}
+        for d in range(40)
+    ]
+    dishes.append({'name': 'empty', 'ingredients': ''})
+    index = DishFeasibilityIndex(dishes)
+    assert len(index.dishes) == 40
+    assert len(index.vocabulary) > 64
+    assert index.word_count == (len(index.vocabulary) + 63) // 64
+
+    available = [f'Item{i}' for i in range(0, 150, 2)]
+    counts = index.missing_counts(available)
+    assert counts.tolist() == _brute_force_missing(index, available)
+    assert index.missing_counts([]).tolist() == [
+        len(r) for r in index.requirements]
+
+
+def test_evaluate_orders_by_missing_and_names_gaps():
+    index = DishFeasibilityIndex([
+        {'name': 'Curry', 'ingredients': 'Onions, Tomatoes, Paneer'},
+        {'name': 'Rice', 'ingredients': 'Rice'},
+        {'name': 'Salad', 'ingredients': 'Tomato, Cucumber'},
+    ])
+    results = index.evaluate(['rice', 'tomato', 'onion'], max_missing=1)
+    assert [r['name'] for r in results] == ['Rice', 'Curry', 'Salad']
+    assert [r['missing_count'] for r in results] == [0, 1, 1]
+    assert results[1]['missing'] == ['Paneer']
+    assert results[2]['missing'] == ['Cucumber']
+    assert [r['name'] for r in index.evaluate(['rice'])] == ['Rice']
+
+
+def test_empty_index_evaluates_to_nothing():
+    index = DishFeasibilityIndex([])
+    assert index.evaluate(['rice']) == []
+    assert index.matrix.shape == (0, 0)
+    assert index.missing_counts(['rice']).dtype == np.int64
+
+
+MENU = [
+    {'name': 'Omelette', 'ingredients': 'Eggs, Milk, Salt',
+     'ingredient_quantities': {'Eggs': '2 pcs', 'Milk': '50 ml'}},
+    {'name': 'Custard', 'ingredients': 'Milk, Eggs',
+     'ingredient_quantities': {'Milk': '0.2 l', 'Eggs': '1 pc'}},
+    {'name': 'Salad', 'ingredients': 'Cucumber, Tomato'},
+]
+
+
+def _use_inventory(monkeypatch, rows):
+    frame = pd.DataFrame(rows, columns=[
+        'Ingredient', 'base_quantity', 'base_unit', 'days_until_expiry'])
+    monkeypatch.setattr(menu_feasibility, 'get_inventory_frame',
+                        lambda: frame)
+    monkeypatch.setattr(
+        menu_feasibility, 'get_snapshot_derived',
+        lambda collection, name, builder: builder(MENU))
+
+
+def test_capacity_skips_dishes_without_quantities(monkeypatch):
+    _use_inventory(monkeypatch, [
+        ('Eggs', 10.0, 'pcs', 5),
+        ('Egg', 2.0, 'pcs', 5),
+        ('Milk', 1000.0, 'ml', 2),
+        ('Milk', 5000.0, 'ml', -1),
+    ])
+    capacity = menu_feasibility.plan_menu_capacity()
+    assert capacity == {
+        'Omelette': {'portions': 6, 'limiting_ingredient': 'egg'},
+        'Custard': {'portions': 5, 'limiting_ingredient': 'milk'},
+    }
+
+
+def test_capacity_never_adds_stock_across_units(monkeypatch):
+    # Grams of eggs do not count towards a recipe asking for pieces
+    _use_inventory(monkeypatch, [
+        ('Eggs', 4.0, 'pcs', 5),
+        ('Eggs', 600.0, 'g', 5),
+        ('Milk', 1000.0, 'ml', 5),
+    ])
+    stock = menu_feasibility.get_inventory_stock(
+        [('egg', 'pcs'), ('egg', 'g'), ('milk', 'ml'), ('salt', 'g')])
+    assert stock.tolist() == [4.0, 600.0, 1000.0, 0.0]
+    capacity = menu_feasibility.plan_menu_capacity()
+    assert capacity['Omelette']['portions'] == 2
+
+
+def test_allocation_shares_stock_and_skips_unplanned(monkeypatch):
+    _use_inventory(monkeypatch, [
+        ('Eggs', 10.0, 'pcs', 5),
+        ('Milk', 1000.0, 'ml', 5),
+    ])
+    allocation = menu_feasibility.allocate_portions(
+        {'Custard': 4, 'Omelette': 10, 'Salad': 3})
+    # Custard uses 800 ml and 4 eggs, leaving milk for 4 omelettes
+    assert allocation == {'Custard': 4, 'Omelette': 3}
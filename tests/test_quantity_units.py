@@ -0,0 +1,68 @@
+import math
+
+import pandas as pd
+
+from modules.quantity_units import (
+    base_quantity_fields,
+    convert_base_quantity,
+    normalize_unit,
+    parse_quantity,
+    parse_quantity_series,
+    parse_to_base,
+)
+
+
+def test_normalize_unit_resolves_aliases():
+    assert normalize_unit(' Kgs. ') == 'kgs'
+    assert normalize_unit('litres') == 'litres'
+    assert normalize_unit('handful') is None
+    assert normalize_unit(None) is None
+
+
+def test_parse_quantity_uses_inline_unit_before_default():
+    assert parse_quantity('4 kg', 'g') == (4.0, 'kg')
+    assert parse_quantity('4', ' Pcs ') == (4.0, 'pcs')
+    assert parse_quantity('.5l') == (0.5, 'l')
+    assert parse_quantity('a few') == (None, None)
+
+
+def test_parse_to_base_converts_each_dimension():
+    assert parse_to_base('2 kg') == (2000.0, 'g')
+    assert parse_to_base('1.5 litres') == (1500.0, 'ml')
+    assert parse_to_base('2 tbsp') == (30.0, 'ml')
+    assert parse_to_base('1 dozen') == (12.0, 'pcs')
+    assert parse_to_base('3 handfuls') == (None, None)
+    assert base_quantity_fields('250', 'gms') == {
+        'base_quantity': 250.0, 'base_unit': 'g'}
+
+
+def test_convert_base_quantity_checks_dimension():
+    assert convert_base_quantity(2500.0, 'g', 'kg') == 2.5
+    assert convert_base_quantity(480.0, 'ml', 'cups') == 2.0
+    assert convert_base_quantity(100.0, 'g', 'ml') is None
+    assert convert_base_quantity(100.0, 'g', 'handful') is None
+
+
+def test_series_parser_matches_scalar_parser():
+    quantities = pd.Series(['2 kg', '500', ' 3 Pieces ', 'lots', None,
+                            '1.5 l.'])
+    units = pd.Series(['', 'ml', 'g', 'kg', 'g', ''])
+    frame = parse_quantity_series(quantities, units)
+    for row, (quantity, unit) in enumerate(zip(quantities, units)):
+        expected = parse_to_base(quantity if quantity is not None else '',
+                                 unit)
+        base_quantity = frame.loc[row, 'base_quantity']
+        base_unit = frame.loc[row, 'base_unit']
+        if expected == (None, None):
+            assert math.isnan(base_quantity)
+            assert not isinstance(base_unit, str)
+        else:
+            assert (base_quantity, base_unit) == expected
+
+
+def test_series_parser_without_unit_column():
+    frame = parse_quantity_series(pd.Series(['2 kg', '7'], index=[5, 9]))
+    assert frame.index.tolist() == [5, 9]
+    assert frame.loc[5, 'base_quantity'] == 2000.0
+    assert math.isnan(frame.loc[9, 'base_quantity'])
+    assert frame.loc[9, 'quantity_value'] == 7.0
@@ -0,0 +1,63 @@
+import numpy as np
+
+from modules.xp_utils import (
+    LEVEL_THRESHOLDS,
+    MAX_LEVEL,
+    calculate_level_from_xp,
+    calculate_levels_from_xp,
+    calculate_xp_for_level,
+    calculate_xp_progress_batch,
+    get_xp_progress,
+)
+
+
+def _loop_xp_for_level(level):
+    # The per-level loop the table replaced
+    total_xp = 0
+    for current_level in range(1, level):
+        total_xp += int(100 * (1.0 + (current_level - 1) * 0.2))
+    return total_xp
+
+
+def _loop_level_from_xp(total_xp):
+    if total_xp < 0:
+        return 1
+    level = 1
+    while total_xp >= _loop_xp_for_level(level + 1):
+        level += 1
+        if level > MAX_LEVEL:
+            break
+    return level
+
+
+def _sample_xp():
+    edges = [t + d for t in LEVEL_THRESHOLDS[:MAX_LEVEL] for d in (-1, 0, 1)]
+    spread = np.random.default_rng(3).integers(
+        0, LEVEL_THRESHOLDS[MAX_LEVEL], 2000)
+    return [-5] + edges + spread.tolist()
+
+
+def test_table_matches_the_loop():
+    for level in range(0, MAX_LEVEL + 5):
+        assert calculate_xp_for_level(level) == _loop_xp_for_level(level)
+    for xp in _sample_xp():
+        assert calculate_level_from_xp(xp) == _loop_level_from_xp(xp)
+
+
+def test_level_is_capped_past_the_last_threshold():
+    assert calculate_level_from_xp(LEVEL_THRESHOLDS[MAX_LEVEL]) == MAX_LEVEL
+    assert calculate_level_from_xp(10 ** 9) == MAX_LEVEL
+
+
+def test_batch_levels_match_scalar():
+    xp = _sample_xp() + [LEVEL_THRESHOLDS[MAX_LEVEL], 10 ** 9]
+    levels = calculate_levels_from_xp(xp)
+    assert levels.tolist() == [calculate_level_from_xp(v) for v in xp]
+
+
+def test_batch_progress_matches_scalar():
+    xp = [v for v in _sample_xp() if v >= 0]
+    levels, current, needed = calculate_xp_progress_batch(xp)
+    for value, level, into, left in zip(xp, levels, current, needed):
+        expected = get_xp_progress(value, int(level))
+        assert (into, left) == expected[:2]
@@ -7,15 +7,28 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 from modules.chef_services import (
-    get_chef_firebase_db, generate_dish_rating, parse_ingredients, generate_dish,
-    DIET_TYPES, MENU_CATEGORIES, REQUIRED_MENU_FIELDS
+    get_chef_firebase_db, generate_dish_rating, parse_ingredients, generate_dish, generate_dish_stream,
+    generate_menu_sharded, merge_menu_dishes, build_weekly_menu_prompt, save_dishes_batched,
+    delete_collection_docs, parse_ingredient_quantities,
+    DIET_TYPES, MENU_CATEGORIES, MENU_SHARDS
 )
+from firebase_init import EVENT_APP
+from firebase_data import invalidate_collection_cache, record_collection_write, fetch_menu_items, get_facets
+from modules.leftover import refresh_restaurant_profile
 import logging
 from google.cloud import firestore
 
 logger = logging.getLogger(__name__)
 
+# Label shown in the generator -> generate_new_menu mode
+MENU_GENERATION_MODES = {
+    "Parallel sections": "sharded",
+    "Stream dishes as they arrive": "stream",
+    "Single request": "single",
+}
+
 def render_chef_recipe_suggestions():
     """Main function to render Chef Recipe Suggestions with tabs"""
     st.title("👨‍🍳 Chef Recipe Suggestions")
@@ -109,6 +122,13 @@ def render_menu_generator(db):
 
     # Menu Generation
     st.markdown("#### 🚀 Generate Menu")
+    mode_label = st.radio(
+        "Generation mode",
+        list(MENU_GENERATION_MODES),
+        horizontal=True,
+        help="Parallel sections finishes the full menu fastest; streaming shows the first dishes soonest"
+    )
+    mode = MENU_GENERATION_MODES[mode_label]
     
     # Check existing menu status
     today = datetime.now()
@@ -150,7 +170,7 @@ def render_menu_generator(db):
             col1, col2 = st.columns(2)
             with col1:
                 if st.button("🗑️ Delete Current Menu & Generate New", type="primary", key="regenerate_menu"):
-                    delete_and_regenerate_menu(db, sorted_ingredients, priority_ingredients)
+                    delete_and_regenerate_menu(db, sorted_ingredients, priority_ingredients, mode)
             
             with col2:
                 if st.button("❌ Keep Current Menu", key="keep_menu"):
@@ -165,7 +185,7 @@ def render_menu_generator(db):
 
             with col2:
                 if st.button("🚀 Generate New Menu", type="primary", use_container_width=True):
-                    generate_new_menu(db, sorted_ingredients, priority_ingredients)
+                    generate_new_menu(db, sorted_ingredients, priority_ingredients, mode)
                     
     except Exception as e:
         logger.error(f"Error checking existing menu: {str(e)}")
@@ -173,47 +193,45 @@ def render_menu_generator(db):
         
         # Fallback - allow generation anyway
         if st.button("🚀 Generate Menu (Fallback)", type="secondary"):
-            generate_new_menu(db, sorted_ingredients, priority_ingredients)
+            generate_new_menu(db, sorted_ingredients, priority_ingredients, mode)
 
     # Display generated menu if exists
     if "generated_menu" in st.session_state:
         display_generated_menu(db)
 
-def delete_and_regenerate_menu(db, sorted_ingredients, priority_ingredients):
+def delete_and_regenerate_menu(db, sorted_ingredients, priority_ingredients, mode="sharded"):
     """Delete existing menu and generate new one"""
     try:
-        with st.spinner("🗑️ Deleting existing menu items..."):
-            # Get ALL menu items (not just this week) to be thorough
-            all_menu_docs = db.collection("menu").stream()
-            deleted_count = 0
-            
-            for doc in all_menu_docs:
-                try:
-                    doc_data = doc.to_dict()
-                    logger.info(f"Deleting menu item: {doc_data.get('name', 'Unknown')} (ID: {doc.id})")
-                    doc.reference.delete()
-                    deleted_count += 1
-                except Exception as e:
-                    logger.error(f"Error deleting document {doc.id}: {str(e)}")
-            
-            logger.info(f"Successfully deleted {deleted_count} menu items")
-            st.success(f"✅ Deleted {deleted_count} existing menu items")
-            
         # Clear any cached menu data
         if "generated_menu" in st.session_state:
             del st.session_state.generated_menu
+        
+        # Delete ALL menu items (not just this week) in the background while generation starts
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            delete_future = executor.submit(delete_collection_docs, db, "menu")
             
-        # Generate new menu
-        st.info("🚀 Generating new menu...")
-        generate_new_menu(db, sorted_ingredients, priority_ingredients)
+            st.info("🚀 Generating new menu...")
+            generate_new_menu(db, sorted_ingredients, priority_ingredients, mode)
+            
+            with st.spinner("🗑️ Finishing deletion of existing menu items..."):
+                deleted_count, delete_errors = delete_future.result()
+        
+        invalidate_collection_cache("menu", EVENT_APP)
+        if deleted_count:
+            # The stored profile still lists the deleted dishes until it is rebuilt
+            refresh_restaurant_profile()
+        st.success(f"✅ Deleted {deleted_count} existing menu items")
+        if delete_errors:
+            st.warning(f"⚠️ Some menu items could not be deleted: {delete_errors[0]}")
         
     except Exception as e:
         logger.error(f"Error during menu deletion and regeneration: {str(e)}")
         st.error(f"❌ Error during menu regeneration: {str(e)}")
 
-def generate_new_menu(db, sorted_ingredients, priority_ingredients):
-    """Generate new menu using AI"""
-    logger.info("Starting menu generation...")
+def generate_new_menu(db, sorted_ingredients, priority_ingredients, mode="sharded"):
+    """Generate new menu using AI (modes: sharded, stream, single)"""
+    logger.info(f"Starting menu generation ({mode})...")
+    st.session_state.pop("generated_menu_incomplete", None)
     
     with st.spinner("Generating menu with AI..."):
         progress_bar = st.progress(0)
@@ -222,40 +240,66 @@ def generate_new_menu(db, sorted_ingredients, priority_ingredients):
         logger.info(f"Using {len(ingredient_names)} ingredients for menu generation")
         logger.info(f"Priority ingredients: {priority_ingredients}")
         
-        prompt = f"""
-You are an AI chef. Generate a full weekly restaurant menu (at least 35 dishes).
-Include:
-- Starters (8-10 dishes)
-- Main Course (15-18 dishes) 
-- Desserts (6-8 dishes)
-- Beverages (6-8 dishes)
-- Special dishes using: {', '.join(priority_ingredients)}
-- Seasonal dishes based on the current month and available ingredients: {', '.join(ingredient_names)}
-- Normal dishes based on the same available ingredients
-
-Use this EXACT structure for each dish:
-{{
-    "name": "Dish Name",
-    "description": "Detailed description",
-    "ingredients": ["ingredient1", "ingredient2"],
-    "cook_time": "30 minutes",
-    "cuisine": "Italian",
-    "diet": ["Vegetarian"],
-    "category": "Main Course",
-    "types": ["Seasonal Items"],
-    "source": "Gemini",
-    "rating": null,
-    "rating_comment": "",
-    "timestamp": "{datetime.now().isoformat()}"
-}}
-
-Return ONLY a JSON array of dishes. No explanation or additional text.
-"""
-        progress_bar.progress(50)
-        logger.info("Sending request to Gemini AI...")
-        
-        response = generate_dish(prompt)
-        progress_bar.progress(100)
+        if mode == "sharded":
+            status_placeholder = st.empty()
+            table_placeholder = st.empty()
+            response = []
+            failed_shards = []
+            completed = 0
+            
+            for shard_name, shard_dishes in generate_menu_sharded(ingredient_names, priority_ingredients):
+                completed += 1
+                progress_bar.progress(completed / len(MENU_SHARDS))
+                if not shard_dishes:
+                    failed_shards.append(shard_name)
+                    continue
+                response = merge_menu_dishes(response, shard_dishes)
+                status_placeholder.info(f"🍽️ {shard_name} ready - {len(response)} dishes so far ({completed}/{len(MENU_SHARDS)} sections)")
+                table_placeholder.dataframe(pd.DataFrame(response), use_container_width=True, height=300)
+            
+            status_placeholder.empty()
+            table_placeholder.empty()
+            
+            if failed_shards:
+                st.warning(f"⚠️ Could not generate these sections: {', '.join(failed_shards)}. Try regenerating.")
+            if not response:
+                logger.error("All menu shards failed")
+                st.error("❌ Invalid menu format generated")
+                return
+        elif mode == "stream":
+            logger.info("Streaming request to Gemini AI...")
+            prompt = build_weekly_menu_prompt(ingredient_names, priority_ingredients)
+            status_placeholder = st.empty()
+            table_placeholder = st.empty()
+            response = []
+            stream_error = None
+            
+            try:
+                for dish in generate_dish_stream(prompt):
+                    response.append(dish)
+                    progress_bar.progress(min(len(response) / 35, 1.0))
+                    status_placeholder.info(f"🍽️ {len(response)} dishes generated so far... latest: {dish.get('name', 'Unknown')}")
+                    table_placeholder.dataframe(pd.DataFrame(response), use_container_width=True, height=300)
+            except Exception as e:
+                stream_error = str(e)
+            
+            progress_bar.progress(100)
+            status_placeholder.empty()
+            table_placeholder.empty()
+            
+            if not response:
+                logger.error("No dishes received from Gemini stream")
+                st.error(f"❌ Menu generation failed: {stream_error}" if stream_error else "❌ Invalid menu format generated")
+                return
+            if stream_error:
+                st.session_state.generated_menu_incomplete = stream_error
+                st.warning(f"⚠️ Menu generation stopped early after {len(response)} dishes: {stream_error}")
+        else:
+            progress_bar.progress(50)
+            logger.info("Sending request to Gemini AI...")
+            
+            response = generate_dish(build_weekly_menu_prompt(ingredient_names, priority_ingredients))
+            progress_bar.progress(100)
 
         if not isinstance(response, list):
             logger.error(f"Invalid response type: {type(response)}")
@@ -264,9 +308,12 @@ Return ONLY a JSON array of dishes. No explanation or additional text.
                 st.json(response)
             return
 
-        logger.info(f"Successfully generated {len(response)} dishes")
         st.session_state.generated_menu = response
-        st.success(f"✅ Generated {len(response)} dishes successfully!")
+        if st.session_state.get("generated_menu_incomplete"):
+            logger.warning(f"Generated an incomplete menu of {len(response)} dishes")
+        else:
+            logger.info(f"Successfully generated {len(response)} dishes")
+            st.success(f"✅ Generated {len(response)} dishes successfully!")
 
 def display_generated_menu(db):
     """Display and save generated menu"""
@@ -292,11 +339,18 @@ def display_generated_menu(db):
     # Save section
     col1, col2 = st.columns([2, 1])
 
+    incomplete = st.session_state.get("generated_menu_incomplete")
+
     with col1:
-        st.write("Save all generated dishes to Firebase and create backups.")
+        if incomplete:
+            st.warning(f"⚠️ This menu is incomplete - generation stopped early ({incomplete}). Regenerate, or confirm to save only these dishes.")
+            confirmed = st.checkbox("Save the incomplete menu anyway", key="confirm_incomplete_menu")
+        else:
+            st.write("Save all generated dishes to Firebase and create backups.")
+            confirmed = True
 
     with col2:
-        if st.button("💾 Save to Database", type="primary", use_container_width=True):
+        if st.button("💾 Save to Database", type="primary", use_container_width=True, disabled=not confirmed):
             save_menu_to_database(db)
 
 def save_menu_to_database(db):
@@ -305,38 +359,26 @@ def save_menu_to_database(db):
     
     with st.spinner("Saving menu..."):
         progress = st.progress(0)
-        created_count = 0
-        error_count = 0
-        total_dishes = len(st.session_state.generated_menu)
-
-        for i, dish in enumerate(st.session_state.generated_menu):
-            progress.progress((i + 1) / total_dishes)
-
-            # Validate required fields
-            missing = [f for f in REQUIRED_MENU_FIELDS if f not in dish or not dish[f]]
-            if missing:
-                logger.warning(f"Skipping dish '{dish.get('name', 'Unknown')}' due to missing fields: {missing}")
-                error_count += 1
-                continue
-
+        now = datetime.now().isoformat()
+        for dish in st.session_state.generated_menu:
             # Set metadata
             dish["source"] = "Gemini"
-            dish["created_at"] = datetime.now().isoformat()
+            dish["created_at"] = now
             dish["rating"] = None
 
-            try:
-                # Add to menu collection
-                menu_ref = db.collection("menu").add(dish)
-                logger.info(f"Added dish '{dish.get('name')}' to menu collection with ID: {menu_ref[1].id}")
-                
-                # Add to recipe archive for backup
-                archive_ref = db.collection("recipe_archive").add(dish)
-                logger.info(f"Added dish '{dish.get('name')}' to recipe archive with ID: {archive_ref[1].id}")
-                
-                created_count += 1
-            except Exception as e:
-                logger.error(f"Error saving dish '{dish.get('name', 'Unnamed')}': {e}")
-                error_count += 1
+        saved, errors = save_dishes_batched(db, st.session_state.generated_menu, on_progress=progress.progress)
+
+        for doc_id, dish in saved:
+            record_collection_write("menu", dish, doc_id, EVENT_APP)
+            record_collection_write("recipe_archive", dish, doc_id, EVENT_APP)
+
+        for name, reason in errors:
+            logger.warning(f"Dish '{name}' was not saved: {reason}")
+
+        created_count = len(saved)
+        error_count = len(errors)
+        if saved:
+            refresh_restaurant_profile()
 
         logger.info(f"Menu save completed: {created_count} saved, {error_count} errors")
 
@@ -344,9 +386,13 @@ def save_menu_to_database(db):
             st.success(f"✅ Menu saved successfully! {created_count} dishes added to restaurant menu.")
             if error_count > 0:
                 st.warning(f"⚠️ {error_count} dishes had errors and were not saved.")
+                with st.expander("View unsaved dishes"):
+                    for name, reason in errors:
+                        st.write(f"• **{name}**: {reason}")
             
             # Clear the generated menu from session state
             del st.session_state.generated_menu
+            st.session_state.pop("generated_menu_incomplete", None)
             
             # Force a rerun to refresh the menu status
             st.rerun()
@@ -391,6 +437,13 @@ def render_chef_submission(db):
             height=80
         )
 
+        ingredient_quantities = st.text_area(
+            "Quantities per Portion (optional)",
+            placeholder="One per line, e.g. Rice: 120 g",
+            help="Used to plan how many portions the current inventory supports",
+            height=80
+        )
+
         description = st.text_area(
             "Description",
             placeholder="Describe your dish, cooking method, and what makes it special",
@@ -417,9 +470,11 @@ def render_chef_submission(db):
                 return
 
             # Process submission
-            process_chef_submission(db, chef_name, dish_name, description, ingredients, cook_time, cuisine, diet, category)
+            process_chef_submission(db, chef_name, dish_name, description, ingredients, cook_time, cuisine, diet, category,
+                                    ingredient_quantities)
 
-def process_chef_submission(db, chef_name, dish_name, description, ingredients, cook_time, cuisine, diet, category):
+def process_chef_submission(db, chef_name, dish_name, description, ingredients, cook_time, cuisine, diet, category,
+                            ingredient_quantities=""):
     """Process chef recipe submission"""
     logger.info(f"Processing chef submission: {dish_name} by {chef_name}")
     
@@ -451,6 +506,7 @@ def process_chef_submission(db, chef_name, dish_name, description, ingredients,
             "name": dish_name,
             "description": description,
             "ingredients": [i.strip() for i in ingredients.split(",")],
+            "ingredient_quantities": parse_ingredient_quantities(ingredient_quantities),
             "cook_time": cook_time,
             "cuisine": cuisine,
             "diet": [diet],
@@ -470,6 +526,9 @@ def process_chef_submission(db, chef_name, dish_name, description, ingredients,
             
             logger.info(f"Saved chef submission to menu: {menu_ref[1].id}")
             logger.info(f"Saved chef submission to archive: {archive_ref[1].id}")
+            record_collection_write("menu", dish_doc, menu_ref[1].id, EVENT_APP)
+            record_collection_write("recipe_archive", dish_doc, archive_ref[1].id, EVENT_APP)
+            refresh_restaurant_profile()
 
             # Add to chef ratings
             rating_ref = db.collection("chef_sub_ratings").add({
@@ -500,20 +559,9 @@ def render_analytics_dashboard(db):
     st.markdown("### 📊 Menu Analytics Dashboard")
     st.markdown("Insights into menu performance, chef ratings, and category distribution")
 
-    # Load data with caching
-    @st.cache_data(ttl=300)
-    def load_menu_data():
-        try:
-            menu_docs = db.collection("menu").stream()
-            data = [doc.to_dict() for doc in menu_docs]
-            logger.info(f"Loaded {len(data)} menu items for analytics")
-            return data
-        except Exception as e:
-            logger.error(f"Failed to load menu items: {e}")
-            st.error(f"Failed to load menu items: {e}")
-            return []
-
-    menu_items = load_menu_data()
+    # Menu items and their facet counts come from the shared menu snapshot
+    menu_items = fetch_menu_items()
+    facets = get_facets("menu")
 
     if not menu_items:
         st.error("❌ No menu data available. Please generate a menu first.")
@@ -523,7 +571,12 @@ def render_analytics_dashboard(db):
     st.markdown("#### 📈 Overview")
 
     total_dishes = len(menu_items)
-    categories = list(set(item.get("category", "Uncategorized") for item in menu_items))
+    category_counts = pd.Series(facets.get("category", {}), dtype=int)
+    uncategorized = total_dishes - int(category_counts.sum())
+    if uncategorized > 0:
+        category_counts["Uncategorized"] = uncategorized
+    category_counts = category_counts.sort_values(ascending=False)
+    categories = list(category_counts.index)
     chef_specials = [item for item in menu_items if "Chef" in item.get("source", "")]
     
     # Calculate average rating
@@ -550,11 +603,11 @@ def render_analytics_dashboard(db):
         selected_category = st.selectbox("Category", ["All"] + sorted(categories))
 
     with col2:
-        cuisine_types = sorted(set(item.get("cuisine", "Unknown") for item in menu_items if item.get("cuisine")))
+        cuisine_types = sorted(facets.get("cuisine", {}))
         selected_cuisine = st.selectbox("Cuisine", ["All"] + cuisine_types)
 
     with col3:
-        source_types = sorted(set(item.get("source", "Unknown") for item in menu_items if item.get("source")))
+        source_types = sorted(facets.get("source", {}))
         selected_source = st.selectbox("Source", ["All"] + source_types)
 
     # Apply filters
@@ -574,7 +627,7 @@ def render_analytics_dashboard(db):
 
     if filtered_items:
         st.write(f"Showing {len(filtered_items)} of {total_dishes} dishes")
-        df = pd.DataFrame(filtered_items)
+        df = pd.DataFrame(filtered_items).drop(columns=["id"], errors="ignore")
         st.dataframe(df, use_container_width=True, height=300)
     else:
         st.info("No dishes match the selected filters.")
@@ -616,8 +669,6 @@ def render_analytics_dashboard(db):
     with col2:
         st.markdown("#### 📦 Category Distribution")
 
-        category_counts = pd.Series([item.get("category", "Uncategorized") for item in menu_items]).value_counts()
-
         fig_pie = px.pie(
             values=category_counts.values,
             names=category_counts.index,
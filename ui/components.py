@@ -2,8 +2,8 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 from datetime import datetime, timedelta
-import firebase_admin
 from firebase_admin import firestore
+from firebase_init import get_client, MAIN_APP, EVENT_APP
 import logging
 import random
 import hashlib
@@ -22,28 +22,10 @@ def initialize_session_state():
         st.session_state.show_signup = False
 
 def get_firestore_client():
-    try:
-        if firebase_admin._DEFAULT_APP_NAME in [app.name for app in firebase_admin._apps.values()]:
-            return firestore.client()
-        else:
-            from firebase_init import init_firebase
-            init_firebase()
-            return firestore.client()
-    except Exception as e:
-        logger.error(f"Error getting Firestore client for auth: {str(e)}")
-        return None
+    return get_client(MAIN_APP)
 
 def get_event_firestore_client():
-    try:
-        if 'event_app' in [app.name for app in firebase_admin._apps.values()]:
-            return firestore.client(app=firebase_admin.get_app(name='event_app'))
-        else:
-            from modules.event_planner import init_event_firebase
-            init_event_firebase()
-            return firestore.client(app=firebase_admin.get_app(name='event_app'))
-    except Exception as e:
-        logger.error(f"Error getting event Firestore client: {str(e)}")
-        return None
+    return get_client(EVENT_APP)
 
 def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
@@ -526,9 +508,9 @@ def render_cooking_quiz(ingredients, user_id):
         
         button_text = "Generate New Quiz" if st.session_state.quiz_completed else "Generate Quiz"
         if st.button(button_text, type="primary", use_container_width=True):
-            with st.spinner(f"Generating {num_questions} quiz questions..."):
-                from modules.leftover import generate_dynamic_quiz_questions
-                questions = generate_dynamic_quiz_questions(ingredients, num_questions)
+            with st.spinner(f"Preparing {num_questions} quiz questions..."):
+                from modules.leftover import get_quiz_questions
+                questions = get_quiz_questions(user_id, num_questions, ingredients)
                 
                 if questions:
                     st.session_state.quiz_questions = questions
@@ -711,9 +693,8 @@ def leftover_input_firebase():
         
         if st.sidebar.button("Fetch Priority Ingredients"):
             try:
-                from modules.leftover import get_ingredients_by_expiry_priority, fetch_ingredients_from_firebase
-                firebase_ingredients = fetch_ingredients_from_firebase()
-                ingredients, detailed_info = get_ingredients_by_expiry_priority(firebase_ingredients, max_ingredients)
+                from modules.leftover import get_priority_ingredients
+                ingredients, detailed_info = get_priority_ingredients(max_ingredients)
                 
                 if ingredients:
                     st.sidebar.success(f"Fetched {len(ingredients)} priority ingredients")
@@ -3,7 +3,7 @@ import pandas as pd
 import plotly.express as px
 from datetime import datetime
 from modules.promotion_services import (
-    get_promotion_firebase_db, filter_valid_ingredients, find_possible_dishes,
+    get_promotion_firebase_db, filter_valid_ingredients, find_possible_dishes, find_near_feasible_dishes,
     generate_campaign, save_campaign, get_existing_campaign, get_campaigns_for_month,
     award_promotion_xp, delete_campaign, get_user_stats_promotion, get_all_campaigns,
     like_campaign, dislike_campaign, get_user_by_id
@@ -196,6 +196,11 @@ def create_campaign_with_xp(db, staff_name, user_id, promotion_type, promotion_g
             possible_dishes = find_possible_dishes(db, available_ingredients)
             if not possible_dishes:
                 st.error("No dishes can be prepared today based on current inventory. Please contact the kitchen manager.")
+                near_dishes = find_near_feasible_dishes(db, available_ingredients)
+                if near_dishes:
+                    with st.expander("Dishes that are only a few ingredients away"):
+                        for dish in near_dishes[:10]:
+                            st.write(f"• **{dish['name']}** - missing {', '.join(dish['missing'])}")
                 return
             
             campaign = generate_campaign(
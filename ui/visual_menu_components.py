@@ -10,6 +10,7 @@ from modules.visual_menu_services import (
     save_order, award_visual_menu_xp, calculate_challenge_score, ALLERGY_MAPPING
 )
 from ui.components import show_xp_notification
+from firebase_data import get_facets, fetch_menu_items as fetch_menu_snapshot
 import logging
 
 try:
@@ -565,26 +566,31 @@ def render_custom_filters(db, allergies):
     st.header("Custom Menu Filters")
     st.markdown("Filter our menu based on available data from your restaurant database!")
     
-    menu_items = fetch_menu_items(db)
+    # Same cached snapshot the facet counts come from, so filtering adds no collection read
+    menu_items = fetch_menu_snapshot()
     if not menu_items:
         st.error("No menu items found.")
         return
     
-    available_categories = list(set([item.get('category', 'Unknown') for item in menu_items if item.get('category')]))
-    available_cuisines = list(set([item.get('cuisine', 'Unknown') for item in menu_items if item.get('cuisine')]))
-    available_diets = list(set([diet for item in menu_items for diet in (item.get('diet', []) if isinstance(item.get('diet'), list) else [item.get('diet')] if item.get('diet') else [])]))
-    available_types = list(set([type_item for item in menu_items for type_item in (item.get('types', []) if isinstance(item.get('types'), list) else [item.get('types')] if item.get('types') else [])]))
+    facets = get_facets("menu")
+    
+    def facet_select(label, field):
+        counts = facets.get(field, {})
+        return st.selectbox(
+            label, ["All"] + sorted(counts),
+            format_func=lambda value: value if value == "All" else f"{value} ({counts[value]})"
+        )
     
     st.subheader("Menu Categories & Types")
     col1, col2 = st.columns(2)
     
     with col1:
-        selected_category = st.selectbox("Category", ["All"] + sorted(available_categories))
-        selected_cuisine = st.selectbox("Cuisine", ["All"] + sorted(available_cuisines))
+        selected_category = facet_select("Category", "category")
+        selected_cuisine = facet_select("Cuisine", "cuisine")
         
     with col2:
-        selected_diet = st.selectbox("Dietary Type", ["All"] + sorted(available_diets))
-        selected_type = st.selectbox("Special Types", ["All"] + sorted(available_types))
+        selected_diet = facet_select("Dietary Type", "diet")
+        selected_type = facet_select("Special Types", "types")
 
     st.subheader("Cooking Time")
     cook_time_filter = st.selectbox(
@@ -752,10 +758,10 @@ def render_custom_filters(db, allergies):
                 
                 with st.expander("Filter Debug Information"):
                     st.write("**Available in Database:**")
-                    st.write(f"- Categories: {', '.join(available_categories)}")
-                    st.write(f"- Cuisines: {', '.join(available_cuisines)}")
-                    st.write(f"- Diet Types: {', '.join(available_diets)}")
-                    st.write(f"- Special Types: {', '.join(available_types)}")
+                    st.write(f"- Categories: {', '.join(sorted(facets.get('category', {})))}")
+                    st.write(f"- Cuisines: {', '.join(sorted(facets.get('cuisine', {})))}")
+                    st.write(f"- Diet Types: {', '.join(sorted(facets.get('diet', {})))}")
+                    st.write(f"- Special Types: {', '.join(sorted(facets.get('types', {})))}")
                     st.write(f"- Total Menu Items: {len(menu_items)}")
                     
                     st.write("**Your Selected Filters:**")